@@ -3,6 +3,7 @@ ComfyUI Curve Master - Professional curve and LUT editor
 """
 
 from .nodes import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
+from . import routes  # Routes HTTP (vignettes LUT), enregistrées si PromptServer est disponible
 
 # IMPORTANT : Déclarer le répertoire web pour l'interface graphique
 WEB_DIRECTORY = "./web"
@@ -1,17 +1,23 @@
 from .curve_master_node import CurveMasterNode
 from .lut_manager_node import LUTManagerNode
 from .lut_generator_node import LUTGeneratorNode
+from .hald_pattern_node import HaldPatternNode
+from .curve_fit_node import CurveFitNode
 
 NODE_CLASS_MAPPINGS = {
     "CurveMasterNode": CurveMasterNode,
     "LUTManagerNode": LUTManagerNode,
     "LUTGeneratorNode": LUTGeneratorNode,
+    "HaldPatternNode": HaldPatternNode,
+    "CurveFitNode": CurveFitNode,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "CurveMasterNode": "🎨 Curve Master",
     "LUTManagerNode": "📊 LUT Manager", 
     "LUTGeneratorNode": "🔧 LUT Generator",
+    "HaldPatternNode": "🧊 Hald Pattern",
+    "CurveFitNode": "📈 Curve Fit",
 }
 
 __all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"]
@@ -0,0 +1,125 @@
+import numpy as np
+
+from ..utils.curve_math import CurveMath
+from .curve_master_node import CurveMasterNode
+
+class CurveFitNode:
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image_before": ("IMAGE",),
+                "image_after": ("IMAGE",),
+                "control_points": ("INT", {"default": 6, "min": 2, "max": 16, "step": 1}),
+                "interpolation": (["catmull-rom", "linear", "bezier"], {"default": "catmull-rom"}),
+                "fit_master_curve": ("BOOLEAN", {"default": True}),
+                "monotonic": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                "free_knots": ("BOOLEAN", {"default": False}),
+                "sample_stride": ("INT", {"default": 2, "min": 1, "max": 16, "step": 1}),
+                "residual_threshold": ("FLOAT", {"default": 0.02, "min": 0.001, "max": 0.2, "step": 0.001}),
+                "preset_name": ("STRING", {"default": "", "multiline": False}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "FLOAT", "STRING")
+    RETURN_NAMES = ("curve_points_rgb", "curve_points_red", "curve_points_green", "curve_points_blue",
+                    "residual", "fit_info")
+    FUNCTION = "fit_curves"
+    CATEGORY = "Curve Master"
+
+    # Types de courbe CurveMath des interpolations de Curve Master
+    CURVE_TYPES = {"catmull-rom": 'catmull_rom', "linear": 'linear', "bezier": 'bezier'}
+
+    def fit_curves(self, image_before, image_after, control_points, interpolation, fit_master_curve, monotonic,
+                   free_knots=False, sample_stride=2, residual_threshold=0.02, preset_name=""):
+        """
+        Ajuste des courbes Curve Master (par canal et RGB) sur une paire avant/après
+        Returns:
+            Chaînes de points des quatre courbes, résidu RMS (0-1) et résumé
+        """
+        if image_before.shape != image_after.shape:
+            raise ValueError("Images must have the same dimensions")
+
+        if len(image_before.shape) == 3:
+            image_before = image_before.unsqueeze(0)
+            image_after = image_after.unsqueeze(0)
+
+        # Pixels échantillonnés (un sur sample_stride dans chaque direction)
+        before = (image_before[:, ::sample_stride, ::sample_stride].cpu().numpy() * 255).astype(np.uint8).reshape(-1, 3)
+        after = image_after[:, ::sample_stride, ::sample_stride].cpu().numpy().astype(np.float64).reshape(-1, 3)
+
+        # Réponse de chaque canal : moyenne de l'après par niveau de l'avant
+        measured, counts = self.conditional_means(before, after)
+        responses = measured
+        curve_type = self.CURVE_TYPES[interpolation]
+        levels = np.linspace(0.0, 1.0, 256)
+
+        master_points = [(0.0, 0.0), (1.0, 1.0)]
+        if fit_master_curve:
+            # Courbe RGB : réponse commune (pondérée par les effectifs), toujours monotone pour être inversible
+            total = counts.sum(axis=0)
+            common = np.divide((measured * counts).sum(axis=0), total, out=levels.copy(), where=total > 0)
+            master_points = CurveMath.optimize_curve_fit(common, control_points, curve_type, weights=total,
+                                                         monotonic=True, free_knots=free_knots)
+            master = np.maximum.accumulate(CurveMath.fit_curve_to_points(master_points, curve_type))
+
+            # Les courbes par canal ciblent la réponse avant la courbe RGB (inverse de la courbe RGB)
+            unique_master, first = np.unique(master, return_index=True)
+            responses = np.interp(measured, unique_master, levels[first])
+
+        channel_points = [
+            CurveMath.optimize_curve_fit(responses[c], control_points, curve_type, weights=counts[c],
+                                         monotonic=monotonic, free_knots=free_knots)
+            for c in range(3)
+        ]
+
+        curve_node = CurveMasterNode()
+        curve_strings = [curve_node.format_curve_points(points) for points in [master_points] + channel_points]
+
+        # Résidu : courbes ajustées appliquées comme dans Curve Master, comparées à l'après
+        tables = curve_node.build_frame_tables(*curve_strings, 1, interpolation, 1.0, 1.0)[0]
+        fitted = tables[before, np.arange(3)].astype(np.float64) / 255.0
+        residual = float(np.sqrt(np.mean((fitted - after) ** 2)))
+
+        # Plancher : meilleur résultat possible avec des courbes par canal (moyennes conditionnelles exactes)
+        floor = float(np.sqrt(np.mean((measured[np.arange(3), before] - after) ** 2)))
+
+        fit_info = f"Residual RMS: {residual:.4f} (per-channel floor {floor:.4f}), {interpolation}, {control_points} points"
+        if residual > residual_threshold:
+            fit_info += " - not a separable look, a 3D LUT is recommended"
+
+        if preset_name and preset_name.strip():
+            settings = dict(zip(("curve_points_rgb", "curve_points_red", "curve_points_green", "curve_points_blue"),
+                                curve_strings), interpolation=interpolation)
+            if curve_node.save_user_preset(preset_name.strip(), settings):
+                fit_info += f", preset '{preset_name.strip()}' saved"
+
+        print(f"📈 Curve fit: {fit_info}")
+        return (*curve_strings, residual, fit_info)
+
+    def conditional_means(self, before, after):
+        """
+        Réponse moyenne de chaque canal par niveau d'entrée
+        Args:
+            before: Pixels uint8 (N, 3)
+            after: Pixels float (N, 3) dans [0, 1]
+        Returns:
+            Tuple (moyennes (3, 256), effectifs (3, 256)) ; les niveaux absents sont interpolés
+        """
+        levels = np.linspace(0.0, 1.0, 256)
+        means = np.empty((3, 256))
+        counts = np.empty((3, 256))
+
+        for c in range(3):
+            counts[c] = np.bincount(before[:, c], minlength=256)
+            sums = np.bincount(before[:, c], weights=after[:, c], minlength=256)
+            present = counts[c] > 0
+            if not present.any():
+                means[c] = levels
+                continue
+            means[c] = np.interp(levels, levels[present], sums[present] / counts[c][present])
+
+        return means, counts
@@ -3,12 +3,31 @@ import torch
 import cv2
 import os
 import json
+import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+from ..utils.curve_math import CurveMath
+from ..utils.lut_writer import LUTWriter
+from ..utils.preview_proxy import PreviewProxyCache
+
 class CurveMasterNode:
     # Variable de classe pour stocker les presets utilisateur en mémoire
     _user_presets = {}
     
+    # Histogrammes des modes automatiques, par empreinte de l'image analysée
+    # (partagés avec les aperçus des routes, exécutés dans d'autres threads : accès sous verrou)
+    _histogram_cache = OrderedDict()
+    _histogram_lock = threading.Lock()
+    HISTOGRAM_CACHE_SIZE = 32
+    AUTO_STRIDE = 8
+    
+    # LUTs 256 déjà générées (points + paramètres), partagées entre images et exécutions
+    _lut_cache = OrderedDict()
+    _lut_lock = threading.Lock()
+    LUT_CACHE_SIZE = 256
+    
     @classmethod
     def INPUT_TYPES(cls):
         # Charger les presets utilisateur au démarrage
@@ -40,7 +59,7 @@ class CurveMasterNode:
                     "multiline": False,
                     "widget": "curve_editor_blue"
                 }),
-                "interpolation": (["linear", "cubic", "catmull-rom"], {"default": "catmull-rom"}),
+                "interpolation": (["linear", "cubic", "catmull-rom", "bezier", "pchip"], {"default": "catmull-rom"}),
                 "strength": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 2.0, "step": 0.1}),
                 "preserve_luminosity": ("BOOLEAN", {"default": False}),
                 "blend_mode": (["normal", "multiply", "screen", "overlay", "soft_light"], {"default": "normal"}),
@@ -57,6 +76,21 @@ class CurveMasterNode:
                 "preset_user_name": ("STRING", {"default": "my_preset", "multiline": False}),
                 # Menu déroulant des presets utilisateur
                 "user_preset": (user_preset_list, {"default": "None"}),
+            },
+            "optional": {
+                # Export des courbes en LUT 1D (.cube), vide = pas d'export
+                "export_lut_path": ("STRING", {"default": "", "multiline": False}),
+                # Histogrammes entrée / sortie envoyés à l'éditeur
+                "output_histogram": ("BOOLEAN", {"default": False}),
+                "histogram_stride": ("INT", {"default": 4, "min": 1, "max": 16, "step": 1}),
+                # Courbes automatiques (remplacent les points correspondants)
+                "auto_mode": (["off", "auto_levels", "auto_contrast", "match_reference"], {"default": "off"}),
+                "auto_clip_percent": ("FLOAT", {"default": 0.5, "min": 0.0, "max": 5.0, "step": 0.1}),
+                "reference": ("IMAGE",),
+            },
+            "hidden": {
+                # Identifiant du nœud : clé du proxy de l'aperçu en direct
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -272,7 +306,9 @@ class CurveMasterNode:
     def apply_curve_master(self, image, curve_points_rgb, curve_points_red, curve_points_green, curve_points_blue, 
                           interpolation, strength, preserve_luminosity, blend_mode, opacity, gamma_correction,
                           curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping, 
-                          save_preset, preset_user_path, preset_user_name, user_preset):
+                          save_preset, preset_user_path, preset_user_name, user_preset, export_lut_path="",
+                          output_histogram=False, histogram_stride=4,
+                          auto_mode="off", auto_clip_percent=0.5, reference=None, unique_id=None):
         
         # SAUVEGARDER le preset seulement si save_preset est True
         if save_preset and preset_user_name and preset_user_name.strip() and preset_user_name != "my_preset":
@@ -319,51 +355,326 @@ class CurveMasterNode:
         
         print(f"🔧 Smoothing parameters: enabled={curve_smoothing}, strength={smoothing_strength}, iterations={smoothing_iterations}, anti_clipping={anti_clipping}")
         
-        # Gestion des dimensions du tensor
-        if len(image.shape) == 4:
-            batch_size = image.shape[0]
-            img_tensor = image[0]
-        else:
-            batch_size = 1
-            img_tensor = image
-        
-        # Conversion en numpy
-        img_np = (img_tensor.cpu().numpy() * 255).astype(np.uint8)
-        original_img = img_np.copy()
-        
-        # Parse des points de courbe pour chaque canal
-        points_rgb = self.parse_curve_points(curve_points_rgb)
-        points_red = self.parse_curve_points(curve_points_red)
-        points_green = self.parse_curve_points(curve_points_green)
-        points_blue = self.parse_curve_points(curve_points_blue)
-
-        # Génération des LUTs AVEC les paramètres de lissage
-        lut_rgb = self.generate_curve_lut(points_rgb, interpolation, strength, gamma_correction,
-                                         curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping)
-        lut_red = self.generate_curve_lut(points_red, interpolation, strength, gamma_correction,
-                                         curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping)
-        lut_green = self.generate_curve_lut(points_green, interpolation, strength, gamma_correction,
-                                           curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping)
-        lut_blue = self.generate_curve_lut(points_blue, interpolation, strength, gamma_correction,
-                                          curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping)
-
-        # Application des courbes multi-canaux
-        result = self.apply_multi_channel_curves(img_np, lut_rgb, lut_red, lut_green, lut_blue, preserve_luminosity)
+        # Gestion des dimensions du tensor (tout le batch est traité)
+        img_np = (image.cpu().numpy() * 255).astype(np.uint8)
+        if img_np.ndim == 3:
+            img_np = img_np[np.newaxis]
+        batch_size = img_np.shape[0]
+        
+        # Courbes automatiques : points dérivés des histogrammes, puis chemin habituel des courbes
+        if auto_mode != "off":
+            auto_points = self.auto_curve_points(img_np, auto_mode, auto_clip_percent, reference)
+            if auto_points:
+                print(f"🔧 Auto curves ({auto_mode}): {auto_points}")
+                curve_points_rgb = auto_points.get('rgb', curve_points_rgb)
+                curve_points_red = auto_points.get('red', curve_points_red)
+                curve_points_green = auto_points.get('green', curve_points_green)
+                curve_points_blue = auto_points.get('blue', curve_points_blue)
+
+        # Proxy de l'entrée pour l'aperçu en direct de l'éditeur
+        if unique_id is not None:
+            PreviewProxyCache.store(str(unique_id), img_np[0])
+
+        # Tables par image (courbes éventuellement animées par images clés) AVEC les paramètres de lissage
+        tables = self.build_frame_tables(
+            curve_points_rgb, curve_points_red, curve_points_green, curve_points_blue, batch_size,
+            interpolation, strength, gamma_correction,
+            curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping)
+
+        # Export des courbes combinées en LUT 1D (image 0 si les courbes sont animées)
+        if export_lut_path and export_lut_path.strip():
+            if preserve_luminosity or blend_mode != "normal" or opacity < 1.0:
+                print("⚠️ 1D LUT export: preserve_luminosity, blend mode and opacity are not part of the exported curves")
+            self.export_curves_table(export_lut_path.strip(), tables[0])
+
+        # Application des courbes multi-canaux : une seule indexation pour tout le batch
+        result = self.apply_curve_tables(img_np, tables, preserve_luminosity)
         
         # Application du mode de fusion et opacité
         if blend_mode != "normal" or opacity < 1.0:
-            result = self.apply_blend_mode(original_img, result, blend_mode, opacity)
+            result = self.apply_blend_mode(img_np, result, blend_mode, opacity)
 
         # Reconversion en tensor
         result_tensor = torch.from_numpy(result.astype(np.float32) / 255.0)
         
-        if batch_size > 1:
-            result_tensor = result_tensor.unsqueeze(0).repeat(batch_size, 1, 1, 1)
-        else:
-            result_tensor = result_tensor.unsqueeze(0)
+        if output_histogram:
+            # Calculé sur les tableaux uint8 déjà présents (vues sous-échantillonnées, sans copie d'image)
+            histogram = {
+                "stride": histogram_stride,
+                "input": self.compute_histograms(img_np, histogram_stride),
+                "output": self.compute_histograms(result, histogram_stride),
+                "waveform": self.compute_waveform(result, histogram_stride),
+            }
+            return {"ui": {"histogram": [histogram]}, "result": (result_tensor,)}
         
         return (result_tensor,)
 
+    def parse_keyframes(self, curve_points_str):
+        """
+        Découpe une chaîne de courbe animée 'image:points|image:points'
+        (une chaîne sans ':' est une courbe fixe, image clé 0)
+        Returns:
+            Liste triée de (index d'image, chaîne de points)
+        """
+        if ':' not in curve_points_str:
+            return [(0, curve_points_str)]
+        
+        keyframes = {}
+        for part in curve_points_str.split('|'):
+            if ':' not in part:
+                continue
+            frame, points = part.split(':', 1)
+            try:
+                keyframes[max(int(frame.strip()), 0)] = points
+            except ValueError:
+                print(f"Erreur parsing image clé: {part}")
+        
+        return sorted(keyframes.items()) if keyframes else [(0, "0,0;255,255")]
+
+    def build_frame_tables(self, curve_points_rgb, curve_points_red, curve_points_green, curve_points_blue,
+                           frame_count, interpolation, strength, gamma_correction,
+                           curve_smoothing=False, smoothing_strength=0.5, smoothing_iterations=3, anti_clipping=True):
+        """
+        Tables combinées (courbe du canal puis courbe RGB) de chaque image du batch
+        Returns:
+            Tableau uint8 (frame_count, 256, 3)
+        """
+        frames = np.arange(frame_count)
+        channel_luts = []
+        
+        channel_keyframes = [self.parse_keyframes(curve_points)
+                             for curve_points in (curve_points_rgb, curve_points_red, curve_points_green, curve_points_blue)]
+        
+        # Toutes les courbes (canaux x images clés) compilées en un seul appel
+        all_luts = iter(self.generate_curve_luts(
+            [self.parse_curve_points(points) for keyframes in channel_keyframes for _, points in keyframes],
+            interpolation, strength, gamma_correction,
+            curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping))
+        
+        for keyframes in channel_keyframes:
+            key_frames = np.array([frame for frame, _ in keyframes], dtype=np.float64)
+            key_luts = np.array([next(all_luts) for _ in keyframes], dtype=np.float32)
+            
+            if len(keyframes) == 1:
+                channel_luts.append(np.broadcast_to(key_luts[0], (frame_count, 256)))
+                continue
+            
+            # Interpolation linéaire des tables entre images clés (maintien avant la première / après la dernière)
+            segment = np.clip(np.searchsorted(key_frames, frames, side='right') - 1, 0, len(key_frames) - 2)
+            weight = np.clip((frames - key_frames[segment]) / (key_frames[segment + 1] - key_frames[segment]), 0.0, 1.0)
+            luts = key_luts[segment] * (1 - weight[:, np.newaxis]) + key_luts[segment + 1] * weight[:, np.newaxis]
+            channel_luts.append(np.clip(np.rint(luts), 0, 255))
+        
+        lut_rgb, lut_red, lut_green, lut_blue = [lut.astype(np.intp) for lut in channel_luts]
+        
+        # Composition : courbe RGB appliquée après la courbe du canal
+        tables = np.stack([np.take_along_axis(lut_rgb, lut_channel, axis=1)
+                           for lut_channel in (lut_red, lut_green, lut_blue)], axis=-1)
+        return tables.astype(np.uint8)
+
+    def apply_curve_tables(self, images, tables, preserve_luminosity=False):
+        """
+        Applique les tables de chaque image en une seule indexation (B, 256, 3)
+        Args:
+            images: Batch uint8 RGB (B, H, W, 3)
+            tables: Tables uint8 (B, 256, 3)
+            preserve_luminosity: Conserve la valeur HSV de l'original
+        Returns:
+            Batch uint8 RGB
+        """
+        # Les images aux tables identiques partagent la même table
+        unique_tables, inverse = np.unique(tables.reshape(len(tables), -1), axis=0, return_inverse=True)
+        inverse = np.asarray(inverse).reshape(-1)
+        flat_tables = unique_tables.reshape(-1, 256, 3).transpose(0, 2, 1).ravel()
+        
+        offsets = (inverse[:, np.newaxis] * 3 + np.arange(3)) * 256
+        index_type = np.uint16 if flat_tables.size <= np.iinfo(np.uint16).max + 1 else np.int64
+        indices = images.astype(index_type)
+        indices += offsets[:, np.newaxis, np.newaxis, :].astype(index_type)
+        result = flat_tables[indices]
+
+        if preserve_luminosity:
+            for b in range(len(result)):
+                original_hsv = cv2.cvtColor(images[b], cv2.COLOR_RGB2HSV)
+                result_hsv = cv2.cvtColor(result[b], cv2.COLOR_RGB2HSV)
+                result_hsv[:, :, 2] = original_hsv[:, :, 2]
+                result[b] = cv2.cvtColor(result_hsv, cv2.COLOR_HSV2RGB)
+
+        return result
+
+    def render_preview(self, image, settings):
+        """
+        Aperçu en direct : applique les réglages de l'éditeur sur un proxy
+        Args:
+            image: Proxy uint8 RGB
+            settings: Valeurs des widgets envoyées par l'éditeur
+        Returns:
+            Image uint8 RGB
+        """
+        settings = dict(settings)
+        
+        # Même priorité que le nœud : un preset utilisateur sélectionné remplace les widgets
+        user_preset = settings.get('user_preset', "None")
+        if user_preset != "None" and user_preset in self._user_presets:
+            settings.update(self._user_presets[user_preset])
+        
+        # Courbes animées : l'aperçu montre l'image 0 (le proxy vient de la première image)
+        tables = self.build_frame_tables(
+            settings.get('curve_points_rgb', "0,0;255,255"),
+            settings.get('curve_points_red', "0,0;255,255"),
+            settings.get('curve_points_green', "0,0;255,255"),
+            settings.get('curve_points_blue', "0,0;255,255"),
+            1,
+            settings.get('interpolation', "catmull-rom"),
+            float(settings.get('strength', 1.0)),
+            float(settings.get('gamma_correction', 1.0)),
+            bool(settings.get('curve_smoothing', False)),
+            float(settings.get('smoothing_strength', 0.5)),
+            int(settings.get('smoothing_iterations', 3)),
+            bool(settings.get('anti_clipping', True)))
+        
+        result = self.apply_curve_tables(image[np.newaxis], tables, bool(settings.get('preserve_luminosity', False)))[0]
+        
+        blend_mode = settings.get('blend_mode', "normal")
+        opacity = float(settings.get('opacity', 1.0))
+        if blend_mode != "normal" or opacity < 1.0:
+            result = self.apply_blend_mode(image, result, blend_mode, opacity)
+        
+        return result
+
+    def cached_histograms(self, image):
+        """
+        Histogrammes rouge / vert / bleu / luma sous-échantillonnés, en cache par empreinte
+        Args:
+            image: Image ou batch uint8 RGB (..., H, W, 3)
+        Returns:
+            Tableau (4, 256) de comptes
+        """
+        sample = np.ascontiguousarray(image[..., ::self.AUTO_STRIDE, ::self.AUTO_STRIDE, :])
+        key = hashlib.blake2b(sample.data, digest_size=16)
+        key.update(str(image.shape).encode())
+        key = key.hexdigest()
+        
+        cache = CurveMasterNode._histogram_cache
+        with CurveMasterNode._histogram_lock:
+            histograms = cache.get(key)
+            if histograms is not None:
+                cache.move_to_end(key)
+                return histograms
+        
+        histograms = self.compute_histograms(sample)
+        histograms = np.array([histograms[name] for name in ("red", "green", "blue", "luma")])
+        
+        with CurveMasterNode._histogram_lock:
+            cache[key] = histograms
+            while len(cache) > self.HISTOGRAM_CACHE_SIZE:
+                cache.popitem(last=False)
+        return histograms
+
+    def format_curve_points(self, points):
+        """Points normalisés -> chaîne 'x,y;x,y' (échelle 0-255)"""
+        return ";".join(f"{round(x * 255, 2):g},{round(y * 255, 2):g}" for x, y in points)
+
+    def auto_curve_points(self, image, auto_mode, clip_percent=0.5, reference=None):
+        """
+        Points de contrôle automatiques
+        Args:
+            image: Image ou batch uint8 RGB analysé
+            auto_mode: auto_levels (par canal), auto_contrast (courbe RGB sur la luma)
+                       ou match_reference (CDF par canal vers l'image de référence)
+            clip_percent: Écrêtage aux extrémités (auto_levels / auto_contrast)
+            reference: Tensor IMAGE de référence (match_reference)
+        Returns:
+            Dictionnaire canal -> chaîne de points (vide si rien à faire)
+        """
+        histograms = self.cached_histograms(image)
+        channels = ("red", "green", "blue")
+        
+        if auto_mode == "auto_levels":
+            return {name: self.format_curve_points(CurveMath.levels_points(histograms[c], clip_percent))
+                    for c, name in enumerate(channels)}
+        
+        if auto_mode == "auto_contrast":
+            return {"rgb": self.format_curve_points(CurveMath.levels_points(histograms[3], clip_percent))}
+        
+        if auto_mode == "match_reference":
+            if reference is None:
+                print("⚠️ Auto curves: match_reference needs a reference image")
+                return {}
+            reference_np = (reference.cpu().numpy() * 255).astype(np.uint8)
+            reference_histograms = self.cached_histograms(reference_np)
+            return {name: self.format_curve_points(
+                        CurveMath.histogram_match_points(histograms[c], reference_histograms[c]))
+                    for c, name in enumerate(channels)}
+        
+        return {}
+
+    # Luma Rec.709 en entiers (poids sur 256)
+    LUMA_WEIGHTS = (54, 183, 19)
+    WAVEFORM_COLUMNS = 64
+    WAVEFORM_LEVELS = 64
+
+    def _luma(self, pixels):
+        """Luma 8 bits de pixels uint8 (N, 3)"""
+        weights = np.array(self.LUMA_WEIGHTS, dtype=np.uint32)
+        return (pixels.astype(np.uint32) @ weights) >> 8
+
+    def compute_histograms(self, image, stride=1):
+        """
+        Histogrammes 256 niveaux des canaux et de la luma (un pixel sur stride par axe)
+        Args:
+            image: Image ou batch uint8 RGB (..., H, W, 3)
+            stride: Pas de sous-échantillonnage
+        Returns:
+            Dictionnaire red / green / blue / luma de listes de 256 comptes
+        """
+        pixels = image[..., ::stride, ::stride, :].reshape(-1, 3)
+        
+        # Un seul bincount pour les trois canaux (décalage de 256 par canal)
+        counts = np.bincount((pixels + np.array([0, 256, 512], dtype=np.uint16)).ravel(), minlength=768)
+        luma = np.bincount(self._luma(pixels), minlength=256)
+        
+        return {
+            "red": counts[:256].tolist(),
+            "green": counts[256:512].tolist(),
+            "blue": counts[512:].tolist(),
+            "luma": luma[:256].tolist(),
+        }
+
+    def compute_waveform(self, image, stride=1):
+        """
+        Forme d'onde de la luma : comptes par (colonne, niveau)
+        Args:
+            image: Image ou batch uint8 RGB (..., H, W, 3)
+            stride: Pas de sous-échantillonnage
+        Returns:
+            Liste de WAVEFORM_COLUMNS listes de WAVEFORM_LEVELS comptes
+        """
+        sample = image[..., ::stride, ::stride, :]
+        width = sample.shape[-2]
+        height = sample.size // (3 * width)
+        
+        columns = (np.arange(width) * self.WAVEFORM_COLUMNS // width).astype(np.int64)
+        levels = self._luma(sample.reshape(-1, 3)) * self.WAVEFORM_LEVELS >> 8
+        cells = np.tile(columns, height) * self.WAVEFORM_LEVELS + levels
+        
+        waveform = np.bincount(cells, minlength=self.WAVEFORM_COLUMNS * self.WAVEFORM_LEVELS)
+        return waveform.reshape(self.WAVEFORM_COLUMNS, self.WAVEFORM_LEVELS).tolist()
+
+    def export_curves_table(self, file_path, table):
+        """Exporte une table combinée (256, 3) en LUT 1D .cube"""
+        file_path = Path(file_path)
+        if file_path.suffix.lower() != ".cube":
+            file_path = file_path.with_name(file_path.name + ".cube")
+        
+        try:
+            LUTWriter.write_cube_1d(table.astype(np.float64) / 255.0, file_path, title=file_path.stem)
+            print(f"✅ Curves exported as 1D LUT: {file_path}")
+            return str(file_path)
+        except Exception as e:
+            print(f"❌ Error exporting 1D LUT: {e}")
+            return None
+
     def parse_curve_points(self, curve_points_str):
         """Parse la chaîne de points de courbe en array numpy"""
         try:
@@ -389,57 +700,70 @@ class CurveMasterNode:
     def generate_curve_lut(self, points, interpolation, strength, gamma_correction, 
                           curve_smoothing=False, smoothing_strength=0.5, smoothing_iterations=3, anti_clipping=True):
         """Génère une LUT 256 à partir des points de contrôle avec lissage optionnel"""
-        
-        # Appliquer le lissage sur les points si demandé
-        if curve_smoothing and len(points) > 2:
-            points = self.smooth_curve_points(points, smoothing_strength, smoothing_iterations, anti_clipping)
-        
-        lut = np.zeros(256, dtype=np.float32)
-        xs = points[:, 0] * 255
-        ys = points[:, 1] * 255
+        return self.generate_curve_luts([points], interpolation, strength, gamma_correction, curve_smoothing,
+                                        smoothing_strength, smoothing_iterations, anti_clipping)[0]
 
-        for i in range(256):
-            x = float(i)
+    def generate_curve_luts(self, points_list, interpolation, strength, gamma_correction,
+                            curve_smoothing=False, smoothing_strength=0.5, smoothing_iterations=3, anti_clipping=True):
+        """
+        Génère les LUT 256 de plusieurs courbes (canaux, images clés) en une seule évaluation
+        Returns:
+            Liste de LUT uint8 (256,) en lecture seule, dans l'ordre de points_list
+        """
+        cache = CurveMasterNode._lut_cache
+        settings = (interpolation, strength, gamma_correction,
+                    curve_smoothing, smoothing_strength, smoothing_iterations, anti_clipping)
+        keys = [(np.asarray(points, dtype=np.float64).tobytes(),) + settings for points in points_list]
+        
+        # Tables trouvées dans le cache, relues ensuite depuis ce dictionnaire local (une autre
+        # exécution peut évincer une entrée entre-temps) ; courbes absentes une seule fois chacune
+        found = {}
+        with CurveMasterNode._lut_lock:
+            for key in keys:
+                lut = cache.get(key)
+                if lut is not None:
+                    cache.move_to_end(key)
+                    found[key] = lut
+        
+        missing = {}
+        for key, points in zip(keys, points_list):
+            if key not in found and key not in missing:
+                # Appliquer le lissage sur les points si demandé
+                if curve_smoothing and len(points) > 2:
+                    points = self.smooth_curve_points(points, smoothing_strength, smoothing_iterations, anti_clipping)
+                missing[key] = np.asarray(points, dtype=np.float64) * 255
+        
+        if missing:
+            # Bézier : points de contrôle de la courbe ; pchip : monotone entre points monotones ;
+            # cubic et catmull-rom passent par les points
+            method = {"linear": 'linear', "bezier": 'bezier', "pchip": 'pchip'}.get(interpolation, 'catmull_rom')
+            curves = CurveMath.evaluate_curves(list(missing.values()), method=method, samples=np.arange(256.0))
             
-            if x <= xs[0]:
-                y = ys[0]
-            elif x >= xs[-1]:
-                y = ys[-1]
-            else:
-                idx = np.searchsorted(xs, x) - 1
-                idx = np.clip(idx, 0, len(xs) - 2)
-
-                x0, x1 = xs[idx], xs[idx + 1]
-                y0, y1 = ys[idx], ys[idx + 1]
-
-                t = (x - x0) / (x1 - x0) if x1 != x0 else 0
-
-                if interpolation == "linear" or len(points) < 4:
-                    y = y0 + t * (y1 - y0)
-                else:
-                    p0 = ys[max(idx - 1, 0)]
-                    p1 = y0
-                    p2 = y1
-                    p3 = ys[min(idx + 2, len(ys) - 1)]
-                    y = self.catmull_rom(t, p0, p1, p2, p3)
-
+            # Valeurs hors [0, 255] ramenées avant les puissances (évite les NaN)
+            curves = np.clip(curves, 0, 255)
             if strength != 1.0:
-                y_norm = y / 255.0
-                y_norm = np.power(y_norm, 1.0 / strength)
-                y = y_norm * 255.0
-            
+                curves = np.power(curves / 255.0, 1.0 / strength) * 255.0
             if gamma_correction != 1.0:
-                y_norm = y / 255.0
-                y_norm = np.power(y_norm, gamma_correction)
-                y = y_norm * 255.0
-
-            lut[i] = np.clip(y, 0, 255)
-
-        # Appliquer un lissage supplémentaire sur la LUT finale si demandé
-        if curve_smoothing:
-            lut = self.apply_curve_smoothing_filter(lut.astype(np.uint8), smoothing_strength * 0.5)
+                curves = np.power(curves / 255.0, gamma_correction) * 255.0
+            # Tolérance d'arrondi avant la troncature : produit matriciel et évaluation directe donnent la même table
+            curves = np.clip(curves + 1e-6, 0, 255).astype(np.float32)
+            
+            for key, lut in zip(missing, curves):
+                # Appliquer un lissage supplémentaire sur la LUT finale si demandé
+                if curve_smoothing:
+                    lut = self.apply_curve_smoothing_filter(lut.astype(np.uint8), smoothing_strength * 0.5)
+                
+                lut = lut.astype(np.uint8)
+                lut.flags.writeable = False
+                found[key] = lut
+            
+            with CurveMasterNode._lut_lock:
+                for key in missing:
+                    cache[key] = found[key]
+                while len(cache) > self.LUT_CACHE_SIZE:
+                    cache.popitem(last=False)
         
-        return lut.astype(np.uint8)
+        return [found[key] for key in keys]
 
     def catmull_rom(self, t, p0, p1, p2, p3):
         """Interpolation Catmull-Rom"""
@@ -0,0 +1,28 @@
+import torch
+
+from ..utils.lut_parser import LUTParser
+
+class HaldPatternNode:
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "hald_level": ("INT", {"default": 8, "min": 2, "max": 12, "step": 1}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "INT")
+    RETURN_NAMES = ("hald_image", "lut_size")
+    FUNCTION = "generate_pattern"
+    CATEGORY = "Curve Master"
+
+    def generate_pattern(self, hald_level):
+        """Génère une image Hald identité à faire passer dans la transformation à capturer"""
+        pattern = LUTParser.hald_identity(hald_level)
+        lut_size = hald_level * hald_level
+        
+        print(f"🧊 Hald identity pattern: level {hald_level}, {pattern.shape[1]}x{pattern.shape[0]} "
+              f"({lut_size}³ LUT)")
+        
+        return (torch.from_numpy(pattern).unsqueeze(0), lut_size)
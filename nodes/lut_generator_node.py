@@ -1,13 +1,19 @@
 import numpy as np
 import torch
-import cv2
 import os
 import json
 from pathlib import Path
 from scipy.interpolate import griddata
-from scipy.spatial import cKDTree
 import time
 
+from ..utils.lattice_regression import LatticeRegression
+from ..utils.lut_statistics import LUTStatistics
+from ..utils.lut_parser import LUTParser
+from ..utils.compiled_lut import CompiledLUT
+from ..utils.lut_writer import LUTWriter
+from ..utils.parametric_lut import ParametricLUT
+from ..utils.interpolation import Interpolation
+
 class LUTGeneratorNode:
     
     @classmethod
@@ -19,23 +25,45 @@ class LUTGeneratorNode:
                 "lut_size": ("INT", {"default": 17, "min": 9, "max": 65, "step": 2}),
                 "sample_count": ("INT", {"default": 5000, "min": 1000, "max": 50000, "step": 1000}),
                 "processing_scale": ("FLOAT", {"default": 0.5, "min": 0.1, "max": 1.0, "step": 0.1}),
-                "interpolation_method": (["linear", "nearest", "cubic"], {"default": "linear"}),
+                "interpolation_method": (["linear", "nearest", "cubic", "regression", "hald_exact"], {"default": "linear"}),
                 "smoothing_factor": ("FLOAT", {"default": 0.1, "min": 0.0, "max": 1.0, "step": 0.1}),
-                "export_format": (["cube", "3dl", "csp"], {"default": "cube"}),
+                "export_format": (["cube", "3dl", "csp", "hald"], {"default": "cube"}),
                 "export_path": ("STRING", {"default": "./luts/generated", "multiline": False}),
                 "lut_name": ("STRING", {"default": "generated_lut", "multiline": False}),
+            },
+            "optional": {
+                "save_statistics": ("BOOLEAN", {"default": False}),
+                "refine_from_statistics": ("BOOLEAN", {"default": False}),
+                "auto_lut_size": ("BOOLEAN", {"default": False}),
+                "error_tolerance": ("FLOAT", {"default": 0.01, "min": 0.001, "max": 0.1, "step": 0.001}),
+                "background_export": ("BOOLEAN", {"default": True}),
+                "parametric_analysis": ("BOOLEAN", {"default": False}),
+                # nearest : paires de pixels réellement mesurées ; area : moyenne par bloc (moins de bruit)
+                "downsample_method": (["nearest", "area"], {"default": "nearest"}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "STRING")
-    RETURN_NAMES = ("preview_image", "lut_path")
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING")
+    RETURN_NAMES = ("preview_image", "lut_path", "lut_info")
     FUNCTION = "generate_lut"
     CATEGORY = "Curve Master"
 
+    # Nombre de paires converties à la fois (mémoire constante quelle que soit la taille du batch)
+    FRAME_CHUNK = 8
+    # Résolution par axe des cellules d'accumulation des statistiques
+    STATISTICS_BINS = 64
+    # Tailles essayées en mode automatique, de la plus petite à la plus grande
+    AUTO_LUT_SIZES = [9, 17, 25, 33, 49, 65]
+    # Part des cellules réservées à la mesure de l'erreur en mode automatique
+    HOLDOUT_FRACTION = 0.1
+
     def generate_lut(self, image_before, image_after, lut_size, sample_count, processing_scale, 
-                    interpolation_method, smoothing_factor, export_format, export_path, lut_name):
+                    interpolation_method, smoothing_factor, export_format, export_path, lut_name,
+                    save_statistics=False, refine_from_statistics=False, auto_lut_size=False,
+                    error_tolerance=0.01, background_export=True, parametric_analysis=False,
+                    downsample_method="nearest"):
         
-        print(f"🔧 Starting LUT generation: {lut_size}³ with {sample_count} samples")
+        print(f"🔧 Starting LUT generation: {lut_size}³ with {sample_count} samples per pair")
         start_time = time.time()
         
         # Validation des images
@@ -43,58 +71,247 @@ class LUTGeneratorNode:
             raise ValueError("Images must have the same dimensions")
         
         # Gestion des dimensions du tensor
-        if len(image_before.shape) == 4:
-            img_before = image_before[0].cpu().numpy()
-            img_after = image_after[0].cpu().numpy()
+        if len(image_before.shape) == 3:
+            image_before = image_before.unsqueeze(0)
+            image_after = image_after.unsqueeze(0)
+        
+        if interpolation_method == "hald_exact":
+            # Motif Hald traité : lecture directe du treillis, sans ajustement
+            lut_3d = self._extract_hald_lut(image_before, image_after)
+            lut_size = lut_3d.shape[0]
+            lut_info = f"Size: {lut_size}³, Method: hald_exact"
         else:
-            img_before = image_before.cpu().numpy()
-            img_after = image_after.cpu().numpy()
-        
-        # Redimensionnement pour optimiser les performances
-        if processing_scale < 1.0:
-            h, w = img_before.shape[:2]
-            new_h, new_w = int(h * processing_scale), int(w * processing_scale)
-            img_before = cv2.resize(img_before, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-            img_after = cv2.resize(img_after, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-            print(f"📏 Images resized to {new_w}x{new_h} for processing")
-        
-        # Génération optimisée de la LUT
-        lut_3d = self._generate_lut_optimized(img_before, img_after, lut_size, sample_count, 
-                                            interpolation_method, smoothing_factor)
-        
-        # Export de la LUT
-        lut_file_path = self._export_lut(lut_3d, export_format, export_path, lut_name, lut_size)
+            # Accumulation des statistiques sur toutes les paires du batch
+            stats = self._accumulate_statistics(image_before, image_after, sample_count, processing_scale,
+                                                downsample_method)
+            
+            # Affinage incrémental : ajouter les statistiques sauvegardées lors des exports précédents
+            stats_path = self._statistics_path(export_path, lut_name)
+            if refine_from_statistics:
+                stats = self._merge_saved_statistics(stats, stats_path)
+            
+            if save_statistics:
+                if background_export:
+                    LUTWriter.submit_export(stats_path, stats.save, stats_path)
+                    print(f"⏳ Fit statistics queued for: {stats_path}")
+                else:
+                    stats.save(stats_path)
+                    print(f"💾 Fit statistics saved to: {stats_path}")
+            
+            # Génération optimisée de la LUT (résolution unique à la fin)
+            if auto_lut_size:
+                lut_3d, lut_info = self._generate_lut_auto(stats, interpolation_method, smoothing_factor,
+                                                           error_tolerance)
+                lut_size = lut_3d.shape[0]
+            else:
+                lut_3d = self._generate_lut_optimized(stats, lut_size, interpolation_method, smoothing_factor)
+                lut_info = f"Size: {lut_size}³, Method: {interpolation_method}"
+        
+        if parametric_analysis:
+            # Forme compacte courbes -> matrice -> courbes : ajustée sur les échantillons mesurés si disponibles
+            if interpolation_method == "hald_exact":
+                parametric = ParametricLUT.from_compiled(CompiledLUT(lut_3d))
+            else:
+                before_samples, after_samples, counts = stats.centroids()
+                parametric = ParametricLUT.fit(before_samples, after_samples, counts)
+            lut_info += f", Parametric fit: max error {parametric.max_error:.4f}, mean error {parametric.mean_error:.4f}"
+        
+        # Export de la LUT (image Hald : taille de treillis carrée obligatoire)
+        export_lut = lut_3d
+        if export_format == "hald" and LUTWriter.hald_size(lut_size) != lut_size:
+            hald_size = LUTWriter.hald_size(lut_size)
+            export_lut = self._resample_lattice(lut_3d, hald_size)
+            lut_info += f", Hald export resampled from {lut_size}³ to {hald_size}³"
+        lut_file_path = self._export_lut(export_lut, export_format, export_path, lut_name, export_lut.shape[0],
+                                         background_export)
+        lut_info += f", Export: {'queued' if background_export else 'written'}"
         
         # Génération de l'image de prévisualisation
         preview_image = self._generate_preview(lut_3d, lut_size)
         
         elapsed_time = time.time() - start_time
         print(f"✅ LUT generation completed in {elapsed_time:.2f} seconds")
-        print(f"📁 LUT saved to: {lut_file_path}")
+        if background_export:
+            print(f"⏳ LUT export queued to: {lut_file_path}")
+        else:
+            print(f"📁 LUT saved to: {lut_file_path}")
+        
+        return (preview_image, lut_file_path, lut_info)
+
+    def _accumulate_statistics(self, image_before, image_after, sample_count, processing_scale,
+                               downsample_method="nearest"):
+        """Accumule les statistiques par cellule de toutes les paires, par paquets d'images"""
+        
+        stats = LUTStatistics(self.STATISTICS_BINS)
+        batch_size = image_before.shape[0]
+        
+        print(f"🔄 Sampling pixels from {batch_size} image pair(s)...")
+        
+        for start in range(0, batch_size, self.FRAME_CHUNK):
+            end = min(start + self.FRAME_CHUNK, batch_size)
+            chunk_before = image_before[start:end].cpu().numpy()
+            chunk_after = image_after[start:end].cpu().numpy()
+            
+            # Redimensionnement pour optimiser les performances : avant et après empilés (6 canaux)
+            # pour être réduits ensemble, images du paquet en parallèle
+            if processing_scale < 1.0:
+                pairs = Interpolation.resample_frames(np.concatenate([chunk_before, chunk_after], axis=-1),
+                                                      Interpolation.resize, scale=processing_scale,
+                                                      method=downsample_method)
+                chunk_before = [pair[..., :3] for pair in pairs]
+                chunk_after = [pair[..., 3:] for pair in pairs]
+            
+            for img_before, img_after in zip(chunk_before, chunk_after):
+                before_samples, after_samples = self._sample_pixels(img_before, img_after, sample_count)
+                stats.add_samples(before_samples, after_samples)
+        
+        occupied = len(stats.occupied_cells())
+        spread = np.sqrt(stats.target_variance()).mean() if occupied else 0.0
+        print(f"📊 Accumulated {int(stats.total_count)} samples into {occupied} cells "
+              f"(mean target spread per cell: {spread:.4f})")
         
-        return (preview_image, lut_file_path)
+        return stats
 
-    def _generate_lut_optimized(self, img_before, img_after, lut_size, sample_count, 
-                               interpolation_method, smoothing_factor):
-        """Génération optimisée de LUT avec échantillonnage intelligent"""
+    def _extract_hald_lut(self, image_before, image_after):
+        """Extrait exactement la LUT d'un motif Hald identité passé dans la transformation"""
+        hald_before = image_before[0].cpu().numpy()
+        hald_after = image_after[0].cpu().numpy()
         
-        print("🔄 Sampling pixels...")
+        try:
+            lut_3d = LUTParser.hald_to_lut(hald_after)
+        except ValueError as e:
+            raise ValueError(f"hald_exact needs a processed Hald pattern as image_after: {e}") from e
+        lut_size = lut_3d.shape[0]
+        
+        # L'image "avant" doit être le motif identité du même niveau (formes comparées avant les valeurs)
+        level = int(round(lut_size ** 0.5))
+        identity = LUTParser.hald_identity(level)
+        if hald_before.shape[:2] != identity.shape[:2] or hald_before.shape[2] < 3:
+            raise ValueError(f"hald_exact: image_before ({hald_before.shape[1]}x{hald_before.shape[0]}) is not "
+                             f"a level {level} Hald pattern ({identity.shape[1]}x{identity.shape[0]})")
+        if np.abs(hald_before[..., :3] - identity).max() > 1.0 / 255.0:
+            raise ValueError(f"hald_exact: image_before is not the level {level} identity Hald pattern; "
+                             f"use a fitting method for arbitrary image pairs")
+        
+        print(f"🧊 Extracted {lut_size}³ LUT from processed Hald pattern")
+        return np.clip(lut_3d, 0, 1)
+
+    def _statistics_path(self, export_path, lut_name):
+        """Chemin du fichier de statistiques associé à la LUT exportée"""
+        return Path(export_path) / f"{lut_name}.lutstats.npz"
+
+    def _merge_saved_statistics(self, stats, stats_path):
+        """Fusionne les statistiques sauvegardées avec celles du lot courant"""
+        # Une sauvegarde encore en file d'attente (export en arrière-plan) doit être terminée
+        LUTWriter.wait_for_export(stats_path)
         
-        # Échantillonnage intelligent des pixels
+        if not stats_path.exists():
+            print(f"⚠️ No saved statistics at {stats_path}, starting from scratch")
+            return stats
+        
+        try:
+            saved = LUTStatistics.load(stats_path)
+            saved.merge(stats)
+        except Exception as e:
+            print(f"❌ Could not reuse saved statistics: {e}")
+            return stats
+        
+        print(f"♻️ Refining from saved statistics: {int(saved.total_count)} samples in total")
+        return saved
+
+    def _sample_pixels(self, img_before, img_after, sample_count):
+        """Échantillonnage intelligent des pixels d'une paire d'images"""
         h, w = img_before.shape[:2]
         total_pixels = h * w
         
         if sample_count >= total_pixels:
             # Utiliser tous les pixels si l'échantillon est plus grand que l'image
-            before_samples = img_before.reshape(-1, 3)
-            after_samples = img_after.reshape(-1, 3)
+            return img_before.reshape(-1, 3), img_after.reshape(-1, 3)
+        
+        # Échantillonnage stratifié pour une meilleure distribution
+        indices = self._stratified_sampling(img_before, sample_count)
+        return img_before.reshape(-1, 3)[indices], img_after.reshape(-1, 3)[indices]
+
+    def _generate_lut_optimized(self, stats, lut_size, interpolation_method, smoothing_factor):
+        """Génération optimisée de LUT à partir des statistiques accumulées"""
+        
+        # Une correspondance moyenne par cellule occupée (remplace la suppression des doublons)
+        before_samples, after_samples, counts = stats.centroids()
+        
+        print(f"📊 Using {len(before_samples)} cell centroids")
+        
+        return self._fit_lattice(before_samples, after_samples, counts, lut_size,
+                                 interpolation_method, smoothing_factor)
+
+    def _generate_lut_auto(self, stats, interpolation_method, smoothing_factor, error_tolerance):
+        """Choisit la plus petite taille de LUT dont l'erreur sur les cellules réservées respecte la tolérance"""
+        
+        before_samples, after_samples, counts = stats.centroids()
+        
+        # Cellules réservées (tirage déterministe) pour mesurer l'erreur hors apprentissage
+        order = np.random.default_rng(0).permutation(len(before_samples))
+        holdout_count = int(len(order) * self.HOLDOUT_FRACTION)
+        if holdout_count < 10:
+            print("⚠️ Too few cells for a held-out set, measuring the error on the fitted samples")
+            train, holdout = order, order
         else:
-            # Échantillonnage stratifié pour une meilleure distribution
-            indices = self._stratified_sampling(img_before, sample_count)
-            before_samples = img_before.reshape(-1, 3)[indices]
-            after_samples = img_after.reshape(-1, 3)[indices]
+            train, holdout = order[holdout_count:], order[:holdout_count]
+        
+        best = None
+        previous_lut = None
         
-        print(f"📊 Using {len(before_samples)} sample points")
+        for lut_size in self.AUTO_LUT_SIZES:
+            # Réutilisation du niveau précédent comme point de départ du solveur
+            initial_lut = self._resample_lattice(previous_lut, lut_size) if previous_lut is not None else None
+            
+            lut_3d = self._fit_lattice(before_samples[train], after_samples[train], counts[train], lut_size,
+                                       interpolation_method, smoothing_factor, initial_lut)
+            error = self._lattice_error(lut_3d, before_samples[holdout], after_samples[holdout], counts[holdout])
+            print(f"📐 Size {lut_size}³: held-out RMS error {error:.5f}")
+            
+            if best is None or error < best[1]:
+                best = (lut_size, error, lut_3d)
+            if error <= error_tolerance:
+                break
+            previous_lut = lut_3d
+        
+        lut_size, error, train_lut = best
+        if error > error_tolerance:
+            print(f"⚠️ Tolerance {error_tolerance} not reached, using best size {lut_size}³")
+        
+        # Ajustement final sur toutes les cellules
+        lut_3d = self._fit_lattice(before_samples, after_samples, counts, lut_size,
+                                   interpolation_method, smoothing_factor, train_lut)
+        
+        lut_info = (f"Size: {lut_size}³ (auto), Method: {interpolation_method}, "
+                    f"Held-out RMS error: {error:.5f}, Tolerance: {error_tolerance}")
+        print(f"✅ Auto LUT size: {lut_size}³")
+        
+        return lut_3d, lut_info
+
+    def _resample_lattice(self, lut_3d, lut_size):
+        """Rééchantillonne un treillis à une autre taille (interpolation trilinéaire)"""
+        coords = np.linspace(0, 1, lut_size)
+        r, g, b = np.meshgrid(coords, coords, coords, indexing='ij')
+        return Interpolation.trilinear_interpolation(lut_3d, r, g, b)
+
+    def _lattice_error(self, lut_3d, before_samples, after_samples, counts):
+        """Erreur RMS pondérée de la LUT sur des correspondances"""
+        predicted = Interpolation.trilinear_interpolation(
+            lut_3d, before_samples[:, 0], before_samples[:, 1], before_samples[:, 2])
+        squared = np.mean((predicted - after_samples) ** 2, axis=1)
+        return float(np.sqrt(np.sum(squared * counts) / np.sum(counts)))
+
+    def _fit_lattice(self, before_samples, after_samples, counts, lut_size, interpolation_method,
+                     smoothing_factor, initial_lut=None):
+        """Ajuste un treillis de taille donnée sur des correspondances pondérées"""
+        
+        # Régression sur le treillis : résolution directe, le lissage est intégré au problème
+        if interpolation_method == "regression":
+            print(f"🔄 Solving lattice regression (smoothing={smoothing_factor})...")
+            lut_3d = LatticeRegression.fit(before_samples, after_samples, lut_size, smoothing_factor,
+                                           weights=counts, initial_lut=initial_lut)
+            return np.clip(lut_3d, 0, 1)
         
         # Création de la grille 3D
         print("🏗️ Building 3D LUT grid...")
@@ -152,18 +369,15 @@ class LUTGeneratorNode:
     def _fast_interpolation(self, source_points, target_points, grid_points, method, smoothing):
         """Interpolation rapide avec optimisations"""
         
-        # Supprimer les doublons pour améliorer les performances
-        unique_indices = self._remove_duplicates(source_points)
-        source_unique = source_points[unique_indices]
-        target_unique = target_points[unique_indices]
-        
-        print(f"📊 Unique points: {len(source_unique)} / {len(source_points)}")
+        # Les points sont déjà uniques : une moyenne par cellule d'accumulation
+        source_unique = source_points
+        target_unique = target_points
         
         try:
             if method == "linear":
                 # Interpolation linéaire avec scipy
                 result = griddata(source_unique, target_unique, grid_points, 
-                                method='linear', fill_value=0, rescale=True)
+                                method='linear', fill_value=np.nan, rescale=True)
             elif method == "nearest":
                 # Plus rapide pour de gros datasets
                 result = griddata(source_unique, target_unique, grid_points, 
@@ -171,7 +385,7 @@ class LUTGeneratorNode:
             elif method == "cubic":
                 # Plus lent mais plus lisse
                 result = griddata(source_unique, target_unique, grid_points, 
-                                method='cubic', fill_value=0, rescale=True)
+                                method='cubic', fill_value=np.nan, rescale=True)
             
             # Gérer les valeurs NaN
             nan_mask = np.isnan(result).any(axis=1)
@@ -193,25 +407,6 @@ class LUTGeneratorNode:
             return griddata(source_unique, target_unique, grid_points, 
                           method='nearest', rescale=True)
 
-    def _remove_duplicates(self, points, tolerance=1e-6):
-        """Supprime les points dupliqués pour améliorer les performances"""
-        if len(points) < 1000:
-            return np.arange(len(points))  # Pas de nettoyage pour les petits datasets
-        
-        # Utiliser un arbre KD pour trouver les doublons rapidement
-        tree = cKDTree(points)
-        unique_indices = []
-        used = set()
-        
-        for i, point in enumerate(points):
-            if i not in used:
-                # Trouver tous les points proches
-                neighbors = tree.query_ball_point(point, tolerance)
-                unique_indices.append(i)
-                used.update(neighbors)
-        
-        return np.array(unique_indices)
-
     def _apply_smoothing(self, lut_values, grid_points, smoothing_factor):
         """Applique un lissage spatial à la LUT"""
         if smoothing_factor <= 0:
@@ -231,128 +426,50 @@ class LUTGeneratorNode:
         
         return lut_3d.reshape(-1, 3)
 
-    def _export_lut(self, lut_3d, format_type, export_path, lut_name, lut_size):
-        """Exporte la LUT dans le format spécifié"""
-        
-        # Créer le dossier d'export
-        export_dir = Path(export_path)
-        export_dir.mkdir(parents=True, exist_ok=True)
+    def _export_lut(self, lut_3d, format_type, export_path, lut_name, lut_size, background=False):
+        """Exporte la LUT dans le format spécifié (écriture vectorisée et atomique)"""
         
         # Nom du fichier avec extension
-        file_extension = {"cube": ".cube", "3dl": ".3dl", "csp": ".csp"}
-        file_path = export_dir / f"{lut_name}{file_extension[format_type]}"
+        file_extension = {"cube": ".cube", "3dl": ".3dl", "csp": ".csp", "hald": ".png"}
+        file_path = Path(export_path) / f"{lut_name}{file_extension[format_type]}"
         
         if format_type == "cube":
-            self._export_cube_format(lut_3d, file_path, lut_size)
+            writer, kwargs = LUTWriter.write_cube, {"title": lut_name}
         elif format_type == "3dl":
-            self._export_3dl_format(lut_3d, file_path, lut_size)
-        elif format_type == "csp":
-            self._export_csp_format(lut_3d, file_path, lut_size)
+            writer, kwargs = LUTWriter.write_3dl, {}
+        elif format_type == "hald":
+            writer, kwargs = LUTWriter.write_hald, {}
+        else:
+            writer, kwargs = LUTWriter.write_csp, {"title": lut_name}
+        
+        if background:
+            # Écriture en arrière-plan : les nœuds suivants n'ont besoin que du chemin
+            LUTWriter.submit_export(file_path, writer, lut_3d, file_path, **kwargs)
+        else:
+            writer(lut_3d, file_path, **kwargs)
         
         return str(file_path)
 
-    def _export_cube_format(self, lut_3d, file_path, lut_size):
-        """Export au format .cube (Adobe)"""
-        with open(file_path, 'w') as f:
-            f.write(f"# Generated by ComfyUI Curve Master\n")
-            f.write(f"# LUT size: {lut_size}x{lut_size}x{lut_size}\n")
-            f.write(f"LUT_3D_SIZE {lut_size}\n")
-            f.write(f"DOMAIN_MIN 0.0 0.0 0.0\n")
-            f.write(f"DOMAIN_MAX 1.0 1.0 1.0\n\n")
-            
-            for b in range(lut_size):
-                for g in range(lut_size):
-                    for r in range(lut_size):
-                        rgb = lut_3d[r, g, b]
-                        f.write(f"{rgb[0]:.6f} {rgb[1]:.6f} {rgb[2]:.6f}\n")
-
-    def _export_3dl_format(self, lut_3d, file_path, lut_size):
-        """Export au format .3dl (Autodesk)"""
-        with open(file_path, 'w') as f:
-            for b in range(lut_size):
-                for g in range(lut_size):
-                    for r in range(lut_size):
-                        rgb = lut_3d[r, g, b] * 4095  # 12-bit
-                        f.write(f"{int(rgb[0])} {int(rgb[1])} {int(rgb[2])}\n")
-
-    def _export_csp_format(self, lut_3d, file_path, lut_size):
-        """Export au format .csp (Rising Sun Research)"""
-        with open(file_path, 'w') as f:
-            f.write(f"CSPLUTV100\n")
-            f.write(f"3D\n")
-            f.write(f"{lut_size}\n")
-            
-            for r in range(lut_size):
-                for g in range(lut_size):
-                    for b in range(lut_size):
-                        rgb = lut_3d[r, g, b]
-                        f.write(f"{rgb[0]:.6f} {rgb[1]:.6f} {rgb[2]:.6f}\n")
-
     def _generate_preview(self, lut_3d, lut_size):
         """Génère une image de prévisualisation de la LUT"""
         
         # Créer une image de test avec dégradés
         preview_size = 256
-        preview = np.zeros((preview_size, preview_size, 3), dtype=np.float32)
+        ramp = np.linspace(0, 1, preview_size, dtype=np.float32)
+        x, y = np.meshgrid(ramp, ramp)
         
         # Dégradé horizontal (R), vertical (G), diagonal (B)
-        for y in range(preview_size):
-            for x in range(preview_size):
-                preview[y, x, 0] = x / (preview_size - 1)  # Rouge
-                preview[y, x, 1] = y / (preview_size - 1)  # Vert
-                preview[y, x, 2] = (x + y) / (2 * (preview_size - 1))  # Bleu
+        preview = np.stack([x, y, (x + y) / 2], axis=-1)
         
         # Appliquer la LUT à l'image de prévisualisation
         preview_transformed = self._apply_lut_to_image(preview, lut_3d, lut_size)
         
         # Convertir en tensor pour ComfyUI
-        preview_tensor = torch.from_numpy(preview_transformed).unsqueeze(0)
+        preview_tensor = torch.from_numpy(preview_transformed.astype(np.float32)).unsqueeze(0)
         
         return preview_tensor
 
     def _apply_lut_to_image(self, image, lut_3d, lut_size):
-        """Applique la LUT 3D à une image"""
-        
-        h, w = image.shape[:2]
-        flat_image = image.reshape(-1, 3)
-        
-        # Conversion des coordonnées RGB en indices de LUT
-        indices = flat_image * (lut_size - 1)
-        
-        # Interpolation trilinéaire
-        result = np.zeros_like(flat_image)
-        
-        for i, rgb in enumerate(indices):
-            # Indices entiers et fractions
-            r0, g0, b0 = np.floor(rgb).astype(int)
-            r1, g1, b1 = np.ceil(rgb).astype(int)
-            
-            # Contraindre les indices
-            r0, g0, b0 = np.clip([r0, g0, b0], 0, lut_size - 1)
-            r1, g1, b1 = np.clip([r1, g1, b1], 0, lut_size - 1)
-            
-            # Fractions pour l'interpolation
-            fr, fg, fb = rgb - np.floor(rgb)
-            
-            # Interpolation trilinéaire
-            c000 = lut_3d[r0, g0, b0]
-            c001 = lut_3d[r0, g0, b1]
-            c010 = lut_3d[r0, g1, b0]
-            c011 = lut_3d[r0, g1, b1]
-            c100 = lut_3d[r1, g0, b0]
-            c101 = lut_3d[r1, g0, b1]
-            c110 = lut_3d[r1, g1, b0]
-            c111 = lut_3d[r1, g1, b1]
-            
-            # Interpolation en 3 étapes
-            c00 = c000 * (1 - fb) + c001 * fb
-            c01 = c010 * (1 - fb) + c011 * fb
-            c10 = c100 * (1 - fb) + c101 * fb
-            c11 = c110 * (1 - fb) + c111 * fb
-            
-            c0 = c00 * (1 - fg) + c01 * fg
-            c1 = c10 * (1 - fg) + c11 * fg
-            
-            result[i] = c0 * (1 - fr) + c1 * fr
-        
-        return result.reshape(h, w, 3)
+        """Applique la LUT 3D à une image (interpolation trilinéaire vectorisée)"""
+        image = np.clip(image, 0, 1)
+        return Interpolation.trilinear_interpolation(lut_3d, image[..., 0], image[..., 1], image[..., 2])
@@ -1,19 +1,26 @@
 import numpy as np
 import torch
-import cv2
 import os
 from pathlib import Path
 
+from ..utils.lut_writer import LUTWriter
+from ..utils.lut_parser import LUTParser
+from ..utils.compiled_lut import CompiledLUT
+from ..utils.parametric_lut import ParametricLUT
+from ..utils.adaptive_lut import AdaptiveLUT
+from ..utils.lut_catalog import LUTCatalog
+
 class LUTManagerNode:
+    # Bibliothèque de LUTs (indexée récursivement, sous-dossiers = catégories)
+    PRESETS_PATH = Path(__file__).parent.parent / "presets" / "luts"
+
     @classmethod
     def INPUT_TYPES(cls):
-        # Charger dynamiquement les presets disponibles
-        presets_path = Path(__file__).parent.parent / "presets" / "luts"
+        # Presets disponibles depuis le catalogue (rafraîchi de façon incrémentale)
         available_presets = ["None"]
         
-        if presets_path.exists():
-            for file in presets_path.glob("*.cube"):
-                available_presets.append(file.stem)
+        if cls.PRESETS_PATH.exists():
+            available_presets += LUTCatalog.for_directory(cls.PRESETS_PATH).names()
         
         return {
             "required": {
@@ -27,6 +34,11 @@ class LUTManagerNode:
             },
             "optional": {
                 "opacity": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0, "step": 0.05}),
+                # Erreur maximale tolérée pour remplacer un treillis 3D par courbes -> matrice -> courbes (0 : désactivé)
+                "parametric_tolerance": ("FLOAT", {"default": ParametricLUT.ERROR_THRESHOLD, "min": 0.0, "max": 0.05,
+                                                  "step": 0.001}),
+                # Écart maximal toléré pour garder en cache un treillis 3D sous forme d'octree adaptatif (0 : désactivé)
+                "adaptive_tolerance": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 0.01, "step": 0.0005}),
             }
         }
 
@@ -41,218 +53,126 @@ class LUTManagerNode:
         self.load_presets()
 
     def load_presets(self):
-        """Charger les fichiers LUT dans presets/luts"""
-        self.presets_path = Path(__file__).parent.parent / "presets" / "luts"
-        self.available_presets = {"None": None}
+        """Charger le catalogue des LUTs de presets/luts"""
+        self.presets_path = self.PRESETS_PATH
         
-        if self.presets_path.exists():
-            for file in self.presets_path.glob("*.cube"):
-                self.available_presets[file.stem] = str(file)
-        else:
+        if not self.presets_path.exists():
             # Créer le dossier s'il n'existe pas
             self.presets_path.mkdir(parents=True, exist_ok=True)
+        
+        self.catalog = LUTCatalog.for_directory(self.presets_path)
 
-    def apply_lut(self, image, path_lut_file, lut_preset, intensity, interpolation, data_order, table_order, opacity=1.0):
+    def apply_lut(self, image, path_lut_file, lut_preset, intensity, interpolation, data_order, table_order, opacity=1.0,
+                  parametric_tolerance=ParametricLUT.ERROR_THRESHOLD, adaptive_tolerance=0.0):
         
-        # Gestion des dimensions du tensor
+        # Gestion des dimensions du tensor (tout le batch est traité)
         if len(image.shape) == 4:
-            batch_size = image.shape[0]
-            img_tensor = image[0]
+            img_np = image.cpu().numpy().astype(np.float32)
         else:
-            batch_size = 1
-            img_tensor = image
-
-        # Conversion en numpy
-        img_np = (img_tensor.cpu().numpy() * 255).astype(np.uint8)
-        original_img = img_np.copy()
-
-        # Conversion selon l'ordre des DONNÉES
-        if data_order == "BGR":
-            img_np = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+            img_np = image.cpu().numpy().astype(np.float32)[np.newaxis]
 
         # Déterminer quelle LUT utiliser
-        lut_data = None
+        compiled_lut = None
         lut_info = ""
 
-        if lut_preset != "None" and lut_preset in self.available_presets:
+        preset_entry = self.catalog.lookup(lut_preset) if lut_preset != "None" else None
+
+        if preset_entry is not None:
             # Utiliser un preset depuis presets/luts
-            lut_file_path = self.available_presets[lut_preset]
-            lut_data = self.load_lut_file(lut_file_path, table_order)
-            lut_info = f"Preset: {lut_preset}, Data: {data_order}, Table: {table_order}"
+            compiled_lut = self.load_lut_file(preset_entry['path'], parametric_tolerance, adaptive_tolerance)
+            lut_info = (f"Preset: {lut_preset} ({preset_entry['format']}, {preset_entry['size']}), "
+                        f"Data: {data_order}, Table: {table_order}")
         elif path_lut_file and os.path.exists(path_lut_file):
             # Utiliser un fichier LUT externe
-            lut_data = self.load_lut_file(path_lut_file, table_order)
+            compiled_lut = self.load_lut_file(path_lut_file, parametric_tolerance, adaptive_tolerance)
             lut_info = f"File: {os.path.basename(path_lut_file)}, Data: {data_order}, Table: {table_order}"
         else:
             # Pas de LUT, retourner l'image originale
-            result_tensor = torch.from_numpy(original_img.astype(np.float32) / 255.0)
-            if batch_size > 1:
-                result_tensor = result_tensor.unsqueeze(0).repeat(batch_size, 1, 1, 1)
-            else:
-                result_tensor = result_tensor.unsqueeze(0)
-            return (result_tensor, "No LUT applied")
+            return (torch.from_numpy(img_np), "No LUT applied")
 
-        if lut_data is None:
+        if compiled_lut is None:
             # Erreur de chargement
-            result_tensor = torch.from_numpy(original_img.astype(np.float32) / 255.0)
-            if batch_size > 1:
-                result_tensor = result_tensor.unsqueeze(0).repeat(batch_size, 1, 1, 1)
-            else:
-                result_tensor = result_tensor.unsqueeze(0)
-            return (result_tensor, "LUT loading failed")
+            return (torch.from_numpy(img_np), "LUT loading failed")
 
         # Appliquer la LUT
-        result = self.apply_lut_to_image(img_np, lut_data, interpolation, intensity)
-
-        # Reconversion selon l'ordre des DONNÉES
-        if data_order == "BGR":
-            result = cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
+        result = self.apply_lut_to_image(img_np, compiled_lut, data_order, table_order, intensity)
 
         # Application de l'opacité
         if opacity < 1.0:
-            base_f = original_img.astype(np.float32) / 255.0
-            overlay_f = result.astype(np.float32) / 255.0
-            result_f = base_f * (1 - opacity) + overlay_f * opacity
-            result = (np.clip(result_f * 255, 0, 255)).astype(np.uint8)
-
-        # Reconversion en tensor
-        result_tensor = torch.from_numpy(result.astype(np.float32) / 255.0)
-        if batch_size > 1:
-            result_tensor = result_tensor.unsqueeze(0).repeat(batch_size, 1, 1, 1)
-        else:
-            result_tensor = result_tensor.unsqueeze(0)
-
-        return (result_tensor, lut_info)
+            result = np.clip(img_np * (1 - opacity) + result * opacity, 0.0, 1.0)
+
+        lut_info += f", Type: {compiled_lut.kind}"
+        if compiled_lut.kind == 'parametric':
+            lut_info += (f" (fitted to {compiled_lut.source_kind}, max error {compiled_lut.max_error:.5f}, "
+                         f"mean error {compiled_lut.mean_error:.5f})")
+        elif compiled_lut.kind == 'adaptive':
+            lut_info += (f" ({compiled_lut.leaf_count} cells, {compiled_lut.compression_ratio:.1f}x smaller, "
+                         f"max error {compiled_lut.max_error:.5f})")
+        elif compiled_lut.source_kind is not None:
+            lut_info += f" (separable {compiled_lut.source_kind}, max error {compiled_lut.separable_error:.5f})"
+        return (torch.from_numpy(np.ascontiguousarray(result, dtype=np.float32)), lut_info)
+
+    def load_lut_file(self, file_path, parametric_tolerance=ParametricLUT.ERROR_THRESHOLD, adaptive_tolerance=0.0):
+        """
+        Charge et compile un fichier LUT (3D, 1D, shaper + 3D ou image Hald)
+        Un treillis non séparable est remplacé par sa forme paramétrique si son erreur
+        maximale ne dépasse pas parametric_tolerance (0 : jamais), sinon par un octree
+        adaptatif à adaptive_tolerance près s'il occupe moins de mémoire (0 : jamais)
+        """
+        # Attendre la fin d'un export en arrière-plan vers ce fichier
+        LUTWriter.wait_for_export(file_path)
+
+        # Clé de cache avec la date de modification : un fichier remplacé est rechargé
+        try:
+            cache_key = (str(file_path), os.path.getmtime(file_path), parametric_tolerance, adaptive_tolerance)
+        except OSError as e:
+            print(f"Erreur chargement LUT {file_path}: {e}")
+            return None
 
-    def load_lut_file(self, file_path, table_order):
-        """Charge un fichier LUT avec gestion de l'ordre de la table"""
-        cache_key = f"{file_path}_{table_order}"
-        
         if cache_key in self.lut_cache:
             return self.lut_cache[cache_key]
 
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-
-            lut_size = 33
-            domain_min = [0.0, 0.0, 0.0]
-            domain_max = [1.0, 1.0, 1.0]
-            lut_data = []
-
-            for line in lines:
-                line = line.strip()
-                
-                if line.startswith('#') or not line:
-                    continue
-                    
-                if line.startswith('LUT_3D_SIZE'):
-                    lut_size = int(line.split()[-1])
-                    continue
-                    
-                if line.startswith('DOMAIN_MIN'):
-                    domain_min = [float(x) for x in line.split()[1:4]]
-                    continue
-                elif line.startswith('DOMAIN_MAX'):
-                    domain_max = [float(x) for x in line.split()[1:4]]
-                    continue
-                    
-                parts = line.split()
-                if len(parts) == 3:
-                    try:
-                        r, g, b = map(float, parts)
-                        
-                        # Réorganiser selon l'ordre de la TABLE
-                        if table_order == "BGR":
-                            lut_data.append([b, g, r])
-                        else:
-                            lut_data.append([r, g, b])
-                            
-                    except ValueError:
-                        continue
-
-            if len(lut_data) != lut_size ** 3:
-                print(f"Taille LUT incorrecte: attendu {lut_size**3}, reçu {len(lut_data)}")
-                return None
-
-            lut_array = np.array(lut_data, dtype=np.float32)
-            
-            # Normaliser le domaine si nécessaire
-            if domain_min != [0.0, 0.0, 0.0] or domain_max != [1.0, 1.0, 1.0]:
-                for i in range(len(lut_array)):
-                    lut_array[i, 0] = (lut_array[i, 0] - domain_min[0]) / (domain_max[0] - domain_min[0])
-                    lut_array[i, 1] = (lut_array[i, 1] - domain_min[1]) / (domain_max[1] - domain_min[1])
-                    lut_array[i, 2] = (lut_array[i, 2] - domain_min[2]) / (domain_max[2] - domain_min[2])
-            
-            lut_array = np.clip(lut_array, 0.0, 1.0)
-            lut_3d = lut_array.reshape(lut_size, lut_size, lut_size, 3)
+            # Treillis séparable : trois courbes 1D au lieu de l'interpolation trilinéaire
+            compiled_lut = CompiledLUT.from_parsed(LUTParser.parse_file(file_path)).separable()
             
-            self.lut_cache[cache_key] = lut_3d
-            return lut_3d
-
+            if parametric_tolerance > 0 and compiled_lut.kind != '1d':
+                parametric = ParametricLUT.from_compiled(compiled_lut)
+                print(f"📐 Parametric fit of {os.path.basename(file_path)}: max error {parametric.max_error:.5f}, "
+                      f"mean error {parametric.mean_error:.5f}")
+                if parametric.max_error <= parametric_tolerance:
+                    compiled_lut = parametric
+
+            if adaptive_tolerance > 0 and compiled_lut.kind == '3d':
+                adaptive = AdaptiveLUT.from_compiled(compiled_lut, adaptive_tolerance)
+                print(f"🌳 Adaptive octree of {os.path.basename(file_path)}: {adaptive.leaf_count} cells, "
+                      f"{adaptive.compression_ratio:.1f}x smaller, max error {adaptive.max_error:.5f}")
+                if adaptive.compression_ratio > 1.0:
+                    compiled_lut = adaptive
         except Exception as e:
             print(f"Erreur chargement LUT {file_path}: {e}")
             return None
 
-    def apply_lut_to_image(self, image, lut, interpolation, intensity):
-        """Applique une LUT 3D à l'image avec interpolation trilinéaire correcte"""
-        h, w, c = image.shape
-        result = image.copy().astype(np.float32) / 255.0
-        lut_size = lut.shape[0]
-        
-        result = np.clip(result, 0.0, 1.0)
-        
-        # Coordonnées LUT
-        r_idx = result[:, :, 0] * (lut_size - 1)
-        g_idx = result[:, :, 1] * (lut_size - 1)
-        b_idx = result[:, :, 2] * (lut_size - 1)
-        
-        result_rgb = self.trilinear_interpolation_correct(lut, r_idx, g_idx, b_idx)
-        result_rgb = np.clip(result_rgb, 0.0, 1.0)
-        
-        if intensity != 1.0:
-            original = result
-            result_rgb = original * (1 - intensity) + result_rgb * intensity
-        
-        return (np.clip(result_rgb * 255, 0, 255)).astype(np.uint8)
+        self.lut_cache[cache_key] = compiled_lut
+        return compiled_lut
 
-    def trilinear_interpolation_correct(self, lut, r_idx, g_idx, b_idx):
-        """Interpolation trilinéaire correcte et complète"""
-        lut_size = lut.shape[0]
-        
-        r0 = np.floor(r_idx).astype(int)
-        g0 = np.floor(g_idx).astype(int)
-        b0 = np.floor(b_idx).astype(int)
-        
-        r1 = np.minimum(r0 + 1, lut_size - 1)
-        g1 = np.minimum(g0 + 1, lut_size - 1)
-        b1 = np.minimum(b0 + 1, lut_size - 1)
+    def apply_lut_to_image(self, image, compiled_lut, data_order, table_order, intensity):
+        """
+        Applique une LUT compilée (image float RGB, treillis indexé [r, g, b])
         
-        dr = r_idx - r0
-        dg = g_idx - g0
-        db = b_idx - b0
+        Équivalences avec les ordres du nœud : l'entrée est inversée quand les données
+        sont en RGB, la sortie quand l'ordre des données diffère de celui de la table.
+        """
+        original = np.clip(image, 0.0, 1.0)
         
-        c000 = lut[r0, g0, b0]
-        c001 = lut[r0, g0, b1]
-        c010 = lut[r0, g1, b0]
-        c011 = lut[r0, g1, b1]
-        c100 = lut[r1, g0, b0]
-        c101 = lut[r1, g0, b1]
-        c110 = lut[r1, g1, b0]
-        c111 = lut[r1, g1, b1]
+        lut_input = original[..., ::-1] if data_order == "RGB" else original
+        result = compiled_lut.apply(lut_input)
+        if data_order != table_order:
+            result = result[..., ::-1]
         
-        dr = dr[..., np.newaxis]
-        dg = dg[..., np.newaxis]
-        db = db[..., np.newaxis]
-        
-        c00 = c000 * (1 - dr) + c100 * dr
-        c01 = c001 * (1 - dr) + c101 * dr
-        c10 = c010 * (1 - dr) + c110 * dr
-        c11 = c011 * (1 - dr) + c111 * dr
-        
-        c0 = c00 * (1 - dg) + c10 * dg
-        c1 = c01 * (1 - dg) + c11 * dg
+        result = np.clip(result, 0.0, 1.0)
         
-        result = c0 * (1 - db) + c1 * db
+        if intensity != 1.0:
+            result = np.clip(original * (1 - intensity) + result * intensity, 0.0, 1.0)
         
         return result
@@ -0,0 +1,158 @@
+"""
+HTTP routes for ComfyUI-Curve_Master
+Registered on ComfyUI's PromptServer when the package runs inside ComfyUI
+"""
+
+import asyncio
+import cv2
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+
+from .nodes.curve_master_node import CurveMasterNode
+from .utils.lut_catalog import LUTCatalog
+from .utils.lut_thumbnails import LUTThumbnails
+from .utils.preview_proxy import PreviewProxyCache
+
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    # Hors de ComfyUI (scripts, tests) : pas de serveur
+    PromptServer = None
+
+PACKAGE_DIR = Path(__file__).parent
+LUTS_PATH = PACKAGE_DIR / "presets" / "luts"
+
+thumbnails = LUTThumbnails(PACKAGE_DIR / "cache" / "lut_thumbnails",
+                           reference_path=PACKAGE_DIR / "presets" / "thumbnail_reference.png")
+
+# Aperçu en direct : intervalle minimal entre deux rendus d'un même nœud (secondes)
+PREVIEW_MIN_INTERVAL = 0.03
+PREVIEW_JPEG_QUALITY = 80
+
+_preview_node = CurveMasterNode()
+# État de fusion des demandes par nœud, seulement pour les nœuds ayant un proxy (les plus anciens
+# sont oubliés au-delà de PreviewProxyCache.MAX_ENTRIES)
+_preview_states = OrderedDict()
+
+def _preview_state(node_id):
+    state = _preview_states.get(node_id)
+    if state is None:
+        state = _preview_states[node_id] = {"sequence": 0, "last": 0.0, "lock": asyncio.Lock()}
+    _preview_states.move_to_end(node_id)
+    while len(_preview_states) > PreviewProxyCache.MAX_ENTRIES:
+        _preview_states.popitem(last=False)
+    return state
+
+def _render_curve_preview(proxy, settings):
+    result = _preview_node.render_preview(proxy, settings)
+    success, encoded = cv2.imencode('.jpg', np.ascontiguousarray(result[..., ::-1]),
+                                    [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+    if not success:
+        raise ValueError("Cannot encode preview")
+    return encoded.tobytes()
+
+def _catalog():
+    return LUTCatalog.for_directory(LUTS_PATH)
+
+def _size_parameter(request):
+    try:
+        size = int(request.query.get("size", LUTThumbnails.DEFAULT_SIZE))
+    except ValueError:
+        size = LUTThumbnails.DEFAULT_SIZE
+    return min(max(size, 16), LUTThumbnails.MAX_SIZE)
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    routes = PromptServer.instance.routes
+
+    async def _run_blocking(function, *args):
+        # Parcours du catalogue et rendus hors de la boucle d'événements
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    @routes.get("/curve_master/luts")
+    async def list_luts(request):
+        """Entrées du catalogue (filtre optionnel ?category=)"""
+        entries = await _run_blocking(_catalog().entries, request.query.get("category"))
+        return web.json_response([
+            {key: entry.get(key)
+             for key in ("display_name", "category", "title", "format", "size", "kind", "separable", "fingerprint")}
+            for entry in entries
+        ])
+
+    @routes.get("/curve_master/lut_thumbnail")
+    async def lut_thumbnail(request):
+        """Vignette JPEG d'une LUT du catalogue (?name=, ?size=), servie avec ETag"""
+        entry = await _run_blocking(_catalog().lookup, request.query.get("name", ""))
+        if entry is None:
+            return web.Response(status=404, text="Unknown LUT")
+
+        size = _size_parameter(request)
+        etag = thumbnails.etag(entry['fingerprint'], size)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=headers)
+
+        try:
+            cache_path = await _run_blocking(thumbnails.get, entry['path'], entry['fingerprint'], size)
+            body = await _run_blocking(cache_path.read_bytes)
+        except Exception as e:
+            return web.Response(status=500, text=f"Thumbnail rendering failed: {e}")
+
+        return web.Response(body=body, content_type="image/jpeg", headers=headers)
+
+    @routes.post("/curve_master/lut_thumbnails/warm")
+    async def warm_lut_thumbnails(request):
+        """Génère en arrière-plan les vignettes d'une catégorie (ou de tout le catalogue)"""
+        entries = await _run_blocking(_catalog().entries, request.query.get("category"))
+        queued = thumbnails.warm(entries, _size_parameter(request))
+        return web.json_response({"queued": queued})
+
+    @routes.post("/curve_master/curve_preview")
+    async def curve_preview(request):
+        """
+        Aperçu JPEG des courbes sur le proxy de la dernière entrée du nœud (corps JSON : node_id,
+        max_size et valeurs des widgets). Les demandes rapprochées sont fusionnées : seule la plus
+        récente est rendue, les autres reçoivent 204.
+        """
+        try:
+            settings = await request.json()
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON")
+
+        node_id = str(settings.get("node_id", ""))
+        try:
+            max_size = min(max(int(settings.get("max_size", 512)), 64), PreviewProxyCache.MAX_PROXY_SIZE)
+        except (TypeError, ValueError):
+            max_size = 512
+
+        # Nœud inconnu : réponse immédiate, sans créer d'état
+        if PreviewProxyCache.get(node_id, max_size) is None:
+            return web.Response(status=404, text="No input image yet: run the node once")
+
+        state = _preview_state(node_id)
+        state["sequence"] += 1
+        sequence = state["sequence"]
+
+        loop = asyncio.get_running_loop()
+        async with state["lock"]:
+            delay = state["last"] + PREVIEW_MIN_INTERVAL - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if sequence != state["sequence"]:
+                return web.Response(status=204)
+
+            # Proxy relu après l'attente : le nœud a pu être exécuté entre-temps
+            proxy = PreviewProxyCache.get(node_id, max_size)
+            if proxy is None:
+                return web.Response(status=404, text="No input image yet: run the node once")
+
+            try:
+                body = await _run_blocking(_render_curve_preview, proxy, settings)
+            except Exception as e:
+                return web.Response(status=500, text=f"Preview rendering failed: {e}")
+            finally:
+                state["last"] = loop.time()
+
+        return web.Response(body=body, content_type="image/jpeg", headers={"Cache-Control": "no-store"})
@@ -0,0 +1,20 @@
+"""
+Test configuration for ComfyUI-Curve_Master
+The repository is imported as the package 'curve_master' without running its ComfyUI
+entry point (__init__.py registers the nodes and the server routes); the same module
+stands for the repository directory, which pytest imports as a package when collecting
+"""
+
+import importlib.machinery
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+if 'curve_master' not in sys.modules:
+    spec = importlib.machinery.ModuleSpec('curve_master', None, is_package=True)
+    package = importlib.util.module_from_spec(spec)
+    package.__path__ = [str(ROOT)]
+    sys.modules['curve_master'] = package
+    sys.modules.setdefault(ROOT.name, package)
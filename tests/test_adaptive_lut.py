@@ -0,0 +1,36 @@
+"""
+AdaptiveLUT: lossless build, export and persistence
+"""
+
+import numpy as np
+
+from curve_master.utils.adaptive_lut import AdaptiveLUT
+
+def sample_lattice(size=17):
+    axis = np.linspace(0.0, 1.0, size)
+    lattice = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1)
+    bump = 0.05 * np.exp(-((lattice - [0.8, 0.6, 0.5]) ** 2).sum(axis=-1) / 0.01)
+    return np.clip(lattice ** 0.9 + bump[..., np.newaxis], 0, 1)
+
+def test_zero_tolerance_is_lossless():
+    for size in (17, 25):
+        lattice = sample_lattice(size)
+        adaptive = AdaptiveLUT.from_lattice(lattice, tolerance=0.0)
+        np.testing.assert_allclose(adaptive.to_lattice(), lattice, atol=1e-6)
+
+def test_tolerance_bounds_the_error():
+    lattice = sample_lattice(33)
+    adaptive = AdaptiveLUT.from_lattice(lattice, tolerance=2e-3)
+    assert adaptive.max_error <= 2e-3 + 1e-6
+    assert adaptive.compression_ratio > 1.0
+
+def test_save_load_round_trip(tmp_path):
+    adaptive = AdaptiveLUT.from_lattice(sample_lattice(), tolerance=1e-3)
+    path = tmp_path / "look.npz"
+    adaptive.save(path)
+
+    loaded = AdaptiveLUT.load(path)
+    assert loaded.max_error == adaptive.max_error
+    assert [p.name for p in tmp_path.iterdir()] == ["look.npz"]
+    pixels = np.random.default_rng(0).random((1000, 3)).astype(np.float32)
+    np.testing.assert_array_equal(loaded.apply(pixels), adaptive.apply(pixels))
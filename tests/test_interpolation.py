@@ -0,0 +1,166 @@
+"""
+Interpolation: vectorized functions against the reference per-sample implementations
+"""
+
+import numpy as np
+
+from curve_master.utils.interpolation import Interpolation
+
+def reference_bicubic(image, x_coords, y_coords):
+    """Per-tap loop implementation (Keys a = -0.5, tap window kept inside the image)"""
+    height, width = image.shape
+    x_idx = x_coords * (width - 1)
+    y_idx = y_coords * (height - 1)
+    x0 = np.clip(np.floor(x_idx).astype(int), 1, width - 3)
+    y0 = np.clip(np.floor(y_idx).astype(int), 1, height - 3)
+    dx = x_idx - x0
+    dy = y_idx - y0
+
+    def cubic_kernel(t):
+        t = np.abs(t)
+        return np.where(t <= 1, 1.5 * t ** 3 - 2.5 * t ** 2 + 1,
+                        np.where(t <= 2, -0.5 * t ** 3 + 2.5 * t ** 2 - 4 * t + 2, 0))
+
+    result = np.zeros_like(x_coords)
+    for j in range(-1, 3):
+        for i in range(-1, 3):
+            y_sample = np.clip(y0 + j, 0, height - 1)
+            x_sample = np.clip(x0 + i, 0, width - 1)
+            result += cubic_kernel(dx - i) * cubic_kernel(dy - j) * image[y_sample, x_sample]
+    return result
+
+def sample_images(height=40, width=60):
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float64)
+    ramp = 0.3 * xx / (width - 1) + 0.6 * yy / (height - 1)
+    sine = np.sin(xx / 5) * np.cos(yy / 7)
+    return ramp, sine
+
+def random_points(count=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random(count), rng.random(count)
+
+def test_bicubic_exact_on_linear_ramp():
+    ramp, _ = sample_images()
+    x, y = random_points()
+    result = Interpolation.bicubic_interpolation_2d(ramp, x, y)
+    assert np.abs(result - (0.3 * x + 0.6 * y)).max() < 1e-12
+
+def test_bicubic_matches_reference_inside_image():
+    _, sine = sample_images()
+    height, width = sine.shape
+    x, y = random_points()
+    # Loin des bords : mêmes taps et mêmes poids que la boucle de référence
+    inside = (x * (width - 1) >= 1) & (x * (width - 1) < width - 2) & \
+             (y * (height - 1) >= 1) & (y * (height - 1) < height - 2)
+    result = Interpolation.bicubic_interpolation_2d(sine, x, y)
+    assert np.abs(result - reference_bicubic(sine, x, y))[inside].max() < 1e-12
+
+def test_bicubic_accuracy_on_smooth_image():
+    _, sine = sample_images()
+    height, width = sine.shape
+    x, y = random_points()
+    exact = np.sin(x * (width - 1) / 5) * np.cos(y * (height - 1) / 7)
+    assert np.abs(Interpolation.bicubic_interpolation_2d(sine, x, y) - exact).max() < 1e-2
+
+def test_bicubic_multichannel_matches_single_channel():
+    ramp, sine = sample_images()
+    x, y = random_points(600)
+    x, y = x.reshape(20, 30), y.reshape(20, 30)
+    result = Interpolation.bicubic_interpolation_2d(np.stack([ramp, sine], axis=-1), x, y)
+    assert result.shape == (20, 30, 2)
+    for c, plane in enumerate((ramp, sine)):
+        np.testing.assert_allclose(result[..., c], Interpolation.bicubic_interpolation_2d(plane, x, y), atol=1e-12)
+
+def test_remap_precision_is_bounded():
+    ramp, _ = sample_images()
+    height, width = ramp.shape
+    # Nœuds entiers exacts ; positions arbitraires arrondies à 1/32 pixel par OpenCV
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    np.testing.assert_allclose(Interpolation.remap(ramp, xx, yy, method='linear'), ramp, atol=1e-6)
+
+    x, y = random_points()
+    result = Interpolation.remap(ramp, x * (width - 1), y * (height - 1), method='linear')
+    slope = 0.3 / (width - 1) + 0.6 / (height - 1)
+    assert np.abs(result - (0.3 * x + 0.6 * y)).max() <= slope / 32 + 1e-5
+
+def reference_lanczos(data, coordinates, a=3):
+    """Per-sample loop implementation"""
+    def lanczos_kernel(x):
+        x = np.abs(x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(x == 0, 1, np.where(x < a, a * np.sin(np.pi * x) * np.sin(np.pi * x / a)
+                                                / (np.pi ** 2 * x ** 2), 0))
+
+    result = np.zeros_like(coordinates)
+    indices = np.floor(coordinates).astype(int)
+    for i, idx in enumerate(indices):
+        value = 0.0
+        weight_sum = 0.0
+        for j in range(max(0, idx - a + 1), min(len(data), idx + a + 1)):
+            weight = lanczos_kernel(j - coordinates[i])
+            value += weight * data[j]
+            weight_sum += weight
+        result[i] = value / weight_sum if weight_sum > 0 else data[np.clip(idx, 0, len(data) - 1)]
+    return result
+
+def reference_adaptive_indices(data, error_threshold):
+    """Recursive midpoint refinement"""
+    indices = [0, len(data) - 1]
+
+    def refine(start, end):
+        if end - start <= 1:
+            return
+        mid = (start + end) // 2
+        t = (mid - start) / (end - start)
+        if abs(data[mid] - (data[start] + t * (data[end] - data[start]))) > error_threshold:
+            indices.append(mid)
+            refine(start, mid)
+            refine(mid, end)
+
+    refine(0, len(data) - 1)
+    return sorted(indices)
+
+def reference_hermite(points, num_samples):
+    """Per-sample loop implementation (points spanning [0, 1])"""
+    curve = np.zeros(num_samples)
+    for i in range(num_samples):
+        t_global = i / (num_samples - 1)
+        segment = next(j for j in range(len(points) - 1) if points[j][0] <= t_global <= points[j + 1][0])
+        p0, p1 = points[segment], points[segment + 1]
+        width = p1[0] - p0[0]
+        t = (t_global - p0[0]) / width
+        y = ((2 * t ** 3 - 3 * t ** 2 + 1) * p0[1] + (t ** 3 - 2 * t ** 2 + t) * p0[3] * width +
+             (-2 * t ** 3 + 3 * t ** 2) * p1[1] + (t ** 3 - t ** 2) * p1[3] * width)
+        curve[i] = np.clip(y, 0, 1)
+    return curve
+
+def test_lanczos_matches_reference():
+    rng = np.random.default_rng(1)
+    data = rng.random(50)
+    # Coordonnées quelconques, entières et proches des bords
+    coordinates = np.concatenate([rng.random(400) * 49, np.arange(50.0), [0.0, 0.3, 48.7, 49.0]])
+    for a in (2, 3):
+        np.testing.assert_allclose(Interpolation.lanczos_interpolation_1d(data, coordinates, a),
+                                   reference_lanczos(data, coordinates, a), atol=1e-12)
+
+def test_adaptive_keeps_reference_samples():
+    x = np.linspace(0, 1, 1000)
+    data = np.sin(8 * x) * np.exp(-2 * x) + 0.2 * (x > 0.6)
+    for threshold in (0.001, 0.01, 0.1):
+        indices, values = Interpolation.adaptive_interpolation(data, threshold)
+        expected = reference_adaptive_indices(data, threshold)
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_array_equal(values, data[expected])
+
+def test_adaptive_multichannel_keeps_union_of_channels():
+    x = np.linspace(0, 1, 257)
+    channels = np.stack([np.sin(6 * x), x ** 3], axis=1)
+    indices, values = Interpolation.adaptive_interpolation(channels, 0.01)
+    assert values.shape == (len(indices), 2)
+    for c in range(2):
+        assert set(reference_adaptive_indices(channels[:, c], 0.01)) <= set(indices.tolist())
+
+def test_hermite_matches_reference():
+    points = [(0.0, 0.0, 1.0, 0.5), (0.3, 0.4, 1.0, 1.5), (0.7, 0.6, 1.0, 0.2), (1.0, 1.0, 1.0, 2.0)]
+    np.testing.assert_allclose(Interpolation.hermite_interpolation(points, 256), reference_hermite(points, 256),
+                               atol=1e-12)
@@ -0,0 +1,66 @@
+"""
+LUTGeneratorNode: incremental refinement from saved fit statistics
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from curve_master.nodes.lut_generator_node import LUTGeneratorNode
+from curve_master.utils.lut_parser import LUTParser
+from curve_master.utils.lut_statistics import LUTStatistics
+from curve_master.utils.lut_writer import LUTWriter
+
+def random_statistics(count, seed):
+    rng = np.random.default_rng(seed)
+    stats = LUTStatistics()
+    source = rng.random((count, 3))
+    stats.add_samples(source, source ** 1.2)
+    return stats
+
+def test_refine_waits_for_queued_statistics_save(tmp_path):
+    node = LUTGeneratorNode()
+    stats_path = node._statistics_path(tmp_path, "look")
+    saved = random_statistics(500, 0)
+
+    # Sauvegarde en arrière-plan retenue jusqu'à ce que l'affinage ait commencé
+    release = threading.Event()
+
+    def slow_save(path):
+        release.wait(timeout=5)
+        saved.save(path)
+
+    LUTWriter.submit_export(stats_path, slow_save, stats_path)
+    threading.Timer(0.2, release.set).start()
+
+    current = random_statistics(300, 1)
+    merged = node._merge_saved_statistics(current, stats_path)
+
+    assert merged.total_count == saved.total_count + current.total_count
+
+def test_hald_extraction_reads_the_processed_pattern():
+    import torch
+    identity = LUTParser.hald_identity(4)
+    after = identity ** 1.5
+    lut = LUTGeneratorNode()._extract_hald_lut(torch.from_numpy(identity[np.newaxis]),
+                                               torch.from_numpy(after[np.newaxis]))
+    np.testing.assert_allclose(lut, LUTParser.hald_to_lut(after), atol=1e-7)
+
+def test_hald_extraction_rejects_invalid_before_images():
+    import torch
+    node = LUTGeneratorNode()
+    after = torch.from_numpy(LUTParser.hald_identity(4)[np.newaxis])
+
+    # Motif identité d'un autre niveau, puis image quelconque de la bonne taille
+    other_level = torch.from_numpy(LUTParser.hald_identity(3)[np.newaxis])
+    with pytest.raises(ValueError, match="level 4 Hald pattern"):
+        node._extract_hald_lut(other_level, after)
+
+    noise = torch.from_numpy(np.random.default_rng(0).random((1, 64, 64, 3)).astype(np.float32))
+    with pytest.raises(ValueError, match="identity Hald pattern"):
+        node._extract_hald_lut(noise, after)
+    with pytest.raises(ValueError, match="processed Hald pattern"):
+        node._extract_hald_lut(after, torch.from_numpy(np.zeros((1, 50, 60, 3), dtype=np.float32)))
@@ -0,0 +1,64 @@
+"""
+LUT files: writer / parser round trips
+"""
+
+import numpy as np
+import pytest
+
+from curve_master.utils.lut_parser import LUTParser
+from curve_master.utils.lut_writer import LUTWriter
+
+def identity_lattice(size):
+    axis = np.linspace(0.0, 1.0, size)
+    return np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1)
+
+def test_3dl_round_trip_dark_lut(tmp_path):
+    # Sorties toutes sous 1023 en 12 bits : la profondeur ne doit pas être déduite du maximum
+    lut = identity_lattice(17) * 0.2
+    path = tmp_path / "dark.3dl"
+    LUTWriter.write_3dl(lut, path)
+
+    parsed = LUTParser.parse_file(path)
+    assert parsed['size'] == 17
+    np.testing.assert_allclose(parsed['data'], lut, atol=0.5 / LUTWriter.OUTPUT_MAX_3DL + 1e-7)
+
+def test_3dl_output_depth_from_mesh_line(tmp_path):
+    lut = identity_lattice(2) * 0.5
+    rows = np.rint(LUTWriter.lattice_rows(lut, red_fastest=False) * 1023).astype(int)
+    path = tmp_path / "lustre.3dl"
+    path.write_text("3DMESH\nMesh 0 10\n0 1023\n" + "\n".join(" ".join(map(str, row)) for row in rows) + "\n")
+
+    np.testing.assert_allclose(LUTParser.parse_file(path)['data'], lut, atol=1e-3)
+
+def test_3dl_without_depth_line_defaults_to_12_bits(tmp_path):
+    lut = identity_lattice(2) * 0.1
+    rows = np.rint(LUTWriter.lattice_rows(lut, red_fastest=False) * 4095).astype(int)
+    path = tmp_path / "plain.3dl"
+    path.write_text("0 1023\n" + "\n".join(" ".join(map(str, row)) for row in rows) + "\n")
+
+    np.testing.assert_allclose(LUTParser.parse_file(path)['data'], lut, atol=1e-3)
+
+def test_hald_round_trip_is_lossless(tmp_path):
+    rng = np.random.default_rng(0)
+    lut = np.clip(identity_lattice(16) ** 1.3 + rng.normal(0, 0.01, (16, 16, 16, 3)), 0, 1)
+    path = tmp_path / "look.png"
+    LUTWriter.write_hald(lut, path)
+
+    parsed = LUTParser.parse_file(path)
+    assert parsed['size'] == 16
+    np.testing.assert_allclose(parsed['data'], lut, atol=0.5 / 65535 + 1e-7)
+
+def test_hald_rejects_non_square_sizes(tmp_path):
+    with pytest.raises(ValueError):
+        LUTWriter.write_hald(identity_lattice(17), tmp_path / "look.png")
+    assert not (tmp_path / "look.png").exists()
+    assert [LUTWriter.hald_size(size) for size in (4, 16, 17, 33, 64)] == [4, 16, 25, 36, 64]
+
+def test_convert_to_hald_resamples_explicitly(tmp_path):
+    source = tmp_path / "look.cube"
+    LUTWriter.write_cube(identity_lattice(17) * 0.5, source)
+    LUTParser.convert_lut_format(source, tmp_path / "look.png")
+
+    parsed = LUTParser.parse_file(tmp_path / "look.png")
+    assert parsed['size'] == 25
+    np.testing.assert_allclose(parsed['data'], identity_lattice(25) * 0.5, atol=1e-4)
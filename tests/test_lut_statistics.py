@@ -0,0 +1,30 @@
+"""
+LUTStatistics: persistence and merging
+"""
+
+import numpy as np
+
+from curve_master.utils.lut_statistics import LUTStatistics
+
+def random_statistics(count, seed):
+    rng = np.random.default_rng(seed)
+    stats = LUTStatistics(bins=16)
+    source = rng.random((count, 3))
+    stats.add_samples(source, source ** 1.2)
+    return stats
+
+def test_save_load_round_trip(tmp_path):
+    stats = random_statistics(2000, 0)
+    path = tmp_path / "look.lutstats.npz"
+    stats.save(path)
+
+    loaded = LUTStatistics.load(path)
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+    np.testing.assert_array_equal(loaded.counts, stats.counts)
+    np.testing.assert_allclose(loaded.centroids()[1], stats.centroids()[1])
+
+def test_merge_adds_counts():
+    first, second = random_statistics(500, 1), random_statistics(700, 2)
+    total = first.total_count + second.total_count
+    first.merge(second)
+    assert first.total_count == total
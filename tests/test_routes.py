@@ -0,0 +1,25 @@
+"""
+HTTP routes: bounded per-node preview state
+"""
+
+import pytest
+
+pytest.importorskip("torch")
+
+from curve_master import routes
+from curve_master.utils.preview_proxy import PreviewProxyCache
+
+def test_preview_states_are_bounded():
+    routes._preview_states.clear()
+    for node in range(10 * PreviewProxyCache.MAX_ENTRIES):
+        routes._preview_state(str(node))
+
+    assert len(routes._preview_states) == PreviewProxyCache.MAX_ENTRIES
+    # Les nœuds les plus récents sont conservés
+    assert str(10 * PreviewProxyCache.MAX_ENTRIES - 1) in routes._preview_states
+
+def test_preview_state_is_reused():
+    routes._preview_states.clear()
+    state = routes._preview_state("7")
+    state["sequence"] += 1
+    assert routes._preview_state("7")["sequence"] == 1
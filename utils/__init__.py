@@ -5,12 +5,30 @@ Mathematical and parsing utilities for curve and LUT processing
 
 from .curve_math import CurveMath
 from .lut_parser import LUTParser
+from .lut_writer import LUTWriter
+from .compiled_lut import CompiledLUT
+from .parametric_lut import ParametricLUT
+from .adaptive_lut import AdaptiveLUT
 from .interpolation import Interpolation
+from .lattice_regression import LatticeRegression
+from .lut_statistics import LUTStatistics
+from .lut_catalog import LUTCatalog
+from .lut_thumbnails import LUTThumbnails
+from .preview_proxy import PreviewProxyCache
 
 __all__ = [
     'CurveMath',
     'LUTParser', 
-    'Interpolation'
+    'LUTWriter',
+    'CompiledLUT',
+    'ParametricLUT',
+    'AdaptiveLUT',
+    'Interpolation',
+    'LatticeRegression',
+    'LUTStatistics',
+    'LUTCatalog',
+    'LUTThumbnails',
+    'PreviewProxyCache'
 ]
 
 __version__ = "1.0.0"
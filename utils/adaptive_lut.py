@@ -0,0 +1,324 @@
+"""
+Adaptive LUTs for ComfyUI-Curve_Master
+Octree of trilinear cells over a 3D LUT lattice, subdivided only where the lattice needs it
+"""
+
+import io
+import numpy as np
+from pathlib import Path
+
+from .lattice_regression import LatticeRegression
+from .lut_writer import LUTWriter
+
+class AdaptiveLUT:
+    """3D LUT stored as octree leaves, each interpolating trilinearly between its 8 corners"""
+
+    # Écart maximal par défaut entre une feuille et les nœuds du treillis qu'elle couvre
+    DEFAULT_TOLERANCE = 1e-3
+    # Nombre maximal de valeurs (cellules x nœuds) évaluées à la fois pendant la construction
+    BUILD_CHUNK = 1 << 22
+    # Pixels traités à la fois par apply()
+    APPLY_CHUNK = 1 << 18
+
+    # Coins / enfants d'une cellule, bits (r, g, b) de poids 4, 2, 1
+    OCTANTS = np.array([[(i >> 2) & 1, (i >> 1) & 1, i & 1] for i in range(8)], dtype=np.int64)
+
+    def __init__(self, children, leaf_corners, leaf_sizes, node_values, lut_size, domain_min=None, domain_max=None):
+        """
+        Args:
+            children: (cells,) int32 tree; first child index for inner cells, -(leaf + 1) for leaves
+            leaf_corners: (leaves, 8) int32 indices of each leaf's corners in node_values
+            leaf_sizes: (leaves,) edge length of each leaf in lattice steps
+            node_values: (nodes, 3) corner output values
+            lut_size: Size per axis of the dense lattice the tree was built from
+            domain_min: Domain minimum values
+            domain_max: Domain maximum values
+        """
+        self.children = np.asarray(children, dtype=np.int32)
+        self.leaf_corners = np.asarray(leaf_corners, dtype=np.int32)
+        self.leaf_sizes = np.asarray(leaf_sizes, dtype=np.int32)
+        self.node_values = np.asarray(node_values, dtype=np.float32)
+        self.lut_size = int(lut_size)
+        self.domain_min = np.asarray(domain_min if domain_min is not None else [0.0, 0.0, 0.0], dtype=np.float64)
+        self.domain_max = np.asarray(domain_max if domain_max is not None else [1.0, 1.0, 1.0], dtype=np.float64)
+
+        # Arête de la racine : plus petite puissance de deux couvrant le treillis
+        self.root_size = 1 << max(int(np.ceil(np.log2(max(self.lut_size - 1, 1)))), 0)
+        self.depth = int(np.log2(self.root_size))
+
+        # Écart maximal mesuré sur les nœuds du treillis d'origine et type de la LUT source
+        self.max_error = None
+        self.source_kind = None
+
+    @property
+    def kind(self):
+        """Application path (same interface as CompiledLUT)"""
+        return 'adaptive'
+
+    @property
+    def leaf_count(self):
+        return len(self.leaf_sizes)
+
+    @property
+    def node_count(self):
+        return len(self.node_values)
+
+    @property
+    def nbytes(self):
+        """Memory used by the tree, leaves and corner values"""
+        return self.children.nbytes + self.leaf_corners.nbytes + self.leaf_sizes.nbytes + self.node_values.nbytes
+
+    @property
+    def compression_ratio(self):
+        """Size of the dense float32 lattice divided by the size of the tree"""
+        return self.lut_size ** 3 * 3 * 4 / max(self.nbytes, 1)
+
+    def input_range(self):
+        """Input domain of the lattice"""
+        return self.domain_min.tolist(), self.domain_max.tolist()
+
+    @staticmethod
+    def _trilinear_weights(frac):
+        """(N, 8) trilinear weights of the OCTANTS corners for (N, 3) fractions"""
+        bits = AdaptiveLUT.OCTANTS.astype(frac.dtype)
+        return np.prod(bits * frac[:, np.newaxis, :] + (1 - bits) * (1 - frac[:, np.newaxis, :]), axis=2)
+
+    @staticmethod
+    def from_lattice(lut_3d, tolerance=DEFAULT_TOLERANCE, domain_min=None, domain_max=None):
+        """
+        Build the octree from a dense lattice by error-driven subdivision
+        Args:
+            lut_3d: (size, size, size, 3) lattice indexed [r, g, b]
+            tolerance: Maximum deviation from the lattice nodes inside each leaf (0: lossless)
+            domain_min: Domain minimum values
+            domain_max: Domain maximum values
+        Returns:
+            AdaptiveLUT instance
+        """
+        lut_3d = np.asarray(lut_3d, dtype=np.float64)
+        lut_size = lut_3d.shape[0]
+        root_size = 1 << max(int(np.ceil(np.log2(max(lut_size - 1, 1)))), 0)
+
+        # Treillis complété par réplication des bords jusqu'à 2^k + 1 nœuds (les nœuds ajoutés
+        # ne sont jamais interrogés et n'entrent pas dans l'erreur)
+        pad = root_size + 1 - lut_size
+        padded = np.pad(lut_3d, ((0, pad), (0, pad), (0, pad), (0, 0)), mode='edge')
+
+        children_levels = []
+        leaf_origins, leaf_sizes = [], []
+        origins = np.zeros((1, 3), dtype=np.int64)
+        size = root_size
+        next_cell = 1
+
+        # Subdivision niveau par niveau : une feuille par cellule assez précise
+        while len(origins):
+            if size > 1:
+                errors = AdaptiveLUT._cell_errors(padded, lut_size, origins, size)
+                split = errors > tolerance
+            else:
+                split = np.zeros(len(origins), dtype=bool)
+
+            split_count = int(split.sum())
+            leaf_total = sum(len(o) for o in leaf_origins)
+            children = np.empty(len(origins), dtype=np.int64)
+            children[split] = next_cell + 8 * np.arange(split_count)
+            children[~split] = -(leaf_total + np.arange(len(origins) - split_count)) - 1
+            children_levels.append(children)
+            next_cell += 8 * split_count
+
+            leaf_origins.append(origins[~split])
+            leaf_sizes.append(np.full(len(origins) - split_count, size))
+
+            size //= 2
+            origins = (origins[split][:, np.newaxis, :] + AdaptiveLUT.OCTANTS * size).reshape(-1, 3)
+
+        leaf_origins = np.concatenate(leaf_origins)
+        leaf_sizes = np.concatenate(leaf_sizes)
+
+        # Coins partagés entre feuilles : une seule valeur par nœud du treillis
+        corners = leaf_origins[:, np.newaxis, :] + AdaptiveLUT.OCTANTS * leaf_sizes[:, np.newaxis, np.newaxis]
+        keys = (corners[..., 0] * (root_size + 1) + corners[..., 1]) * (root_size + 1) + corners[..., 2]
+        node_keys, leaf_corners = np.unique(keys, return_inverse=True)
+        node_values = padded.reshape(-1, 3)[node_keys]
+
+        adaptive = AdaptiveLUT(np.concatenate(children_levels), leaf_corners.reshape(-1, 8), leaf_sizes,
+                               node_values, lut_size, domain_min, domain_max)
+        adaptive.source_kind = '3d'
+
+        # Erreur réelle sur les nœuds d'origine (évaluation en float32)
+        adaptive.max_error = float(np.abs(adaptive.to_lattice() - lut_3d).max())
+        return adaptive
+
+    @staticmethod
+    def _cell_errors(padded, lut_size, origins, size):
+        """Maximum deviation between each cell's trilinear interpolation and the lattice nodes it covers"""
+        offsets = np.stack(np.meshgrid(*[np.arange(size + 1)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+        weights = AdaptiveLUT._trilinear_weights(offsets / size)
+        corner_rows = (AdaptiveLUT.OCTANTS * size) @ np.array([(size + 1) ** 2, size + 1, 1])
+
+        errors = np.empty(len(origins))
+        chunk = max(AdaptiveLUT.BUILD_CHUNK // len(offsets), 1)
+        for start in range(0, len(origins), chunk):
+            block_origins = origins[start:start + chunk]
+            positions = block_origins[:, np.newaxis, :] + offsets
+            values = padded[positions[..., 0], positions[..., 1], positions[..., 2]]
+            predicted = np.einsum('pk,nkc->npc', weights, values[:, corner_rows])
+            deviation = np.abs(predicted - values).max(axis=2)
+            # Nœuds de remplissage hors du treillis d'origine ignorés
+            deviation[(positions >= lut_size).any(axis=2)] = 0.0
+            errors[start:start + chunk] = deviation.max(axis=1)
+
+        return errors
+
+    @staticmethod
+    def from_compiled(compiled_lut, tolerance=DEFAULT_TOLERANCE):
+        """
+        Build the octree from a compiled lattice-only LUT
+        Args:
+            compiled_lut: CompiledLUT of kind '3d'
+            tolerance: Maximum deviation from the lattice nodes inside each leaf
+        Returns:
+            AdaptiveLUT instance
+        """
+        if compiled_lut.kind != '3d':
+            raise ValueError(f"Only 3D lattices can be stored adaptively, got a '{compiled_lut.kind}' LUT")
+
+        return AdaptiveLUT.from_lattice(compiled_lut.lut_3d, tolerance,
+                                        compiled_lut.domain_min, compiled_lut.domain_max)
+
+    @staticmethod
+    def from_samples(source_points, target_points, lut_size=65, tolerance=DEFAULT_TOLERANCE, smoothing=0.1,
+                     weights=None):
+        """
+        Fit a dense lattice to color samples, then build the octree from it
+        Args:
+            source_points: (N, 3) input colors in [0, 1]
+            target_points: (N, 3) output colors
+            lut_size: Size per axis of the fitted lattice
+            tolerance: Maximum deviation from the fitted lattice inside each leaf
+            smoothing: Lattice regression smoothness weight
+            weights: Optional (N,) per-sample weights
+        Returns:
+            AdaptiveLUT instance
+        """
+        lut_3d = LatticeRegression.fit(source_points, target_points, lut_size, smoothing, weights)
+        return AdaptiveLUT.from_lattice(lut_3d, tolerance)
+
+    def apply(self, image):
+        """
+        Apply the LUT
+        Args:
+            image: Float array (..., 3) of RGB values
+        Returns:
+            float32 array with the same shape
+        """
+        image = np.asarray(image, dtype=np.float32)
+        shape = image.shape
+        pixels = image.reshape(-1, 3)
+
+        scale = ((self.lut_size - 1) / (self.domain_max - self.domain_min)).astype(np.float32)
+        result = np.empty_like(pixels)
+        for start in range(0, len(pixels), self.APPLY_CHUNK):
+            indices = (pixels[start:start + self.APPLY_CHUNK] - self.domain_min.astype(np.float32)) * scale
+            np.clip(indices, 0.0, self.lut_size - 1, out=indices)
+            result[start:start + self.APPLY_CHUNK] = self._lookup(indices)
+
+        return result.reshape(shape)
+
+    def _lookup(self, indices):
+        """Leaf search and trilinear interpolation of (N, 3) fractional lattice indices"""
+        cells = np.zeros(len(indices), dtype=np.int64)
+        origins = np.zeros(indices.shape, dtype=np.float32)
+        child = self.children[cells]
+
+        # Descente d'un niveau par passe pour tous les pixels encore dans une cellule interne
+        for level in range(1, self.depth + 1):
+            inner = np.flatnonzero(child >= 0)
+            if not len(inner):
+                break
+            half = self.root_size >> level
+            bits = indices[inner] >= origins[inner] + half
+            cells[inner] = child[inner] + bits @ np.array([4, 2, 1])
+            origins[inner] += bits * np.float32(half)
+            child[inner] = self.children[cells[inner]]
+
+        leaves = -child - 1
+        frac = (indices - origins) / self.leaf_sizes[leaves, np.newaxis].astype(np.float32)
+        weights = self._trilinear_weights(frac)
+        values = self.node_values[self.leaf_corners[leaves]]
+        return np.einsum('nk,nkc->nc', weights, values)
+
+    def to_lattice(self, lut_size=None):
+        """
+        Sample the octree on a dense lattice (the original lattice reproduces its nodes within the tolerance)
+        Args:
+            lut_size: Lattice size per axis (default: size of the source lattice)
+        Returns:
+            (lut_size, lut_size, lut_size, 3) float32 array indexed [r, g, b]
+        """
+        lut_size = lut_size or self.lut_size
+        # Indices calculés directement dans l'espace du treillis (sans aller-retour par le domaine)
+        axis = np.linspace(0.0, self.lut_size - 1, lut_size, dtype=np.float32)
+        indices = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+
+        result = np.empty_like(indices)
+        for start in range(0, len(indices), self.APPLY_CHUNK):
+            result[start:start + self.APPLY_CHUNK] = self._lookup(indices[start:start + self.APPLY_CHUNK])
+        return result.reshape(lut_size, lut_size, lut_size, 3)
+
+    def bake(self, lut_size=None):
+        """Dense lattice (same interface as CompiledLUT)"""
+        return self.to_lattice(lut_size)
+
+    def write_cube(self, file_path, title=None, lut_size=None):
+        """
+        Export the octree as a dense .cube file
+        Args:
+            file_path: Output file path
+            title: Optional LUT title
+            lut_size: Lattice size per axis (default: size of the source lattice)
+        """
+        LUTWriter.write_cube(self.to_lattice(lut_size), file_path, title,
+                             self.domain_min.tolist(), self.domain_max.tolist())
+
+    def save(self, file_path):
+        """
+        Save the octree to a compressed .npz file (atomic write, see LUTWriter.atomic_write)
+        Args:
+            file_path: Output file path
+        """
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            version=np.int64(1),
+            lut_size=np.int64(self.lut_size),
+            domain_min=self.domain_min,
+            domain_max=self.domain_max,
+            children=self.children,
+            leaf_corners=self.leaf_corners,
+            leaf_sizes=self.leaf_sizes,
+            node_values=self.node_values,
+            max_error=np.float64(np.nan if self.max_error is None else self.max_error),
+        )
+        LUTWriter.atomic_write(file_path, buffer.getvalue())
+
+    @staticmethod
+    def load(file_path):
+        """
+        Load an octree saved with save()
+        Args:
+            file_path: Path to .npz file
+        Returns:
+            AdaptiveLUT instance
+        """
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Adaptive LUT file not found: {file_path}")
+
+        with np.load(file_path) as data:
+            adaptive = AdaptiveLUT(data['children'], data['leaf_corners'], data['leaf_sizes'], data['node_values'],
+                                   int(data['lut_size']), data['domain_min'], data['domain_max'])
+            max_error = float(data['max_error'])
+
+        adaptive.max_error = None if np.isnan(max_error) else max_error
+        return adaptive
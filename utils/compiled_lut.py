@@ -0,0 +1,232 @@
+"""
+Compiled LUTs for ComfyUI-Curve_Master
+Parsed 1D, shaper+3D and 3D LUTs reduced to their cheapest application path
+"""
+
+import numpy as np
+
+class CompiledLUT:
+    """LUT ready to apply: per-channel curves, optional 3D lattice"""
+
+    # Écart maximal toléré pour remplacer un treillis par trois courbes 1D
+    SEPARABLE_TOLERANCE = 1e-3
+    # Échantillons des courbes composées (shaper suivi d'un treillis séparable)
+    SEPARABLE_CURVE_SIZE = 65536
+
+    def __init__(self, lut_3d=None, curves=None, domain_min=None, domain_max=None):
+        """
+        Args:
+            lut_3d: Optional (size, size, size, 3) lattice indexed [r, g, b]
+            curves: Optional list of three (x, y) tables, one per channel.
+                    Shaper of the lattice when lut_3d is set, the whole LUT otherwise
+            domain_min: Input domain minimum of the lattice
+            domain_max: Input domain maximum of the lattice
+        """
+        if lut_3d is None and curves is None:
+            raise ValueError("A compiled LUT needs a 3D lattice or 1D curves")
+
+        self.domain_min = np.asarray(domain_min if domain_min is not None else [0.0, 0.0, 0.0], dtype=np.float64)
+        self.domain_max = np.asarray(domain_max if domain_max is not None else [1.0, 1.0, 1.0], dtype=np.float64)
+
+        self.curves = None
+        if curves is not None:
+            self.curves = [(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)) for x, y in curves]
+
+        # Analyse de séparabilité (voir separable) : écart mesuré et type d'origine
+        self.separable_error = None
+        self.source_kind = None
+
+        self.lut_3d = None
+        self.lut_size = 0
+        self._index_curves = None
+        if lut_3d is not None:
+            self.lut_3d = np.ascontiguousarray(lut_3d, dtype=np.float32)
+            self.lut_size = self.lut_3d.shape[0]
+            self._flat_lattice = self.lut_3d.reshape(-1, 3)
+
+            # Shaper et normalisation du domaine fusionnés : les courbes donnent directement les indices du treillis
+            if self.curves is not None:
+                scale = (self.lut_size - 1) / (self.domain_max - self.domain_min)
+                self._index_curves = [
+                    (x, np.clip((y - self.domain_min[c]) * scale[c], 0.0, self.lut_size - 1))
+                    for c, (x, y) in enumerate(self.curves)
+                ]
+
+    @property
+    def kind(self):
+        """Application path: '1d', 'shaper+3d' or '3d'"""
+        if self.lut_3d is None:
+            return '1d'
+        return 'shaper+3d' if self.curves is not None else '3d'
+
+    @staticmethod
+    def from_parsed(lut_info):
+        """
+        Compile a dictionary returned by LUTParser
+        Args:
+            lut_info: Parsed LUT ('data', optional 'curves', 'domain_min', 'domain_max')
+        Returns:
+            CompiledLUT instance
+        """
+        return CompiledLUT(lut_info.get('data'), lut_info.get('curves'),
+                           lut_info.get('domain_min'), lut_info.get('domain_max'))
+
+    def apply(self, image):
+        """
+        Apply the LUT
+        Args:
+            image: Float array (..., 3) of RGB values
+        Returns:
+            float32 array with the same shape
+        """
+        image = np.asarray(image, dtype=np.float32)
+        shape = image.shape
+        pixels = image.reshape(-1, 3)
+
+        if self.lut_3d is None:
+            # LUT 1D pure : trois interpolations par canal
+            result = np.empty_like(pixels)
+            for c, (x, y) in enumerate(self.curves):
+                result[:, c] = self._interp(pixels[:, c], x, y)
+            return result.reshape(shape)
+
+        if self._index_curves is not None:
+            indices = np.empty(pixels.shape, dtype=np.float32)
+            for c, (x, y) in enumerate(self._index_curves):
+                indices[:, c] = self._interp(pixels[:, c], x, y)
+        else:
+            scale = ((self.lut_size - 1) / (self.domain_max - self.domain_min)).astype(np.float32)
+            indices = (pixels - self.domain_min.astype(np.float32)) * scale
+            np.clip(indices, 0.0, self.lut_size - 1, out=indices)
+
+        return self._lookup(indices).reshape(shape)
+
+    @staticmethod
+    def _interp(values, x, y):
+        """Piecewise linear table lookup, by direct indexing when x is regularly spaced"""
+        if len(x) < 2 or not np.allclose(np.diff(x), (x[-1] - x[0]) / (len(x) - 1)):
+            return np.interp(values, x, y)
+
+        # Grille régulière : pas de recherche dichotomique
+        positions = (values - np.float32(x[0])) * np.float32((len(x) - 1) / (x[-1] - x[0]))
+        np.clip(positions, 0.0, len(x) - 1, out=positions)
+        i0 = np.minimum(positions.astype(np.int64), len(x) - 2)
+        y = y.astype(np.float32)
+        return y[i0] + (y[i0 + 1] - y[i0]) * (positions - i0)
+
+    def _lookup(self, indices):
+        """Trilinear lookup of (N, 3) fractional lattice indices"""
+        size = self.lut_size
+        i0 = np.minimum(indices.astype(np.int64), size - 2)
+        frac = indices - i0.astype(np.float32)
+
+        base = (i0[:, 0] * size + i0[:, 1]) * size + i0[:, 2]
+        fr, fg, fb = frac[:, 0:1], frac[:, 1:2], frac[:, 2:3]
+        lattice = self._flat_lattice
+
+        c00 = lattice[base] * (1 - fb) + lattice[base + 1] * fb
+        c01 = lattice[base + size] * (1 - fb) + lattice[base + size + 1] * fb
+        c10 = lattice[base + size * size] * (1 - fb) + lattice[base + size * size + 1] * fb
+        c11 = lattice[base + size * size + size] * (1 - fb) + lattice[base + size * size + size + 1] * fb
+
+        c0 = c00 * (1 - fg) + c01 * fg
+        c1 = c10 * (1 - fg) + c11 * fg
+
+        return c0 * (1 - fr) + c1 * fr
+
+    @staticmethod
+    def separability(lut_3d):
+        """
+        Measure how far a lattice is from three independent channel curves
+        Args:
+            lut_3d: (size, size, size, 3) lattice indexed [r, g, b]
+        Returns:
+            Tuple (maximum deviation, (size, 3) table of the per-channel curves)
+        """
+        lut_3d = np.asarray(lut_3d, dtype=np.float32)
+
+        # Courbe de chaque sortie : moyenne sur les deux autres entrées
+        table = np.stack([lut_3d[..., 0].mean(axis=(1, 2)),
+                          lut_3d[..., 1].mean(axis=(0, 2)),
+                          lut_3d[..., 2].mean(axis=(0, 1))], axis=1)
+
+        error = max(float(np.abs(lut_3d[..., 0] - table[:, 0, np.newaxis, np.newaxis]).max()),
+                    float(np.abs(lut_3d[..., 1] - table[np.newaxis, :, 1, np.newaxis]).max()),
+                    float(np.abs(lut_3d[..., 2] - table[np.newaxis, np.newaxis, :, 2]).max()))
+        return error, table
+
+    def separable(self, tolerance=SEPARABLE_TOLERANCE):
+        """
+        Equivalent pure 1D LUT when every output channel depends only on its own input channel
+        Args:
+            tolerance: Maximum deviation of the lattice from the per-channel curves
+        Returns:
+            A new 1D CompiledLUT if the lattice is separable, self otherwise
+            (separable_error holds the measured deviation)
+        """
+        if self.lut_3d is None:
+            return self
+
+        error, table = self.separability(self.lut_3d)
+        self.separable_error = error
+        if error > tolerance:
+            return self
+
+        size = self.lut_size
+        if self._index_curves is None:
+            curves = [(np.linspace(self.domain_min[c], self.domain_max[c], size), table[:, c]) for c in range(3)]
+        else:
+            # Shaper puis table : composition échantillonnée finement sur la plage du shaper
+            curves = []
+            for c, (x, index) in enumerate(self._index_curves):
+                samples = np.linspace(x[0], x[-1], self.SEPARABLE_CURVE_SIZE)
+                curves.append((samples, np.interp(np.interp(samples, x, index), np.arange(size), table[:, c])))
+
+        compiled = CompiledLUT(curves=curves)
+        compiled.separable_error = error
+        compiled.source_kind = self.kind
+        return compiled
+
+    def input_range(self):
+        """
+        Input domain covered by the LUT
+        Returns:
+            Tuple (domain_min, domain_max) of per-channel lists
+        """
+        if self.curves is None:
+            return self.domain_min.tolist(), self.domain_max.tolist()
+        return [float(x[0]) for x, _ in self.curves], [float(x[-1]) for x, _ in self.curves]
+
+    def sample_curves(self, size):
+        """
+        Sample the per-channel curves on a common regular grid (1D LUT only)
+        Args:
+            size: Number of samples
+        Returns:
+            Tuple ((min, max) input range, (size, 3) table)
+        """
+        if self.lut_3d is not None:
+            raise ValueError("Only pure 1D LUTs can be sampled as curves")
+
+        domain_min, domain_max = self.input_range()
+        low, high = min(domain_min), max(domain_max)
+        samples = np.repeat(np.linspace(low, high, size)[:, np.newaxis], 3, axis=1)
+
+        return (low, high), self.apply(samples)
+
+    def bake(self, lut_size=33):
+        """
+        Sample the LUT on a dense lattice (for 3D-only output formats)
+        Args:
+            lut_size: Lattice size per axis
+        Returns:
+            (lut_size, lut_size, lut_size, 3) array indexed [r, g, b]
+        """
+        if self.lut_3d is not None and self.curves is None and lut_size == self.lut_size:
+            return self.lut_3d.copy()
+
+        # Échantillonnage sur le domaine d'entrée (plage des courbes, sinon domaine du treillis)
+        axes = [np.linspace(low, high, lut_size) for low, high in zip(*self.input_range())]
+
+        r, g, b = np.meshgrid(*axes, indexing='ij')
+        return self.apply(np.stack([r, g, b], axis=-1))
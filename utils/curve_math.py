@@ -7,10 +7,22 @@ import numpy as np
 from scipy import interpolate
 from scipy.optimize import minimize_scalar
 import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
 class CurveMath:
     """Mathematical operations for curve processing"""
     
+    # Matrices de base par (abscisses, type de courbe, échantillons)
+    # (partagées entre threads : accès sous verrou)
+    _basis_cache = OrderedDict()
+    _basis_lock = threading.Lock()
+    BASIS_CACHE_SIZE = 64
+    
+    # Types de courbe linéaires en y (évaluables par une matrice de base)
+    LINEAR_CURVE_TYPES = ('linear', 'catmull_rom', 'cubic_spline', 'bezier')
+    
     @staticmethod
     def catmull_rom_spline(points, num_samples=256):
         """
@@ -24,100 +36,239 @@ class CurveMath:
         if len(points) < 2:
             return np.linspace(0, 1, num_samples)
         
-        # Convert to numpy arrays
-        points = np.array(points)
-        x_vals = points[:, 0]
-        y_vals = points[:, 1]
+        curve = CurveMath.evaluate_curves([points], num_samples, method='catmull_rom')[0]
+        return np.clip(curve, 0, 1)
+    
+    @staticmethod
+    def segment_coefficients(points, method='catmull_rom'):
+        """
+        Cubic coefficients of each curve segment, y = a + b*u + c*u**2 + d*u**3
+        with u in [0, 1] the local parameter of the segment
+        Args:
+            points: (K, 2) control points sorted by x ((K, 4) with tangents for 'hermite')
+            method: 'linear', 'catmull_rom', 'hermite', 'cubic_spline' or 'pchip'
+                    (catmull_rom falls back to linear below 4 points, cubic_spline
+                    and pchip with repeated x positions)
+        Returns:
+            Tuple (knots (K,), coefficients (K-1, 4))
+        """
+        points = np.asarray(points, dtype=np.float64)
+        x = points[:, 0]
+        y = points[:, 1]
+        count = len(points)
+        coefficients = np.zeros((count - 1, 4))
         
-        # Create output array
-        curve = np.zeros(num_samples)
+        if method in ('cubic_spline', 'pchip') and np.any(np.diff(x) <= 0):
+            method = 'linear'
         
-        for i in range(num_samples):
-            t = i / (num_samples - 1)
-            
-            # Find segment
-            segment_idx = 0
-            for j in range(len(x_vals) - 1):
-                if t >= x_vals[j] and t <= x_vals[j + 1]:
-                    segment_idx = j
-                    break
-            
-            if len(points) < 4:
-                # Linear interpolation for less than 4 points
-                if segment_idx < len(x_vals) - 1:
-                    local_t = (t - x_vals[segment_idx]) / (x_vals[segment_idx + 1] - x_vals[segment_idx])
-                    curve[i] = y_vals[segment_idx] + local_t * (y_vals[segment_idx + 1] - y_vals[segment_idx])
-                else:
-                    curve[i] = y_vals[-1]
+        if method == 'linear' or (method == 'catmull_rom' and count < 4):
+            coefficients[:, 0] = y[:-1]
+            coefficients[:, 1] = y[1:] - y[:-1]
+        elif method == 'catmull_rom':
+            # Voisins extrêmes dupliqués aux bords
+            index = np.arange(count - 1)
+            p0 = y[np.maximum(index - 1, 0)]
+            p1 = y[index]
+            p2 = y[index + 1]
+            p3 = y[np.minimum(index + 2, count - 1)]
+            coefficients[:, 0] = p1
+            coefficients[:, 1] = 0.5 * (p2 - p0)
+            coefficients[:, 2] = 0.5 * (2 * p0 - 5 * p1 + 4 * p2 - p3)
+            coefficients[:, 3] = 0.5 * (-p0 + 3 * p1 - 3 * p2 + p3)
+        elif method == 'hermite':
+            # Pentes (colonne 3) mises à l'échelle de la largeur du segment
+            width = np.diff(x)
+            m0 = points[:-1, 3] * width
+            m1 = points[1:, 3] * width
+            coefficients[:, 0] = y[:-1]
+            coefficients[:, 1] = m0
+            coefficients[:, 2] = -3 * y[:-1] - 2 * m0 + 3 * y[1:] - m1
+            coefficients[:, 3] = 2 * y[:-1] + m0 - 2 * y[1:] + m1
+        elif method in ('cubic_spline', 'pchip'):
+            if method == 'pchip':
+                # PCHIP : pentes harmoniques, courbe monotone entre points monotones
+                spline = interpolate.PchipInterpolator(x, y)
             else:
-                # Catmull-Rom interpolation
-                p0_idx = max(0, segment_idx - 1)
-                p1_idx = segment_idx
-                p2_idx = min(len(y_vals) - 1, segment_idx + 1)
-                p3_idx = min(len(y_vals) - 1, segment_idx + 2)
-                
-                p0 = y_vals[p0_idx]
-                p1 = y_vals[p1_idx]
-                p2 = y_vals[p2_idx]
-                p3 = y_vals[p3_idx]
-                
-                if p1_idx < len(x_vals) - 1:
-                    local_t = (t - x_vals[p1_idx]) / (x_vals[p2_idx] - x_vals[p1_idx])
-                else:
-                    local_t = 0
-                
-                curve[i] = CurveMath._catmull_rom_interpolate(local_t, p0, p1, p2, p3)
+                spline = interpolate.CubicSpline(x, y, bc_type='natural')
+            width = np.diff(x)
+            # scipy : puissances décroissantes de (x - x_i) -> puissances croissantes de u
+            for power in range(4):
+                coefficients[:, power] = spline.c[3 - power] * width ** power
+        else:
+            raise ValueError(f"Unknown curve method: {method}")
         
-        return np.clip(curve, 0, 1)
+        return x, coefficients
     
     @staticmethod
-    def _catmull_rom_interpolate(t, p0, p1, p2, p3):
-        """Catmull-Rom interpolation between 4 points"""
-        t2 = t * t
-        t3 = t2 * t
-        
-        return 0.5 * (
-            (2 * p1) +
-            (-p0 + p2) * t +
-            (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2 +
-            (-p0 + 3 * p1 - 3 * p2 + p3) * t3
-        )
+    def evaluate_segments(knots, coefficients, samples):
+        """
+        Evaluate several piecewise cubic curves at once
+        Args:
+            knots: List of M knot arrays (K_m,), sorted
+            coefficients: List of M coefficient arrays (K_m - 1, 4)
+            samples: (N,) sample positions shared by all curves, or (M, N)
+        Returns:
+            (M, N) array; values outside a curve's knots hold its end values
+        """
+        curve_count = len(knots)
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.ndim == 1:
+            samples = np.broadcast_to(samples, (curve_count, len(samples)))
+        
+        # Tous les segments dans un seul tableau : décalage de chaque courbe sur l'axe des x
+        lengths = np.array([len(k) for k in knots])
+        span = max(float(np.max(np.abs(np.concatenate(knots)))), float(np.max(np.abs(samples))), 1.0) * 4.0
+        offsets = np.arange(curve_count) * span
+        flat_knots = np.concatenate([k + offset for k, offset in zip(knots, offsets)])
+        flat_coefficients = np.concatenate(coefficients)
+        first_knot = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        first_segment = first_knot - np.arange(curve_count)
+        
+        # Recherche du segment : un seul searchsorted pour toutes les courbes
+        x0 = np.array([k[0] for k in knots])[:, np.newaxis]
+        x1 = np.array([k[-1] for k in knots])[:, np.newaxis]
+        clamped = np.clip(samples, x0, x1)
+        position = np.searchsorted(flat_knots, clamped + offsets[:, np.newaxis]) - 1
+        last = (lengths - 2)[:, np.newaxis]
+        at_end = clamped >= x1
+        local = np.where(at_end, last, np.clip(position - first_knot[:, np.newaxis], 0, last))
+        
+        segment = local + first_segment[:, np.newaxis]
+        start = flat_knots[local + first_knot[:, np.newaxis]] - offsets[:, np.newaxis]
+        end = flat_knots[local + first_knot[:, np.newaxis] + 1] - offsets[:, np.newaxis]
+        width = end - start
+        u = np.divide(clamped - start, width, out=np.zeros_like(clamped), where=width > 0)
+        # Fin de courbe : dernière valeur, même avec des abscisses répétées
+        u[at_end] = 1.0
+        
+        a, b, c, d = (flat_coefficients[segment, power] for power in range(4))
+        return a + u * (b + u * (c + u * d))
+    
+    @staticmethod
+    def evaluate_curves(curves, num_samples=256, method='catmull_rom', samples=None):
+        """
+        Evaluate M curves x N samples in one call
+        Curves sharing their knot positions are evaluated with one product
+        against a cached basis matrix (types linear in y)
+        Args:
+            curves: Sequence of M control point arrays (K_m, 2), sorted by x
+            num_samples: Number of samples on [0, 1] (ignored if samples is given)
+            method: Segment method (see segment_coefficients) or 'bezier'
+            samples: Optional (N,) or (M, N) sample positions
+        Returns:
+            (M, N) array of curve values (not clipped)
+        """
+        if samples is None:
+            samples = np.linspace(0.0, 1.0, num_samples)
+        samples = np.asarray(samples, dtype=np.float64)
+        curves = [np.asarray(points, dtype=np.float64) for points in curves]
+        
+        if samples.ndim == 2 or method not in CurveMath.LINEAR_CURVE_TYPES:
+            return CurveMath._evaluate_direct(curves, method, samples)
+        
+        # Regroupement par abscisses des points de contrôle
+        groups = OrderedDict()
+        for m, points in enumerate(curves):
+            if len(points) >= 2:
+                groups.setdefault(points[:, 0].tobytes(), []).append(m)
+        
+        result = np.empty((len(curves), len(samples)))
+        direct = [m for m, points in enumerate(curves) if len(points) < 2]
+        for members in groups.values():
+            if len(members) < 2:
+                direct.extend(members)
+                continue
+            basis = CurveMath.curve_basis_matrix(curves[members[0]][:, 0], samples, method)
+            result[members] = np.stack([curves[m][:, 1] for m in members]) @ basis.T
+        
+        if direct:
+            result[direct] = CurveMath._evaluate_direct([curves[m] for m in direct], method, samples)
+        return result
+    
+    @staticmethod
+    def _evaluate_direct(curves, method, samples):
+        """Evaluate curves from their segment coefficients (or dense Bézier evaluation)"""
+        if method == 'bezier':
+            # Courbe globale (non par segments) : une évaluation dense par courbe
+            return np.array([
+                CurveMath.bezier_y_of_x(points, samples[m] if samples.ndim == 2 else samples)
+                if len(points) >= 2 else (samples[m] if samples.ndim == 2 else samples)
+                for m, points in enumerate(curves)
+            ])
+        
+        knots, coefficients = [], []
+        for points in curves:
+            if len(points) < 2:
+                # Courbe dégénérée : identité
+                points = np.array([[0.0, 0.0], [1.0, 1.0]])
+            x, coefficient = CurveMath.segment_coefficients(points, method)
+            knots.append(x)
+            coefficients.append(coefficient)
+        
+        return CurveMath.evaluate_segments(knots, coefficients, samples)
     
     @staticmethod
     def bezier_curve(control_points, num_samples=256):
         """
-        Generate Bézier curve from control points
+        Generate Bézier curve from control points, as y(x) on a regular x grid
         Args:
             control_points: List of (x, y) control points
             num_samples: Number of output samples
         Returns:
             numpy array of interpolated curve values
         """
-        n = len(control_points) - 1
-        curve = np.zeros(num_samples)
-        
-        for i in range(num_samples):
-            t = i / (num_samples - 1)
-            x = 0
-            y = 0
-            
-            for j, (px, py) in enumerate(control_points):
-                # Bernstein polynomial
-                coeff = CurveMath._binomial_coefficient(n, j) * (t ** j) * ((1 - t) ** (n - j))
-                x += coeff * px
-                y += coeff * py
-            
-            # Map x back to index and store y
-            if i == 0:
-                curve[i] = control_points[0][1]
-            elif i == num_samples - 1:
-                curve[i] = control_points[-1][1]
-            else:
-                # Find corresponding curve value
-                curve[i] = y
+        if len(control_points) < 2:
+            return np.linspace(0, 1, num_samples)
         
+        curve = CurveMath.bezier_y_of_x(control_points, np.linspace(0, 1, num_samples))
         return np.clip(curve, 0, 1)
     
+    @staticmethod
+    def bezier_y_of_x(control_points, samples, density=None):
+        """
+        Evaluate a Bézier curve as a function of its input value
+        Args:
+            control_points: (n + 1, 2) control points, x increasing
+            samples: Input values x to evaluate
+            density: Number of curve parameters t evaluated (default: 4x the samples, at least 1024)
+        Returns:
+            Array of y(x) values; inputs outside the end points hold the end values
+        """
+        control_points = np.asarray(control_points, dtype=np.float64)
+        samples = np.asarray(samples, dtype=np.float64)
+        if density is None:
+            density = max(4 * samples.size, 1024)
+        
+        # Évaluation dense (matrice de Bernstein en cache) de x(t) et y(t)
+        curve = CurveMath._bernstein_grid(len(control_points) - 1, density) @ control_points
+        
+        # Inversion de x(t) : x rendu monotone (points de contrôle croisés) puis rééchantillonnage
+        x = np.maximum.accumulate(curve[:, 0])
+        return np.interp(samples, x, curve[:, 1])
+    
+    @staticmethod
+    def bernstein_matrix(degree, t):
+        """
+        Bernstein basis values
+        Args:
+            degree: Polynomial degree n
+            t: (N,) parameter values in [0, 1]
+        Returns:
+            (N, n + 1) array B[i, j] = C(n, j) t_i^j (1 - t_i)^(n - j)
+        """
+        t = np.asarray(t, dtype=np.float64)[:, np.newaxis]
+        j = np.arange(degree + 1)
+        binomials = np.array([CurveMath._binomial_coefficient(degree, k) for k in j], dtype=np.float64)
+        return binomials * t ** j * (1 - t) ** (degree - j)
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _bernstein_grid(degree, density):
+        """Read-only Bernstein matrix on a regular grid of density parameters"""
+        matrix = CurveMath.bernstein_matrix(degree, np.linspace(0, 1, density))
+        matrix.flags.writeable = False
+        return matrix
+    
     @staticmethod
     def _binomial_coefficient(n, k):
         """Calculate binomial coefficient"""
@@ -141,17 +292,7 @@ class CurveMath:
         if len(points) < 2:
             return np.linspace(0, 1, num_samples)
         
-        points = np.array(points)
-        x_vals = points[:, 0]
-        y_vals = points[:, 1]
-        
-        # Create cubic spline
-        cs = interpolate.CubicSpline(x_vals, y_vals, bc_type='natural')
-        
-        # Generate samples
-        x_new = np.linspace(0, 1, num_samples)
-        curve = cs(x_new)
-        
+        curve = CurveMath.evaluate_curves([points], num_samples, method='cubic_spline')[0]
         return np.clip(curve, 0, 1)
     
     @staticmethod
@@ -290,12 +431,14 @@ class CurveMath:
         Fit different curve types to control points
         Args:
             points: List of (x, y) control points
-            curve_type: Type of curve ('catmull_rom', 'bezier', 'cubic_spline')
+            curve_type: Type of curve ('linear', 'catmull_rom', 'bezier', 'cubic_spline')
             num_samples: Number of output samples
         Returns:
             Fitted curve array
         """
-        if curve_type == 'catmull_rom':
+        if curve_type == 'linear':
+            return np.clip(CurveMath.evaluate_curves([points], num_samples, method='linear')[0], 0, 1)
+        elif curve_type == 'catmull_rom':
             return CurveMath.catmull_rom_spline(points, num_samples)
         elif curve_type == 'bezier':
             return CurveMath.bezier_curve(points, num_samples)
@@ -321,43 +464,226 @@ class CurveMath:
         return np.sqrt(np.mean((curve1 - curve2) ** 2))
     
     @staticmethod
-    def optimize_curve_fit(target_curve, control_points_count=5, curve_type='catmull_rom'):
+    def curve_basis_matrix(knots, samples, curve_type='catmull_rom', cache=True):
+        """
+        Basis matrix of a curve type with fixed knot positions, cached
+        (curves linear in their control values: y(samples) = B @ control_y)
+        Args:
+            knots: (K,) control point x positions, increasing
+            samples: (N,) sample positions
+            curve_type: One of LINEAR_CURVE_TYPES (PCHIP and Hermite are not linear in y)
+            cache: Keep the matrix (disable for one-off knots or large sample sets)
+        Returns:
+            Read-only (N, K) array
+        """
+        if curve_type not in CurveMath.LINEAR_CURVE_TYPES:
+            raise ValueError(f"Curve type {curve_type} has no basis matrix")
+        
+        knots = np.ascontiguousarray(knots, dtype=np.float64)
+        samples = np.ascontiguousarray(samples, dtype=np.float64)
+        if not cache:
+            return CurveMath._build_basis(knots, samples, curve_type)
+        
+        key = (knots.tobytes(), curve_type, samples.tobytes())
+        cache = CurveMath._basis_cache
+        with CurveMath._basis_lock:
+            basis = cache.get(key)
+            if basis is not None:
+                cache.move_to_end(key)
+                return basis
+        
+        basis = CurveMath._build_basis(knots, samples, curve_type)
+        basis.flags.writeable = False
+        
+        with CurveMath._basis_lock:
+            cache[key] = basis
+            while len(cache) > CurveMath.BASIS_CACHE_SIZE:
+                cache.popitem(last=False)
+        return basis
+    
+    @staticmethod
+    def linear_basis_matrix(knots, samples):
+        """
+        Piecewise linear (hat) basis built directly: two non-zero weights per row
+        (same segment and end conventions as evaluate_segments)
+        Args:
+            knots: (K,) sorted knot positions
+            samples: (N,) sample positions
+        Returns:
+            (N, K) array
+        """
+        knots = np.asarray(knots, dtype=np.float64)
+        samples = np.asarray(samples, dtype=np.float64)
+        count = len(knots)
+        
+        clamped = np.clip(samples, knots[0], knots[-1])
+        last = count - 2
+        at_end = clamped >= knots[-1]
+        segment = np.where(at_end, last, np.clip(np.searchsorted(knots, clamped) - 1, 0, last))
+        start = knots[segment]
+        width = knots[segment + 1] - start
+        u = np.divide(clamped - start, width, out=np.zeros_like(clamped), where=width > 0)
+        u[at_end] = 1.0
+        
+        basis = np.zeros((len(samples), count))
+        rows = np.arange(len(samples))
+        basis[rows, segment] = 1.0 - u
+        basis[rows, segment + 1] += u
+        return basis
+    
+    @staticmethod
+    def _build_basis(knots, samples, curve_type):
+        """Uncached basis matrix (column k: curve whose only non-zero control value is 1 at knot k)"""
+        if curve_type == 'linear':
+            return CurveMath.linear_basis_matrix(knots, samples)
+        curves = [np.stack([knots, unit], axis=1) for unit in np.eye(len(knots))]
+        return np.ascontiguousarray(CurveMath._evaluate_direct(curves, curve_type, samples).T)
+    
+    @staticmethod
+    def solve_control_values(basis, target, weights=None, monotonic=False):
+        """
+        Least-squares control values in [0, 1]
+        Args:
+            basis: (N, K) basis matrix
+            target: (N,) target values
+            weights: Optional (N,) non-negative sample weights
+            monotonic: Constrain the control values to be non-decreasing
+        Returns:
+            (K,) control values
+        """
+        from scipy.optimize import lsq_linear, nnls
+        
+        if weights is not None:
+            root = np.sqrt(np.asarray(weights, dtype=np.float64))
+            basis = basis * root[:, np.newaxis]
+            target = target * root
+        
+        if not monotonic:
+            return lsq_linear(basis, target, bounds=(0.0, 1.0)).x
+        
+        # y = L z avec z = (y0, incréments..., 1 - y_fin) >= 0 et somme(z) = 1 (ligne d'égalité pondérée)
+        count = basis.shape[1]
+        cumulative = np.tril(np.ones((count, count + 1)))
+        penalty = 1e3 * max(float(np.abs(basis).max()), 1.0)
+        system = np.vstack([basis @ cumulative, penalty * np.ones((1, count + 1))])
+        increments, _ = nnls(system, np.append(target, penalty))
+        return np.clip(cumulative @ increments, 0.0, 1.0)
+    
+    @staticmethod
+    def optimize_curve_fit(target_curve, control_points_count=5, curve_type='catmull_rom',
+                           weights=None, monotonic=False, free_knots=False):
         """
         Optimize control points to best fit target curve
         Args:
-            target_curve: Target curve to fit
+            target_curve: Target curve to fit (values sampled on [0, 1])
             control_points_count: Number of control points to optimize
-            curve_type: Type of curve to fit
+            curve_type: Type of curve to fit ('linear', 'catmull_rom', 'cubic_spline', 'bezier')
+            weights: Optional per-sample weights (e.g. a histogram)
+            monotonic: Constrain the fitted curve to be non-decreasing
+            free_knots: Also optimize the x positions of the inner control points
         Returns:
             Optimized control points
         """
-        def objective(params):
-            # Reshape params to control points
-            points = []
-            for i in range(control_points_count):
-                x = i / (control_points_count - 1)
-                y = np.clip(params[i], 0, 1)
-                points.append((x, y))
+        target = np.asarray(target_curve, dtype=np.float64)
+        samples = np.linspace(0, 1, len(target))
+        
+        root = np.sqrt(np.asarray(weights, dtype=np.float64)) if weights is not None else None
+        knots = np.linspace(0, 1, control_points_count)
+        
+        if free_knots and control_points_count > 2:
+            from scipy.optimize import minimize
+            
+            # Écarts entre abscisses paramétrés par leur logarithme (le premier fixé) : points toujours ordonnés
+            def knots_from(params):
+                gaps = np.exp(np.concatenate([[0.0], params]))
+                return np.concatenate([[0.0], np.cumsum(gaps / gaps.sum())])
             
-            # Generate curve
-            fitted_curve = CurveMath.fit_curve_to_points(points, curve_type, len(target_curve))
+            # Boucle externe sur les abscisses ; pour des abscisses fixées, y est un moindres carrés libre
+            def knot_error(params):
+                # Abscisses différentes à chaque essai : matrice non mise en cache
+                basis = CurveMath.curve_basis_matrix(knots_from(params), samples, curve_type, cache=False)
+                if root is not None:
+                    basis, weighted = basis * root[:, np.newaxis], target * root
+                else:
+                    weighted = target
+                values = np.linalg.lstsq(basis, weighted, rcond=None)[0]
+                residual = basis @ values - weighted
+                return float(residual @ residual)
             
-            # Calculate error
-            return CurveMath.curve_distance(target_curve, fitted_curve)
+            result = minimize(knot_error, np.zeros(control_points_count - 2), method='L-BFGS-B',
+                              bounds=[(-3.0, 3.0)] * (control_points_count - 2))
+            knots = knots_from(result.x)
+        
+        # Pour des abscisses fixées, la courbe est linéaire en y : un seul moindres carrés contraint
+        basis = CurveMath.curve_basis_matrix(knots, samples, curve_type)
+        values = CurveMath.solve_control_values(basis, target, weights, monotonic)
+        
+        return [(float(x), float(y)) for x, y in zip(knots, values)]
+    
+    @staticmethod
+    def histogram_percentile(histogram, fraction):
+        """
+        Level below which a fraction of the histogram lies
+        Args:
+            histogram: Array of counts (one bin per level)
+            fraction: Fraction in [0, 1]
+        Returns:
+            Normalized level in [0, 1]
+        """
+        histogram = np.asarray(histogram, dtype=np.float64)
+        cdf = np.cumsum(histogram)
+        if cdf[-1] <= 0:
+            return fraction
         
-        # Initial guess (linear)
-        initial_params = np.linspace(0, 1, control_points_count)
+        level = np.searchsorted(cdf, fraction * cdf[-1], side='left')
+        return min(level, len(histogram) - 1) / (len(histogram) - 1)
+    
+    @staticmethod
+    def levels_points(histogram, clip_percent=0.5):
+        """
+        Control points stretching a histogram to the full range (auto levels)
+        Args:
+            histogram: Array of counts (one bin per level)
+            clip_percent: Percentage clipped at each end
+        Returns:
+            List of (x, y) control points in [0, 1]
+        """
+        low = CurveMath.histogram_percentile(histogram, clip_percent / 100.0)
+        high = CurveMath.histogram_percentile(histogram, 1.0 - clip_percent / 100.0)
+        
+        if high - low < 1e-3:
+            return [(0.0, 0.0), (1.0, 1.0)]
+        
+        points = [(low, 0.0), (high, 1.0)]
+        if low > 0.0:
+            points.insert(0, (0.0, 0.0))
+        if high < 1.0:
+            points.append((1.0, 1.0))
+        return points
+    
+    @staticmethod
+    def histogram_match_points(source_histogram, reference_histogram, num_points=9):
+        """
+        Control points mapping a source histogram onto a reference (CDF matching)
+        Args:
+            source_histogram: Array of counts of the image to grade
+            reference_histogram: Array of counts of the reference image
+            num_points: Number of quantiles used as control points
+        Returns:
+            List of (x, y) control points in [0, 1], x strictly increasing
+        """
+        quantiles = np.linspace(0.0, 1.0, num_points)
+        quantiles[0], quantiles[-1] = 0.001, 0.999
         
-        # Optimize
-        from scipy.optimize import minimize
-        result = minimize(objective, initial_params, method='L-BFGS-B', 
-                         bounds=[(0, 1)] * control_points_count)
+        x = np.array([CurveMath.histogram_percentile(source_histogram, q) for q in quantiles])
+        y = np.array([CurveMath.histogram_percentile(reference_histogram, q) for q in quantiles])
         
-        # Convert back to control points
-        optimized_points = []
-        for i in range(control_points_count):
-            x = i / (control_points_count - 1)
-            y = np.clip(result.x[i], 0, 1)
-            optimized_points.append((x, y))
+        # Quantiles confondus (histogramme étroit) : un seul point par niveau d'entrée
+        x, first = np.unique(x, return_index=True)
+        points = list(zip(x.tolist(), y[first].tolist()))
         
-        return optimized_points
+        if points[0][0] > 0.0:
+            points.insert(0, (0.0, min(points[0][1], y[0])))
+        if points[-1][0] < 1.0:
+            points.append((1.0, max(points[-1][1], y[-1])))
+        return points
@@ -4,9 +4,14 @@ Advanced interpolation methods for curves and LUTs
 """
 
 import numpy as np
+import cv2
+import os
+from concurrent.futures import ThreadPoolExecutor
 from scipy import interpolate
 import math
 
+from .curve_math import CurveMath
+
 class Interpolation:
     """Advanced interpolation methods"""
     
@@ -151,55 +156,172 @@ class Interpolation:
         
         return result
     
+    # Méthodes et bords du rééchantillonnage OpenCV
+    RESAMPLING_METHODS = {
+        'nearest': cv2.INTER_NEAREST,
+        'linear': cv2.INTER_LINEAR,
+        'cubic': cv2.INTER_CUBIC,
+        'area': cv2.INTER_AREA,
+        'lanczos': cv2.INTER_LANCZOS4,
+    }
+    BORDER_MODES = {
+        'replicate': cv2.BORDER_REPLICATE,
+        'reflect': cv2.BORDER_REFLECT_101,
+        'wrap': cv2.BORDER_WRAP,
+        'constant': cv2.BORDER_CONSTANT,
+    }
+    # Largeur maximale des cartes de cv2.remap (limite d'OpenCV : SHRT_MAX)
+    REMAP_MAX_WIDTH = 16384
+    
+    @staticmethod
+    def remap(image, x_coords, y_coords, method='cubic', border='replicate', border_value=0.0):
+        """
+        Sample an image at arbitrary pixel positions (cv2.remap), for dense image warps.
+        OpenCV rounds the positions to 1/32 pixel and its 'cubic' kernel is Keys a = -0.75
+        (not the a = -0.5 of bicubic_interpolation_2d): use bicubic_interpolation_2d for
+        exact sampling of sparse points
+        Args:
+            image: (H, W) or (H, W, C) array, processed as float32
+            x_coords, y_coords: Pixel coordinate arrays of any shape (0 to W-1, 0 to H-1)
+            method: 'nearest', 'linear', 'cubic' or 'lanczos'
+            border: 'replicate', 'reflect', 'wrap' or 'constant'
+            border_value: Value outside the image in 'constant' mode
+        Returns:
+            float32 array of shape coords.shape (+ (C,) for multichannel images)
+        """
+        image = np.ascontiguousarray(image, dtype=np.float32)
+        x_coords = np.asarray(x_coords, dtype=np.float32)
+        shape = x_coords.shape
+        
+        # Cartes 2D de largeur bornée (coordonnées aplaties, complétées)
+        count = x_coords.size
+        width = max(min(count, Interpolation.REMAP_MAX_WIDTH), 1)
+        rows = -(-count // width) if count else 1
+        map_x = np.zeros(rows * width, dtype=np.float32)
+        map_y = np.zeros(rows * width, dtype=np.float32)
+        map_x[:count] = x_coords.ravel()
+        map_y[:count] = np.asarray(y_coords, dtype=np.float32).ravel()
+        map_x, map_y = map_x.reshape(rows, width), map_y.reshape(rows, width)
+        
+        flags = (Interpolation.RESAMPLING_METHODS[method], Interpolation.BORDER_MODES[border])
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        
+        # cv2.remap traite au plus 4 canaux à la fois
+        planes = image if image.ndim == 3 else image[..., np.newaxis]
+        result = np.empty((rows * width, channels), dtype=np.float32)
+        for start in range(0, channels, 4):
+            part = np.ascontiguousarray(planes[..., start:start + 4])
+            sampled = cv2.remap(part, map_x, map_y, flags[0], borderMode=flags[1], borderValue=border_value)
+            result[:, start:start + 4] = sampled.reshape(rows * width, -1)
+        
+        result = result[:count]
+        return result.reshape(shape) if image.ndim == 2 else result.reshape(shape + (channels,))
+    
+    @staticmethod
+    def resize(image, size=None, scale=None, method='area'):
+        """
+        Resize an image (cv2.resize, any channel count, float32)
+        Args:
+            image: (H, W) or (H, W, C) array
+            size: Target (width, height), or None to use scale
+            scale: Scale factor when size is None
+            method: 'nearest' and 'area' keep measured colors (no blending across edges for
+                    nearest, box average for area); 'linear', 'cubic' and 'lanczos' interpolate
+        Returns:
+            float32 array
+        """
+        image = np.asarray(image, dtype=np.float32)
+        height, width = image.shape[:2]
+        if size is None:
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        
+        if tuple(size) == (width, height):
+            return image.copy()
+        
+        # cv2.resize est limité en nombre de canaux : découpage par paquets de 4
+        if image.ndim == 3 and image.shape[2] > 4:
+            return np.concatenate([Interpolation.resize(image[..., start:start + 4], size, method=method)
+                                   for start in range(0, image.shape[2], 4)], axis=2)
+        
+        result = cv2.resize(np.ascontiguousarray(image), tuple(size),
+                            interpolation=Interpolation.RESAMPLING_METHODS[method])
+        if image.ndim == 3 and result.ndim == 2:
+            result = result[..., np.newaxis]
+        return result
+    
+    @staticmethod
+    def resample_frames(frames, function, *args, max_workers=None, **kwargs):
+        """
+        Apply a resampling function to every frame in parallel threads
+        (OpenCV releases the GIL during remap / resize)
+        Args:
+            frames: Sequence or (B, H, W, C) array of frames
+            function: Callable taking a frame first (e.g. Interpolation.resize)
+            max_workers: Thread count (defaults to the CPU count, at most 8)
+        Returns:
+            List of resampled frames
+        """
+        if len(frames) <= 1:
+            return [function(frame, *args, **kwargs) for frame in frames]
+        
+        workers = min(max_workers or min(8, os.cpu_count() or 1), len(frames))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda frame: function(frame, *args, **kwargs), frames))
+    
+    @staticmethod
+    def cubic_weights(fractions):
+        """
+        Keys cubic convolution weights (a = -0.5) of the four taps around each sample
+        Args:
+            fractions: Positions after the second tap ([0, 1) inside the image, up to [-1, 2]
+                       when the tap window is kept inside the image near its edges)
+        Returns:
+            (..., 4) weights of the taps at offsets -1, 0, 1, 2
+        """
+        f = np.asarray(fractions, dtype=np.float64)
+        f2 = f * f
+        f3 = f2 * f
+        return np.stack([-0.5 * f3 + f2 - 0.5 * f,
+                         1.5 * f3 - 2.5 * f2 + 1,
+                         -1.5 * f3 + 2 * f2 + 0.5 * f,
+                         0.5 * f3 - 0.5 * f2], axis=-1)
+    
     @staticmethod
     def bicubic_interpolation_2d(image, x_coords, y_coords):
         """
-        Bicubic interpolation for 2D images
+        Bicubic interpolation for 2D images at exact float positions (see remap for dense warps)
         Args:
-            image: 2D image array
-            x_coords, y_coords: Coordinate arrays
+            image: (H, W) or (H, W, C) image array
+            x_coords, y_coords: Normalized coordinate arrays (0 to 1)
         Returns:
-            Interpolated values
+            Interpolated values of shape coords.shape (+ (C,) for multichannel images)
         """
-        height, width = image.shape
+        height, width = image.shape[:2]
         
         # Scale coordinates to image indices
-        x_idx = x_coords * (width - 1)
-        y_idx = y_coords * (height - 1)
-        
-        # Get integer parts
-        x0 = np.floor(x_idx).astype(int)
-        y0 = np.floor(y_idx).astype(int)
-        
-        # Clamp to image bounds
-        x0 = np.clip(x0, 1, width - 3)
-        y0 = np.clip(y0, 1, height - 3)
-        
-        # Get fractional parts
-        dx = x_idx - x0
-        dy = y_idx - y0
-        
-        # Bicubic kernel
-        def cubic_kernel(t):
-            t = np.abs(t)
-            return np.where(t <= 1, 
-                          1.5 * t**3 - 2.5 * t**2 + 1,
-                          np.where(t <= 2, 
-                                 -0.5 * t**3 + 2.5 * t**2 - 4 * t + 2,
-                                 0))
-        
-        result = np.zeros_like(x_coords)
-        
-        # Sample 4x4 neighborhood
-        for j in range(-1, 3):
-            for i in range(-1, 3):
-                y_sample = np.clip(y0 + j, 0, height - 1)
-                x_sample = np.clip(x0 + i, 0, width - 1)
-                
-                weight = cubic_kernel(dx - i) * cubic_kernel(dy - j)
-                result += weight * image[y_sample, x_sample]
-        
-        return result
+        x_idx = np.clip(np.asarray(x_coords, dtype=np.float64) * (width - 1), 0, width - 1)
+        y_idx = np.clip(np.asarray(y_coords, dtype=np.float64) * (height - 1), 0, height - 1)
+        
+        # Fenêtre de 4 taps gardée dans l'image quand elle est assez grande : près des bords la
+        # fraction sort de [0, 1) et les polynômes de Keys restent exacts sur les rampes
+        def left_taps(coordinates, size):
+            low, high = (1, size - 3) if size >= 4 else (0, size - 1)
+            return np.clip(np.floor(coordinates).astype(np.intp), low, high)
+        
+        x0 = left_taps(x_idx, width)
+        y0 = left_taps(y_idx, height)
+        taps = np.arange(-1, 3)
+        x_taps = np.clip(x0[..., np.newaxis] + taps, 0, width - 1)
+        y_taps = np.clip(y0[..., np.newaxis] + taps, 0, height - 1)
+        
+        # Poids séparables calculés une fois par axe, puis 4x4 voisins en une seule indexation
+        x_weights = Interpolation.cubic_weights(x_idx - x0)
+        y_weights = Interpolation.cubic_weights(y_idx - y0)
+        neighborhood = np.asarray(image)[y_taps[..., :, np.newaxis], x_taps[..., np.newaxis, :]]
+        
+        if neighborhood.ndim > y_weights.ndim + 1:
+            return np.einsum('...jic,...j,...i->...c', neighborhood, y_weights, x_weights)
+        return np.einsum('...ji,...j,...i->...', neighborhood, y_weights, x_weights)
     
     @staticmethod
     def lanczos_interpolation_1d(data, coordinates, a=3):
@@ -212,38 +334,29 @@ class Interpolation:
         Returns:
             Interpolated values
         """
-        def lanczos_kernel(x, a):
-            x = np.abs(x)
-            return np.where(x == 0, 1,
-                          np.where(x < a, 
-                                 a * np.sin(np.pi * x) * np.sin(np.pi * x / a) / (np.pi**2 * x**2),
-                                 0))
-        
+        data = np.asarray(data)
+        coordinates = np.asarray(coordinates, dtype=np.float64)
         data_len = len(data)
-        result = np.zeros_like(coordinates)
-        
-        # Get integer and fractional parts
-        indices = np.floor(coordinates).astype(int)
-        fractions = coordinates - indices
-        
-        # For each output point
-        for i, (idx, frac) in enumerate(zip(indices, fractions)):
-            value = 0
-            weight_sum = 0
-            
-            # Sample neighborhood
-            for j in range(max(0, idx - a + 1), min(data_len, idx + a + 1)):
-                weight = lanczos_kernel(j - coordinates[i], a)
-                value += weight * data[j]
-                weight_sum += weight
-            
-            # Normalize
-            if weight_sum > 0:
-                result[i] = value / weight_sum
-            else:
-                result[i] = data[np.clip(idx, 0, data_len - 1)]
         
-        return result
+        # Table des 2a voisins de chaque coordonnée : (N, 2a)
+        indices = np.floor(coordinates).astype(np.intp)
+        neighbors = indices[..., np.newaxis] + np.arange(-a + 1, a + 1)
+        valid = (neighbors >= 0) & (neighbors < data_len)
+        
+        distance = np.abs(neighbors - coordinates[..., np.newaxis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = a * np.sin(np.pi * distance) * np.sin(np.pi * distance / a) / (np.pi ** 2 * distance ** 2)
+        weights = np.where(distance == 0, 1.0, weights)
+        weights = np.where(valid & (distance < a), weights, 0.0)
+        
+        values = data[np.clip(neighbors, 0, data_len - 1)]
+        weight_sum = weights.sum(axis=-1)
+        
+        # Normalize (valeur du voisin le plus proche quand les poids s'annulent)
+        nearest = data[np.clip(indices, 0, data_len - 1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = (weights * values).sum(axis=-1) / weight_sum
+        return np.where(weight_sum > 0, result, nearest)
     
     @staticmethod
     def hermite_interpolation(points, num_samples=256):
@@ -258,86 +371,46 @@ class Interpolation:
         if len(points) < 2:
             return np.linspace(0, 1, num_samples)
         
-        curve = np.zeros(num_samples)
-        
-        for i in range(num_samples):
-            t_global = i / (num_samples - 1)
-            
-            # Find segment
-            segment_idx = 0
-            for j in range(len(points) - 1):
-                if t_global >= points[j][0] and t_global <= points[j + 1][0]:
-                    segment_idx = j
-                    break
-            
-            if segment_idx < len(points) - 1:
-                p0 = points[segment_idx]
-                p1 = points[segment_idx + 1]
-                
-                # Local parameter
-                t = (t_global - p0[0]) / (p1[0] - p0[0])
-                
-                # Hermite basis functions
-                h00 = 2*t**3 - 3*t**2 + 1
-                h10 = t**3 - 2*t**2 + t
-                h01 = -2*t**3 + 3*t**2
-                h11 = t**3 - t**2
-                
-                # Interpolate
-                y = (h00 * p0[1] + 
-                     h10 * p0[3] * (p1[0] - p0[0]) +
-                     h01 * p1[1] + 
-                     h11 * p1[3] * (p1[0] - p0[0]))
-                
-                curve[i] = np.clip(y, 0, 1)
-            else:
-                curve[i] = points[-1][1]
-        
-        return curve
+        curve = CurveMath.evaluate_curves([points], num_samples, method='hermite')[0]
+        return np.clip(curve, 0, 1)
     
     @staticmethod
     def adaptive_interpolation(data, error_threshold=0.01):
         """
         Adaptive interpolation that adds points where needed
         Args:
-            data: Input data array
+            data: Input data array (N,) or (N, channels)
             error_threshold: Maximum allowed error
         Returns:
-            Adaptively sampled data
+            Tuple (sorted indices of the kept samples, their values)
         """
+        data = np.asarray(data)
         if len(data) < 3:
-            return data
+            return np.arange(len(data)), data
         
-        # Start with endpoints
-        result_indices = [0, len(data) - 1]
+        flat = data.reshape(len(data), -1).astype(np.float64)
+        kept = [np.array([0, len(data) - 1])]
         
-        def add_points_recursive(start_idx, end_idx):
-            if end_idx - start_idx <= 1:
-                return
-            
-            # Find midpoint
-            mid_idx = (start_idx + end_idx) // 2
-            
-            # Linear interpolation between start and end
-            t = (mid_idx - start_idx) / (end_idx - start_idx)
-            linear_value = data[start_idx] + t * (data[end_idx] - data[start_idx])
+        # File de travail itérative : tous les intervalles d'un même niveau traités ensemble
+        starts = np.array([0])
+        ends = np.array([len(data) - 1])
+        while len(starts):
+            splittable = ends - starts > 1
+            starts, ends = starts[splittable], ends[splittable]
             
-            # Check error
-            actual_value = data[mid_idx]
-            error = abs(actual_value - linear_value)
+            mids = (starts + ends) // 2
+            t = ((mids - starts) / (ends - starts))[:, np.newaxis]
+            linear_value = flat[starts] + t * (flat[ends] - flat[starts])
+            error = np.abs(flat[mids] - linear_value).max(axis=1)
             
-            if error > error_threshold:
-                # Add midpoint and recurse
-                result_indices.append(mid_idx)
-                add_points_recursive(start_idx, mid_idx)
-                add_points_recursive(mid_idx, end_idx)
-        
-        # Build adaptive sampling
-        add_points_recursive(0, len(data) - 1)
-        
-        # Sort indices and return sampled data
-        result_indices.sort()
-        return data[result_indices]
+            # Point milieu ajouté et intervalle coupé en deux si l'erreur dépasse le seuil
+            refine = error > error_threshold
+            kept.append(mids[refine])
+            starts, ends = (np.concatenate([starts[refine], mids[refine]]),
+                            np.concatenate([mids[refine], ends[refine]]))
+        
+        indices = np.unique(np.concatenate(kept))
+        return indices, data[indices]
     
     @staticmethod
     def monotonic_interpolation(x_points, y_points, x_new):
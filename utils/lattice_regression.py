@@ -0,0 +1,143 @@
+"""
+Lattice regression for ComfyUI-Curve_Master
+Direct least-squares fitting of 3D LUT lattices from scattered color samples
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import cg
+
+class LatticeRegression:
+    """Regularized lattice regression solver for 3D LUTs"""
+
+    # Poids du rappel vers l'identité (garantit un système défini positif)
+    IDENTITY_PRIOR = 1e-6
+    # Lissage minimal : sans lui les nœuds sans échantillons restent indéterminés
+    MIN_SMOOTHING = 0.01
+
+    @staticmethod
+    def interpolation_matrix(points, lut_size):
+        """
+        Build the sparse trilinear interpolation matrix of a lattice
+        Args:
+            points: (N, 3) array of RGB coordinates in [0, 1]
+            lut_size: Lattice size per axis
+        Returns:
+            CSR matrix (N, lut_size**3), lattice flattened in [r, g, b] order
+        """
+        points = np.clip(np.asarray(points, dtype=np.float64), 0.0, 1.0)
+        n = len(points)
+
+        idx = points * (lut_size - 1)
+        i0 = np.minimum(np.floor(idx).astype(np.int64), lut_size - 2)
+        frac = idx - i0
+
+        rows = np.tile(np.arange(n), 8)
+        cols = np.empty(8 * n, dtype=np.int64)
+        vals = np.empty(8 * n, dtype=np.float64)
+
+        corner = 0
+        for dr in (0, 1):
+            wr = frac[:, 0] if dr else 1.0 - frac[:, 0]
+            for dg in (0, 1):
+                wg = frac[:, 1] if dg else 1.0 - frac[:, 1]
+                for db in (0, 1):
+                    wb = frac[:, 2] if db else 1.0 - frac[:, 2]
+                    sl = slice(corner * n, (corner + 1) * n)
+                    cols[sl] = ((i0[:, 0] + dr) * lut_size + (i0[:, 1] + dg)) * lut_size + (i0[:, 2] + db)
+                    vals[sl] = wr * wg * wb
+                    corner += 1
+
+        return sparse.csr_matrix((vals, (rows, cols)), shape=(n, lut_size ** 3))
+
+    @staticmethod
+    def laplacian_matrix(lut_size):
+        """
+        Build the second-difference smoothness operator of a lattice
+        Args:
+            lut_size: Lattice size per axis
+        Returns:
+            CSR matrix stacking the second differences along r, g and b
+        """
+        eye = sparse.identity(lut_size, format='csr')
+        diff2 = sparse.diags([1.0, -2.0, 1.0], [0, 1, 2], shape=(lut_size - 2, lut_size), format='csr')
+
+        d_r = sparse.kron(sparse.kron(diff2, eye), eye)
+        d_g = sparse.kron(sparse.kron(eye, diff2), eye)
+        d_b = sparse.kron(sparse.kron(eye, eye), diff2)
+
+        return sparse.vstack([d_r, d_g, d_b]).tocsr()
+
+    @staticmethod
+    def identity_lattice(lut_size):
+        """
+        Identity lattice values
+        Args:
+            lut_size: Lattice size per axis
+        Returns:
+            (lut_size**3, 3) array, flattened in [r, g, b] order
+        """
+        coords = np.linspace(0, 1, lut_size)
+        r, g, b = np.meshgrid(coords, coords, coords, indexing='ij')
+        return np.column_stack([r.ravel(), g.ravel(), b.ravel()])
+
+    @staticmethod
+    def fit(source_points, target_points, lut_size, smoothing=0.1, weights=None,
+            initial_lut=None, max_iterations=400):
+        """
+        Fit a 3D LUT minimizing trilinear interpolation error plus a smoothness penalty
+        Args:
+            source_points: (N, 3) input colors in [0, 1]
+            target_points: (N, 3) output colors
+            lut_size: Lattice size per axis
+            smoothing: Smoothness weight (clamped to MIN_SMOOTHING)
+            weights: Optional (N,) per-sample weights
+            initial_lut: Optional (size, size, size, 3) starting lattice
+            max_iterations: Conjugate gradient iteration cap
+        Returns:
+            (lut_size, lut_size, lut_size, 3) LUT array indexed [r, g, b]
+        """
+        source_points = np.asarray(source_points, dtype=np.float64)
+        target_points = np.asarray(target_points, dtype=np.float64)
+
+        if weights is None:
+            weights = np.ones(len(source_points))
+        weights = np.asarray(weights, dtype=np.float64)
+
+        node_count = lut_size ** 3
+        total_weight = max(float(weights.sum()), 1.0)
+
+        # Normalisation : le poids de lissage est relatif à la densité moyenne par nœud
+        density = total_weight / node_count
+        smooth_weight = max(smoothing, LatticeRegression.MIN_SMOOTHING) * density
+        prior_weight = LatticeRegression.IDENTITY_PRIOR * max(density, 1.0)
+
+        interp = LatticeRegression.interpolation_matrix(source_points, lut_size)
+        interp_w = interp.multiply(weights[:, np.newaxis]).tocsr()
+
+        laplacian = LatticeRegression.laplacian_matrix(lut_size)
+        system = (interp_w.T @ interp
+                  + smooth_weight * (laplacian.T @ laplacian)
+                  + prior_weight * sparse.identity(node_count, format='csr')).tocsr()
+
+        identity = LatticeRegression.identity_lattice(lut_size)
+        rhs = interp_w.T @ target_points + prior_weight * identity
+
+        if initial_lut is not None:
+            start = np.asarray(initial_lut, dtype=np.float64).reshape(-1, 3)
+        else:
+            start = identity
+
+        # Préconditionneur de Jacobi
+        diagonal = system.diagonal()
+        diagonal[diagonal <= 0] = 1.0
+        preconditioner = sparse.diags(1.0 / diagonal)
+
+        result = np.empty((node_count, 3))
+        for c in range(3):
+            solution, info = cg(system, rhs[:, c], x0=start[:, c], maxiter=max_iterations, M=preconditioner)
+            if info > 0:
+                print(f"⚠️ Lattice regression: channel {c} stopped after {info} iterations")
+            result[:, c] = solution
+
+        return result.reshape(lut_size, lut_size, lut_size, 3)
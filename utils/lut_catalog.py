@@ -0,0 +1,241 @@
+"""
+LUT catalog for ComfyUI-Curve_Master
+Persistent, incrementally refreshed index of a LUT library directory
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .compiled_lut import CompiledLUT
+from .lut_parser import LUTParser
+from .lut_writer import LUTWriter
+
+class LUTCatalog:
+    """Recursive index of LUT files (subfolders are categories)"""
+
+    INDEX_FILE_NAME = ".lut_catalog.json"
+    INDEX_VERSION = 2
+
+    # Intervalle minimal entre deux parcours du dossier (secondes)
+    REFRESH_INTERVAL = 2.0
+
+    # Un catalogue par dossier, partagé entre les nœuds
+    _catalogs = {}
+    _catalogs_lock = threading.Lock()
+
+    def __init__(self, root, index_path=None):
+        """
+        Args:
+            root: LUT library directory
+            index_path: Optional index file path (defaults to root/.lut_catalog.json)
+        """
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path else self.root / self.INDEX_FILE_NAME
+        self._entries = {}
+        self._names = {}
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+        self._load_index()
+
+    @classmethod
+    def for_directory(cls, root):
+        """
+        Shared catalog of a directory
+        Args:
+            root: LUT library directory
+        Returns:
+            LUTCatalog instance
+        """
+        key = str(Path(root).resolve())
+        with cls._catalogs_lock:
+            if key not in cls._catalogs:
+                cls._catalogs[key] = cls(root)
+            return cls._catalogs[key]
+
+    @staticmethod
+    def fingerprint(file_path):
+        """
+        Content fingerprint of a file
+        Args:
+            file_path: File path
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _load_index(self):
+        """Load the persisted index (ignored if missing or from another version)"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.INDEX_VERSION:
+                self._entries = data.get('entries', {})
+                self._rebuild_names()
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save_index(self):
+        """Persist the index next to the library"""
+        try:
+            content = json.dumps({'version': self.INDEX_VERSION, 'entries': self._entries}, indent=1)
+            LUTWriter.atomic_write(self.index_path, content)
+        except OSError as e:
+            print(f"⚠️ LUT catalog: cannot save index {self.index_path}: {e}")
+
+    def _describe(self, file_path, relative_path, stat):
+        """Build the catalog entry of a LUT file"""
+        category = Path(relative_path).parent.as_posix()
+        entry = {
+            'relative_path': relative_path,
+            'category': '' if category == '.' else category,
+            'name': file_path.stem,
+            'format': file_path.suffix.lower()[1:],
+            'mtime': stat.st_mtime,
+            'file_size': stat.st_size,
+        }
+
+        try:
+            entry['fingerprint'] = self.fingerprint(file_path)
+            lut_info = LUTParser.parse_file(file_path)
+            entry['size'] = int(lut_info.get('size', 0))
+            entry['size_1d'] = int(lut_info.get('size_1d', 0))
+            entry['title'] = lut_info.get('title') or file_path.stem
+            compiled = CompiledLUT.from_parsed(lut_info)
+            entry['kind'] = compiled.kind
+            # Décision du chargeur : treillis appliqué comme trois courbes 1D
+            applied = compiled.separable()
+            entry['separable'] = applied is not compiled
+            if compiled.separable_error is not None:
+                entry['separable_error'] = compiled.separable_error
+        except Exception as e:
+            # Fichier conservé dans l'index pour ne pas le relire à chaque parcours
+            entry['error'] = str(e)
+
+        return entry
+
+    def _rebuild_names(self):
+        """Map display names ('category/name') to relative paths"""
+        names = {}
+        for relative_path in sorted(self._entries):
+            entry = self._entries[relative_path]
+            if 'error' in entry:
+                continue
+            name = f"{entry['category']}/{entry['name']}" if entry['category'] else entry['name']
+            if name in names:
+                # Même nom avec une autre extension
+                name = f"{name}{Path(relative_path).suffix.lower()}"
+            names[name] = relative_path
+        self._names = names
+
+    def refresh(self, force=False):
+        """
+        Update the index from the directory (only new or modified files are parsed)
+        Args:
+            force: Ignore the refresh interval
+        Returns:
+            True if the index changed
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.REFRESH_INTERVAL:
+                return False
+            self._last_refresh = now
+
+            if not self.root.exists():
+                changed = bool(self._entries)
+                self._entries = {}
+                self._names = {}
+                return changed
+
+            seen = set()
+            changed = False
+            for directory, subdirectories, files in os.walk(self.root):
+                subdirectories[:] = sorted(d for d in subdirectories if not d.startswith('.'))
+                for file_name in files:
+                    file_path = Path(directory) / file_name
+                    if file_path.suffix.lower() not in LUTParser.SUPPORTED_FORMATS or file_name.startswith('.'):
+                        continue
+
+                    relative_path = file_path.relative_to(self.root).as_posix()
+                    seen.add(relative_path)
+                    try:
+                        stat = file_path.stat()
+                    except OSError:
+                        continue
+
+                    entry = self._entries.get(relative_path)
+                    if entry and entry['mtime'] == stat.st_mtime and entry['file_size'] == stat.st_size:
+                        continue
+
+                    # Attendre un export en cours vers ce fichier avant de l'indexer
+                    LUTWriter.wait_for_export(file_path)
+                    self._entries[relative_path] = self._describe(file_path, relative_path, stat)
+                    changed = True
+
+            for relative_path in set(self._entries) - seen:
+                del self._entries[relative_path]
+                changed = True
+
+            if changed:
+                self._rebuild_names()
+                self._save_index()
+
+            return changed
+
+    def names(self):
+        """
+        Display names of the valid LUTs, sorted
+        Returns:
+            List of 'category/name' strings ('name' at the root)
+        """
+        self.refresh()
+        with self._lock:
+            return sorted(self._names, key=str.lower)
+
+    def categories(self):
+        """
+        Categories (subfolders) holding at least one LUT
+        Returns:
+            Sorted list of category paths ('' is the root)
+        """
+        self.refresh()
+        with self._lock:
+            return sorted({self._entries[path]['category'] for path in self._names.values()})
+
+    def lookup(self, name):
+        """
+        Catalog entry of a LUT
+        Args:
+            name: Display name or relative path
+        Returns:
+            Entry dictionary with an absolute 'path', or None
+        """
+        self.refresh()
+        with self._lock:
+            relative_path = self._names.get(name, name)
+            entry = self._entries.get(relative_path)
+            if entry is None or 'error' in entry:
+                return None
+            return dict(entry, path=str(self.root / relative_path))
+
+    def entries(self, category=None):
+        """
+        Catalog entries of the valid LUTs
+        Args:
+            category: Optional category filter
+        Returns:
+            List of entry dictionaries with an absolute 'path'
+        """
+        self.refresh()
+        with self._lock:
+            return [dict(self._entries[path], display_name=name, path=str(self.root / path))
+                    for name, path in sorted(self._names.items())
+                    if category is None or self._entries[path]['category'] == category]
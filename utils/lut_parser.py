@@ -4,14 +4,27 @@ Support for various LUT formats (.cube, .3dl, .csp, etc.)
 """
 
 import numpy as np
+import cv2
 import os
 import re
 from pathlib import Path
 
+from .lut_writer import LUTWriter
+from .compiled_lut import CompiledLUT
+
 class LUTParser:
     """Parser for various LUT file formats"""
     
-    SUPPORTED_FORMATS = ['.cube', '.3dl', '.csp', '.lut', '.mga']
+    SUPPORTED_FORMATS = ['.cube', '.3dl', '.csp', '.lut', '.mga', '.png', '.tif', '.tiff']
+    
+    # Images Hald CLUT
+    HALD_FORMATS = ['.png', '.tif', '.tiff']
+    
+    # Taille du treillis pour écrire une LUT 1D ou shaper+3D dans un format 3D
+    BAKE_SIZE = 33
+    
+    # Profondeur de sortie .3dl sans ligne d'en-tête (Lustre, Nuke et LUTWriter : 12 bits)
+    DEFAULT_3DL_OUTPUT_BITS = 12
     
     @staticmethod
     def parse_file(file_path):
@@ -39,24 +52,29 @@ class LUTParser:
             return LUTParser.parse_lut_file(file_path)
         elif extension == '.mga':
             return LUTParser.parse_mga_file(file_path)
+        elif extension in LUTParser.HALD_FORMATS:
+            return LUTParser.parse_hald_file(file_path)
         else:
             raise ValueError(f"Unsupported LUT format: {extension}")
     
     @staticmethod
     def parse_cube_file(file_path):
         """
-        Parse Adobe .cube LUT file
+        Parse Adobe / Resolve .cube LUT file (3D, 1D or 1D shaper + 3D)
         Args:
             file_path: Path to .cube file
         Returns:
-            Dictionary with LUT data and metadata
+            Dictionary with LUT data and metadata ('data' is None for a pure 1D LUT,
+            'curves' holds the per-channel 1D tables if any)
         """
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             lines = f.readlines()
         
-        lut_size = 33  # Default
+        lut_size = 0
+        lut_1d_size = 0
         domain_min = [0.0, 0.0, 0.0]
         domain_max = [1.0, 1.0, 1.0]
+        input_range_1d = None
         title = ""
         lut_data = []
         
@@ -72,6 +90,13 @@ class LUTParser:
                 title = line.split('"')[1] if '"' in line else line.split()[1]
             elif line.startswith('LUT_3D_SIZE'):
                 lut_size = int(line.split()[-1])
+            elif line.startswith('LUT_1D_SIZE'):
+                lut_1d_size = int(line.split()[-1])
+            elif line.startswith('LUT_1D_INPUT_RANGE'):
+                input_range_1d = [float(x) for x in line.split()[1:3]]
+            elif line.startswith('LUT_3D_INPUT_RANGE'):
+                low, high = [float(x) for x in line.split()[1:3]]
+                domain_min, domain_max = [low] * 3, [high] * 3
             elif line.startswith('DOMAIN_MIN'):
                 domain_min = [float(x) for x in line.split()[1:4]]
             elif line.startswith('DOMAIN_MAX'):
@@ -86,18 +111,39 @@ class LUTParser:
                     except ValueError:
                         continue
         
-        # Validate data size
-        expected_size = lut_size ** 3
+        if lut_size == 0 and lut_1d_size == 0:
+            lut_size = 33  # Default
+        
+        # Validate data size (1D table first, then the 3D lattice)
+        expected_size = lut_1d_size + lut_size ** 3
         if len(lut_data) != expected_size:
             raise ValueError(f"Invalid LUT data size: expected {expected_size}, got {len(lut_data)}")
         
-        # Reshape to 3D array
-        lut_array = np.array(lut_data, dtype=np.float32)
-        lut_3d = lut_array.reshape(lut_size, lut_size, lut_size, 3)
+        lut_array = np.array(lut_data, dtype=np.float32).reshape(-1, 3)
+        
+        curves = None
+        if lut_1d_size:
+            # Sans LUT_1D_INPUT_RANGE, la table 1D couvre le domaine déclaré (par canal)
+            table = lut_array[:lut_1d_size]
+            if input_range_1d is not None:
+                ranges = [input_range_1d] * 3
+            elif lut_size:
+                ranges = [[0.0, 1.0]] * 3
+            else:
+                ranges = list(zip(domain_min, domain_max))
+            curves = [(np.linspace(low, high, lut_1d_size), table[:, c]) for c, (low, high) in enumerate(ranges)]
+        
+        lut_3d = None
+        if lut_size:
+            # Reshape to 3D array (red varies fastest in the file) indexed [r, g, b]
+            lut_3d = lut_array[lut_1d_size:].reshape(lut_size, lut_size, lut_size, 3).transpose(2, 1, 0, 3)
+            lut_3d = np.ascontiguousarray(lut_3d)
         
         return {
             'data': lut_3d,
-            'size': lut_size,
+            'curves': curves,
+            'size': lut_size if lut_size else lut_1d_size,
+            'size_1d': lut_1d_size,
             'domain_min': domain_min,
             'domain_max': domain_max,
             'title': title,
@@ -117,25 +163,35 @@ class LUTParser:
             lines = f.readlines()
         
         lut_data = []
+        output_bits = None
         
         for line in lines:
             line = line.strip()
             
+            # Profondeur de sortie déclarée : commentaire de LUTWriter ou ligne Lustre "Mesh <entrée> <sortie>"
+            depth_match = re.match(r'#\s*output bit depth:\s*(\d+)', line, re.IGNORECASE)
+            if depth_match:
+                output_bits = int(depth_match.group(1))
+                continue
+            
             # Skip comments and empty lines
             if line.startswith('#') or not line:
                 continue
             
-            # Parse RGB data
             parts = line.split()
+            
+            if parts[0].lower() == 'mesh' and len(parts) == 3 and parts[2].isdigit():
+                output_bits = int(parts[2])
+                continue
+            
+            # Skip the input mesh line (one value per lattice point)
+            if len(parts) > 3 and not lut_data:
+                continue
+            
+            # Parse RGB data
             if len(parts) >= 3:
                 try:
-                    r, g, b = map(float, parts[:3])
-                    
-                    # Normalize if values are in 0-1023 range
-                    if max(r, g, b) > 1.0:
-                        r, g, b = r / 1023.0, g / 1023.0, b / 1023.0
-                    
-                    lut_data.append([r, g, b])
+                    lut_data.append([float(v) for v in parts[:3]])
                 except ValueError:
                     continue
         
@@ -152,8 +208,22 @@ class LUTParser:
             else:
                 raise ValueError(f"Cannot determine LUT size from {len(lut_data)} data points")
         
-        # Reshape to 3D array
         lut_array = np.array(lut_data, dtype=np.float32)
+        
+        # Normalisation par la profondeur de sortie du fichier (jamais déduite des valeurs : une LUT
+        # assombrissante resterait sous 1023). Sans déclaration : 12 bits, sauf valeurs flottantes
+        # (fichiers normalisés) ou au-delà de 4095 (16 bits)
+        if output_bits is None:
+            if not np.all(lut_array == np.round(lut_array)) and lut_array.max() <= 1.0:
+                output_bits = 0
+            elif lut_array.max() > (1 << LUTParser.DEFAULT_3DL_OUTPUT_BITS) - 1:
+                output_bits = 16
+            else:
+                output_bits = LUTParser.DEFAULT_3DL_OUTPUT_BITS
+        if output_bits > 0:
+            lut_array /= float((1 << output_bits) - 1)
+        
+        # Reshape to 3D array (blue varies fastest in the file) indexed [r, g, b]
         lut_3d = lut_array.reshape(lut_size, lut_size, lut_size, 3)
         
         return {
@@ -168,7 +238,7 @@ class LUTParser:
     @staticmethod
     def parse_csp_file(file_path):
         """
-        Parse Rising Sun Research .csp LUT file
+        Parse Rising Sun Research .csp LUT file (1D or 3D, with prelut shapers)
         Args:
             file_path: Path to .csp file
         Returns:
@@ -177,43 +247,77 @@ class LUTParser:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
         
-        # Parse header
-        lines = content.split('\n')
-        header_end = 0
+        lines = [line.strip() for line in content.split('\n')]
+        lines = [line for line in lines if line and not line.startswith('#')]
         
-        for i, line in enumerate(lines):
-            if line.strip() == 'BEGIN_DATA':
-                header_end = i + 1
-                break
+        if not lines or lines[0] != 'CSPLUTV100' or len(lines) < 2:
+            raise ValueError(f"Invalid CSP header in {file_path}")
         
-        # Parse data section
-        lut_data = []
-        for line in lines[header_end:]:
-            line = line.strip()
-            if line == 'END_DATA' or not line:
-                break
-            
-            parts = line.split()
-            if len(parts) >= 3:
-                try:
-                    r, g, b = map(float, parts[:3])
-                    lut_data.append([r, g, b])
-                except ValueError:
-                    continue
+        lut_type = lines[1].upper()
+        pos = 2
+        title = Path(file_path).stem
         
-        # Determine size
-        lut_size = round(len(lut_data) ** (1/3))
+        # Bloc de métadonnées optionnel (la première ligne sert de titre)
+        if pos < len(lines) and lines[pos] == 'BEGIN_METADATA':
+            end = lines.index('END_METADATA', pos)
+            if end > pos + 1:
+                title = lines[pos + 1]
+            pos = end + 1
         
-        # Reshape to 3D array
+        # Trois preluts (une par canal) : nombre de points, entrées, sorties
+        preluts = []
+        for _ in range(3):
+            count = int(lines[pos])
+            inputs = np.array(lines[pos + 1].split()[:count], dtype=np.float64)
+            outputs = np.array(lines[pos + 2].split()[:count], dtype=np.float64)
+            if len(inputs) != count or len(outputs) != count:
+                raise ValueError(f"Invalid CSP prelut in {file_path}")
+            preluts.append((inputs, outputs))
+            pos += 3
+        
+        if lut_type == '3D':
+            lut_size = int(lines[pos].split()[0])
+            data_count = lut_size ** 3
+        else:
+            lut_size = int(lines[pos])
+            data_count = lut_size
+        pos += 1
+        
+        lut_data = [line.split()[:3] for line in lines[pos:pos + data_count]]
+        if len(lut_data) != data_count:
+            raise ValueError(f"Invalid LUT data size: expected {data_count}, got {len(lut_data)}")
         lut_array = np.array(lut_data, dtype=np.float32)
-        lut_3d = lut_array.reshape(lut_size, lut_size, lut_size, 3)
+        
+        # Preluts identité (0 -> 0, 1 -> 1) : inutile de les appliquer
+        identity = all(len(x) == 2 and np.allclose(x, [0.0, 1.0]) and np.allclose(y, [0.0, 1.0])
+                       for x, y in preluts)
+        
+        if lut_type == '3D':
+            # Reshape to 3D array (red varies fastest in the file) indexed [r, g, b]
+            lut_3d = lut_array.reshape(lut_size, lut_size, lut_size, 3).transpose(2, 1, 0, 3)
+            lut_3d = np.ascontiguousarray(lut_3d)
+            curves = None if identity else preluts
+        else:
+            # LUT 1D : table régulièrement espacée sur [0, 1], composée avec la prelut
+            lut_3d = None
+            positions = np.linspace(0.0, 1.0, lut_size)
+            if identity:
+                curves = [(positions, lut_array[:, c]) for c in range(3)]
+            else:
+                # Composition échantillonnée finement sur la plage d'entrée de chaque prelut
+                curves = []
+                for c, (x, y) in enumerate(preluts):
+                    samples = np.linspace(x[0], x[-1], max(lut_size, 1024))
+                    curves.append((samples, np.interp(np.interp(samples, x, y), positions, lut_array[:, c])))
         
         return {
             'data': lut_3d,
+            'curves': curves,
             'size': lut_size,
+            'size_1d': lut_size if lut_3d is None else 0,
             'domain_min': [0.0, 0.0, 0.0],
             'domain_max': [1.0, 1.0, 1.0],
-            'title': Path(file_path).stem,
+            'title': title,
             'format': 'csp'
         }
     
@@ -230,10 +334,10 @@ class LUTParser:
             content = f.read()
         
         # Try to detect format based on content
-        if 'LUT_3D_SIZE' in content:
+        if 'LUT_3D_SIZE' in content or 'LUT_1D_SIZE' in content:
             # Looks like a .cube file
             return LUTParser.parse_cube_file(file_path)
-        elif 'BEGIN_DATA' in content:
+        elif content.lstrip().startswith('CSPLUTV100'):
             # Looks like a .csp file
             return LUTParser.parse_csp_file(file_path)
         else:
@@ -253,62 +357,140 @@ class LUTParser:
         # This is a basic text-based .mga parser
         return LUTParser.parse_3dl_file(file_path)  # Fallback to 3dl parser
     
+    @staticmethod
+    def parse_hald_file(file_path):
+        """
+        Parse Hald CLUT image (.png, .tif, 8 or 16 bits)
+        Args:
+            file_path: Path to Hald image
+        Returns:
+            Dictionary with LUT data and metadata
+        """
+        # Décodage depuis un buffer : fonctionne aussi avec les chemins non ASCII
+        buffer = np.fromfile(str(file_path), dtype=np.uint8)
+        image = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+        
+        if image is None or image.ndim != 3 or image.shape[2] < 3:
+            raise ValueError(f"Cannot read Hald image: {file_path}")
+        
+        # BGR(A) -> RGB et normalisation selon la profondeur
+        image = image[..., 2::-1]
+        if image.dtype == np.uint8:
+            image = image.astype(np.float32) / 255.0
+        elif image.dtype == np.uint16:
+            image = image.astype(np.float32) / 65535.0
+        else:
+            image = image.astype(np.float32)
+        
+        lut_3d = LUTParser.hald_to_lut(image)
+        
+        return {
+            'data': lut_3d,
+            'size': lut_3d.shape[0],
+            'domain_min': [0.0, 0.0, 0.0],
+            'domain_max': [1.0, 1.0, 1.0],
+            'title': Path(file_path).stem,
+            'format': 'hald'
+        }
+    
+    @staticmethod
+    def hald_identity(level):
+        """
+        Generate an identity Hald CLUT image
+        Args:
+            level: Hald level (lattice size is level**2, image side is level**3)
+        Returns:
+            float32 array (level**3, level**3, 3) in [0, 1]
+        """
+        if level < 2:
+            raise ValueError(f"Invalid Hald level: {level}")
+        
+        lut_size = level * level
+        coords = np.linspace(0.0, 1.0, lut_size, dtype=np.float32)
+        
+        # Ordre raster : le rouge varie le plus vite, puis le vert, puis le bleu
+        b, g, r = np.meshgrid(coords, coords, coords, indexing='ij')
+        image = np.stack([r, g, b], axis=-1)
+        
+        return image.reshape(level ** 3, level ** 3, 3)
+    
+    @staticmethod
+    def hald_to_lut(image):
+        """
+        Read a (processed) Hald CLUT image back into a 3D LUT
+        Args:
+            image: Array (level**3, level**3, 3)
+        Returns:
+            3D LUT array (size, size, size, 3) indexed [r, g, b]
+        """
+        image = np.asarray(image)
+        height, width = image.shape[:2]
+        level = round(width ** (1 / 3))
+        
+        if height != width or level ** 3 != width or image.shape[2] < 3:
+            raise ValueError(f"Invalid Hald image dimensions: {width}x{height}")
+        
+        lut_size = level * level
+        lut_3d = image[..., :3].reshape(lut_size, lut_size, lut_size, 3)
+        
+        return np.ascontiguousarray(lut_3d.transpose(2, 1, 0, 3), dtype=np.float32)
+    
     @staticmethod
     def write_cube_file(lut_data, file_path, title="Generated LUT", domain_min=None, domain_max=None):
         """
         Write LUT data to .cube file
         Args:
-            lut_data: 3D numpy array of LUT data
+            lut_data: 3D numpy array of LUT data indexed [r, g, b]
             file_path: Output file path
             title: LUT title
             domain_min: Domain minimum values
             domain_max: Domain maximum values
         """
-        if domain_min is None:
-            domain_min = [0.0, 0.0, 0.0]
-        if domain_max is None:
-            domain_max = [1.0, 1.0, 1.0]
-        
-        lut_size = lut_data.shape[0]
-        
-        with open(file_path, 'w') as f:
-            # Write header
-            f.write(f'# Generated by ComfyUI Curve Master\n')
-            f.write(f'TITLE "{title}"\n')
-            f.write(f'DOMAIN_MIN {domain_min[0]:.6f} {domain_min[1]:.6f} {domain_min[2]:.6f}\n')
-            f.write(f'DOMAIN_MAX {domain_max[0]:.6f} {domain_max[1]:.6f} {domain_max[2]:.6f}\n')
-            f.write(f'LUT_3D_SIZE {lut_size}\n\n')
-            
-            # Write data
-            for b in range(lut_size):
-                for g in range(lut_size):
-                    for r in range(lut_size):
-                        rgb = lut_data[r, g, b]
-                        f.write(f'{rgb[0]:.6f} {rgb[1]:.6f} {rgb[2]:.6f}\n')
+        LUTWriter.write_cube(lut_data, file_path, title, domain_min, domain_max)
+    
+    @staticmethod
+    def write_cube_1d_file(table, file_path, title=None, input_range=None):
+        """
+        Write per-channel curves to a 1D .cube file
+        Args:
+            table: (size, 3) array of RGB output values
+            file_path: Output file path
+            title: Optional LUT title
+            input_range: Input range (min, max) covered by the table
+        """
+        LUTWriter.write_cube_1d(table, file_path, title, input_range)
     
     @staticmethod
     def write_3dl_file(lut_data, file_path):
         """
         Write LUT data to .3dl file
         Args:
-            lut_data: 3D numpy array of LUT data
+            lut_data: 3D numpy array of LUT data indexed [r, g, b]
             file_path: Output file path
         """
-        lut_size = lut_data.shape[0]
-        
-        with open(file_path, 'w') as f:
-            # Write header comment
-            f.write('# Generated by ComfyUI Curve Master\n')
-            
-            # Write data (3dl format uses 0-1023 range)
-            for b in range(lut_size):
-                for g in range(lut_size):
-                    for r in range(lut_size):
-                        rgb = lut_data[r, g, b]
-                        r_val = int(rgb[0] * 1023)
-                        g_val = int(rgb[1] * 1023)
-                        b_val = int(rgb[2] * 1023)
-                        f.write(f'{r_val} {g_val} {b_val}\n')
+        LUTWriter.write_3dl(lut_data, file_path)
+    
+    @staticmethod
+    def write_csp_file(lut_data, file_path, title=None):
+        """
+        Write LUT data to .csp file
+        Args:
+            lut_data: 3D numpy array of LUT data indexed [r, g, b]
+            file_path: Output file path
+            title: Optional LUT title
+        """
+        LUTWriter.write_csp(lut_data, file_path, title)
+    
+    @staticmethod
+    def write_hald_file(lut_data, file_path, bit_depth=16):
+        """
+        Write LUT data as a Hald CLUT image
+        Args:
+            lut_data: 3D numpy array of LUT data indexed [r, g, b]
+            file_path: Output .png or .tif path
+            bit_depth: 8 or 16 bits per channel
+        """
+        LUTWriter.write_hald(lut_data, file_path, bit_depth)
     
     @staticmethod
     def convert_lut_format(input_path, output_path, output_format=None):
@@ -317,7 +499,8 @@ class LUTParser:
         Args:
             input_path: Input LUT file path
             output_path: Output LUT file path
-            output_format: Target format ('cube', '3dl', etc.)
+            output_format: Target format ('cube', '3dl', etc.); a Hald image output resamples
+                           lattices whose size is not a square to LUTWriter.hald_size()
         """
         # Parse input LUT
         lut_info = LUTParser.parse_file(input_path)
@@ -326,17 +509,42 @@ class LUTParser:
         if output_format is None:
             output_format = Path(output_path).suffix.lower()[1:]  # Remove dot
         
+        lut_data = lut_info['data']
+        domain_min = lut_info.get('domain_min')
+        domain_max = lut_info.get('domain_max')
+        curves = lut_info.get('curves')
+        
+        if curves is not None:
+            compiled = CompiledLUT.from_parsed(lut_info)
+            
+            # LUT 1D vers .cube : la table reste 1D
+            if output_format == 'cube' and lut_data is None:
+                input_range, table = compiled.sample_curves(max(len(x) for x, _ in curves))
+                LUTParser.write_cube_1d_file(table, output_path, lut_info.get('title'), input_range)
+                return
+            
+            # Autres formats : courbes 1D / shaper échantillonnés sur un treillis 3D
+            lut_data = compiled.bake(LUTParser.BAKE_SIZE)
+            domain_min, domain_max = compiled.input_range()
+        
         # Write in target format
         if output_format == 'cube':
             LUTParser.write_cube_file(
-                lut_info['data'], 
+                lut_data, 
                 output_path, 
                 lut_info.get('title', 'Converted LUT'),
-                lut_info.get('domain_min'),
-                lut_info.get('domain_max')
+                domain_min,
+                domain_max
             )
         elif output_format == '3dl':
-            LUTParser.write_3dl_file(lut_info['data'], output_path)
+            LUTParser.write_3dl_file(lut_data, output_path)
+        elif output_format == 'csp':
+            LUTParser.write_csp_file(lut_data, output_path, lut_info.get('title'))
+        elif f".{output_format}" in LUTParser.HALD_FORMATS:
+            hald_size = LUTWriter.hald_size(lut_data.shape[0])
+            if hald_size != lut_data.shape[0]:
+                lut_data = CompiledLUT(lut_data, domain_min=domain_min, domain_max=domain_max).bake(hald_size)
+            LUTParser.write_hald_file(lut_data, output_path)
         else:
             raise ValueError(f"Unsupported output format: {output_format}")
     
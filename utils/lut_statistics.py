@@ -0,0 +1,154 @@
+"""
+LUT fit statistics for ComfyUI-Curve_Master
+Streaming per-cell sufficient statistics of before/after color pairs
+"""
+
+import io
+import numpy as np
+from pathlib import Path
+
+from .lut_writer import LUTWriter
+
+class LUTStatistics:
+    """Per-cell sums, counts and second moments of color correspondences"""
+
+    def __init__(self, bins=64):
+        """
+        Args:
+            bins: Number of accumulation cells per RGB axis
+        """
+        self.bins = bins
+        cell_count = bins ** 3
+        self.counts = np.zeros(cell_count, dtype=np.float64)
+        self.source_sums = np.zeros((cell_count, 3), dtype=np.float64)
+        self.target_sums = np.zeros((cell_count, 3), dtype=np.float64)
+        self.target_squares = np.zeros((cell_count, 3), dtype=np.float64)
+
+    def cell_indices(self, points):
+        """
+        Flat cell index of each color
+        Args:
+            points: (N, 3) colors in [0, 1]
+        Returns:
+            (N,) int array of cell indices
+        """
+        cells = np.clip((np.asarray(points) * self.bins).astype(np.int64), 0, self.bins - 1)
+        return (cells[:, 0] * self.bins + cells[:, 1]) * self.bins + cells[:, 2]
+
+    def add_samples(self, source_points, target_points, weights=None):
+        """
+        Accumulate color correspondences
+        Args:
+            source_points: (N, 3) input colors in [0, 1]
+            target_points: (N, 3) output colors
+            weights: Optional (N,) per-sample weights
+        """
+        source_points = np.asarray(source_points, dtype=np.float64).reshape(-1, 3)
+        target_points = np.asarray(target_points, dtype=np.float64).reshape(-1, 3)
+        if len(source_points) == 0:
+            return
+
+        if weights is None:
+            weights = np.ones(len(source_points))
+        weights = np.asarray(weights, dtype=np.float64)
+
+        cells = self.cell_indices(source_points)
+        cell_count = self.bins ** 3
+
+        self.counts += np.bincount(cells, weights=weights, minlength=cell_count)
+        for c in range(3):
+            weighted_target = weights * target_points[:, c]
+            self.source_sums[:, c] += np.bincount(cells, weights=weights * source_points[:, c], minlength=cell_count)
+            self.target_sums[:, c] += np.bincount(cells, weights=weighted_target, minlength=cell_count)
+            self.target_squares[:, c] += np.bincount(cells, weights=weighted_target * target_points[:, c],
+                                                     minlength=cell_count)
+
+    def merge(self, other):
+        """
+        Add the statistics of another accumulator
+        Args:
+            other: LUTStatistics with the same number of bins
+        """
+        if other.bins != self.bins:
+            raise ValueError(f"Cannot merge statistics with {other.bins} bins into {self.bins} bins")
+
+        self.counts += other.counts
+        self.source_sums += other.source_sums
+        self.target_sums += other.target_sums
+        self.target_squares += other.target_squares
+
+    @property
+    def total_count(self):
+        """Total accumulated sample weight"""
+        return float(self.counts.sum())
+
+    def occupied_cells(self):
+        """Indices of cells holding at least one sample"""
+        return np.flatnonzero(self.counts > 0)
+
+    def centroids(self):
+        """
+        Per-cell mean correspondences
+        Returns:
+            Tuple (source_means, target_means, counts) over occupied cells
+        """
+        cells = self.occupied_cells()
+        counts = self.counts[cells]
+        source_means = self.source_sums[cells] / counts[:, np.newaxis]
+        target_means = self.target_sums[cells] / counts[:, np.newaxis]
+        return source_means, target_means, counts
+
+    def target_variance(self):
+        """
+        Per-cell variance of the target colors
+        Returns:
+            (M, 3) variances over occupied cells
+        """
+        cells = self.occupied_cells()
+        counts = self.counts[cells][:, np.newaxis]
+        means = self.target_sums[cells] / counts
+        return np.maximum(self.target_squares[cells] / counts - means ** 2, 0.0)
+
+    def save(self, file_path):
+        """
+        Save the statistics of occupied cells to a compressed .npz file
+        (atomic write, see LUTWriter.atomic_write)
+        Args:
+            file_path: Output file path
+        """
+        cells = self.occupied_cells()
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            version=np.int64(1),
+            bins=np.int64(self.bins),
+            cells=cells,
+            counts=self.counts[cells],
+            source_sums=self.source_sums[cells],
+            target_sums=self.target_sums[cells],
+            target_squares=self.target_squares[cells],
+        )
+        LUTWriter.atomic_write(file_path, buffer.getvalue())
+
+    @staticmethod
+    def load(file_path):
+        """
+        Load statistics saved with save()
+        Args:
+            file_path: Path to .npz statistics file
+        Returns:
+            LUTStatistics instance
+        """
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Statistics file not found: {file_path}")
+
+        with np.load(file_path) as data:
+            stats = LUTStatistics(int(data['bins']))
+            cells = data['cells']
+            stats.counts[cells] = data['counts']
+            stats.source_sums[cells] = data['source_sums']
+            stats.target_sums[cells] = data['target_sums']
+            stats.target_squares[cells] = data['target_squares']
+
+        return stats
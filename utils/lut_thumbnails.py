@@ -0,0 +1,187 @@
+"""
+LUT thumbnails for ComfyUI-Curve_Master
+Small previews of LUTs applied to a reference image, cached on disk by fingerprint
+"""
+
+import numpy as np
+import cv2
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .compiled_lut import CompiledLUT
+from .lut_parser import LUTParser
+from .lut_writer import LUTWriter
+
+class LUTThumbnails:
+    """Disk-cached LUT thumbnail renderer"""
+
+    DEFAULT_SIZE = 128
+    MAX_SIZE = 512
+    JPEG_QUALITY = 85
+
+    # À incrémenter si le rendu change (invalide les vignettes et ETags existants)
+    RENDER_VERSION = 1
+
+    def __init__(self, cache_dir, reference_path=None, max_workers=None):
+        """
+        Args:
+            cache_dir: Directory of cached thumbnails
+            reference_path: Optional reference image (a gradient is used otherwise)
+            max_workers: Size of the background rendering pool
+        """
+        self.cache_dir = Path(cache_dir)
+        self.reference_path = Path(reference_path) if reference_path else None
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+
+        self._references = {}
+        self._executor = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def gradient_reference(size):
+        """
+        Reference gradient: hue sweep, lightness from top to bottom, gray ramp below
+        Args:
+            size: Image side in pixels
+        Returns:
+            float32 RGB array (size, size, 3) in [0, 1]
+        """
+        ramp_height = max(size // 6, 1)
+        height = size - ramp_height
+
+        hue = np.linspace(0.0, 360.0, size, endpoint=False, dtype=np.float32)
+        lightness = np.linspace(0.9, 0.1, height, dtype=np.float32)
+
+        hls = np.empty((height, size, 3), dtype=np.float32)
+        hls[..., 0] = hue[np.newaxis, :]
+        hls[..., 1] = lightness[:, np.newaxis]
+        hls[..., 2] = 0.8
+        colors = cv2.cvtColor(hls, cv2.COLOR_HLS2RGB)
+
+        gray = np.linspace(0.0, 1.0, size, dtype=np.float32)
+        ramp = np.repeat(np.repeat(gray[np.newaxis, :, np.newaxis], ramp_height, axis=0), 3, axis=2)
+
+        return np.concatenate([colors, ramp], axis=0)
+
+    def reference_image(self, size):
+        """Reference image at a given size (cached)"""
+        with self._lock:
+            if size in self._references:
+                return self._references[size]
+
+        image = None
+        if self.reference_path is not None and self.reference_path.exists():
+            buffer = np.fromfile(str(self.reference_path), dtype=np.uint8)
+            decoded = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+            if decoded is not None:
+                # Recadrage carré centré puis réduction
+                h, w = decoded.shape[:2]
+                side = min(h, w)
+                top, left = (h - side) // 2, (w - side) // 2
+                decoded = cv2.resize(decoded[top:top + side, left:left + side], (size, size),
+                                     interpolation=cv2.INTER_AREA)
+                image = decoded[..., ::-1].astype(np.float32) / 255.0
+
+        if image is None:
+            image = self.gradient_reference(size)
+
+        with self._lock:
+            self._references[size] = image
+        return image
+
+    def cache_path(self, fingerprint, size):
+        """Cached thumbnail file of a LUT fingerprint"""
+        return self.cache_dir / f"{fingerprint}_{size}_v{self.RENDER_VERSION}.jpg"
+
+    def etag(self, fingerprint, size):
+        """HTTP entity tag of a thumbnail"""
+        return f'"{fingerprint}-{size}-v{self.RENDER_VERSION}"'
+
+    def render(self, lut_path, size):
+        """
+        Render a thumbnail without caching
+        Args:
+            lut_path: LUT file path
+            size: Thumbnail side in pixels
+        Returns:
+            JPEG bytes
+        """
+        compiled_lut = CompiledLUT.from_parsed(LUTParser.parse_file(lut_path))
+        result = compiled_lut.apply(self.reference_image(size))
+
+        result = np.rint(np.clip(result, 0.0, 1.0) * 255).astype(np.uint8)
+        success, encoded = cv2.imencode('.jpg', np.ascontiguousarray(result[..., ::-1]),
+                                        [cv2.IMWRITE_JPEG_QUALITY, self.JPEG_QUALITY])
+        if not success:
+            raise ValueError(f"Cannot encode thumbnail of {lut_path}")
+        return encoded.tobytes()
+
+    def get(self, lut_path, fingerprint, size=DEFAULT_SIZE):
+        """
+        Cached thumbnail of a LUT, rendered on first request
+        Args:
+            lut_path: LUT file path
+            fingerprint: LUT content fingerprint (cache key)
+            size: Thumbnail side in pixels
+        Returns:
+            Path of the cached JPEG file
+        """
+        size = int(np.clip(size, 16, self.MAX_SIZE))
+        cache_path = self.cache_path(fingerprint, size)
+        if cache_path.exists():
+            return cache_path
+
+        # Une demande pendant le rendu en arrière-plan attend ce rendu
+        with self._lock:
+            future = self._in_flight.get(cache_path)
+        if future is not None:
+            future.result()
+            return cache_path
+
+        LUTWriter.atomic_write(cache_path, self.render(lut_path, size))
+        return cache_path
+
+    def warm(self, entries, size=DEFAULT_SIZE):
+        """
+        Render missing thumbnails in the background pool
+        Args:
+            entries: Catalog entries ('path' and 'fingerprint')
+            size: Thumbnail side in pixels
+        Returns:
+            Number of thumbnails queued
+        """
+        size = int(np.clip(size, 16, self.MAX_SIZE))
+        queued = 0
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="curve_master_thumbnails")
+
+            for entry in entries:
+                cache_path = self.cache_path(entry['fingerprint'], size)
+                if cache_path in self._in_flight or cache_path.exists():
+                    continue
+
+                future = self._executor.submit(self._render_to_cache, entry['path'], cache_path, size)
+                self._in_flight[cache_path] = future
+                future.add_done_callback(lambda _, key=cache_path: self._finish(key))
+                queued += 1
+
+        return queued
+
+    def _render_to_cache(self, lut_path, cache_path, size):
+        """Background rendering task"""
+        try:
+            LUTWriter.atomic_write(cache_path, self.render(lut_path, size))
+        except Exception as e:
+            print(f"⚠️ Thumbnail rendering failed for {lut_path}: {e}")
+            raise
+
+    def _finish(self, cache_path):
+        """Forget a finished background task"""
+        with self._lock:
+            self._in_flight.pop(cache_path, None)
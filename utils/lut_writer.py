@@ -0,0 +1,281 @@
+"""
+LUT Writer for ComfyUI-Curve_Master
+Vectorized, atomic writers for the supported LUT formats
+"""
+
+import numpy as np
+import cv2
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class LUTWriter:
+    """Writers for LUT files (lattices indexed [r, g, b])"""
+
+    HEADER_COMMENT = "# Generated by ComfyUI Curve Master"
+
+    # Profondeurs .3dl : maillage d'entrée 10 bits, valeurs de sortie 12 bits
+    MESH_MAX_3DL = 1023
+    OUTPUT_MAX_3DL = 4095
+
+    # File d'export en arrière-plan (un seul thread : les écritures restent ordonnées)
+    _export_executor = None
+    _pending_exports = {}
+    _export_lock = threading.Lock()
+
+    @staticmethod
+    def submit_export(file_path, write_function, *args, **kwargs):
+        """
+        Queue a write on the background export thread
+        Args:
+            file_path: Path of the file being written (used for tracking and logs)
+            write_function: Callable performing the write
+            *args, **kwargs: Arguments for write_function
+        Returns:
+            concurrent.futures.Future of the write
+        """
+        key = str(Path(file_path).resolve())
+        start_time = time.time()
+
+        with LUTWriter._export_lock:
+            if LUTWriter._export_executor is None:
+                LUTWriter._export_executor = ThreadPoolExecutor(max_workers=1,
+                                                                thread_name_prefix="curve_master_export")
+            future = LUTWriter._export_executor.submit(write_function, *args, **kwargs)
+            LUTWriter._pending_exports[key] = future
+
+        def on_done(done_future):
+            with LUTWriter._export_lock:
+                if LUTWriter._pending_exports.get(key) is done_future:
+                    del LUTWriter._pending_exports[key]
+
+            error = done_future.exception()
+            if error is not None:
+                print(f"❌ Background export failed for {file_path}: {error}")
+            else:
+                print(f"💾 Background export written: {file_path} ({time.time() - start_time:.2f}s)")
+
+        future.add_done_callback(on_done)
+        return future
+
+    @staticmethod
+    def wait_for_export(file_path, timeout=None):
+        """
+        Block until a queued write of file_path has finished
+        Args:
+            file_path: Path of the file
+            timeout: Optional timeout in seconds
+        Returns:
+            True if no write is pending anymore
+        """
+        with LUTWriter._export_lock:
+            future = LUTWriter._pending_exports.get(str(Path(file_path).resolve()))
+
+        if future is None:
+            return True
+
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            # L'échec est déjà signalé par le callback
+            pass
+        return future.done()
+
+    @staticmethod
+    def atomic_write(file_path, content):
+        """
+        Write content through a temporary file renamed over the target
+        Args:
+            file_path: Output file path
+            content: Text or bytes to write
+        """
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+        try:
+            if isinstance(content, bytes):
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+            else:
+                with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+                    f.write(content)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def lattice_rows(lut_data, red_fastest=True):
+        """
+        Flatten a lattice into file order
+        Args:
+            lut_data: 3D LUT array (size, size, size, 3) indexed [r, g, b]
+            red_fastest: Red index varies fastest (.cube, .csp) or slowest (.3dl)
+        Returns:
+            (size**3, 3) array of RGB rows
+        """
+        lut_data = np.asarray(lut_data)
+        if red_fastest:
+            lut_data = lut_data.transpose(2, 1, 0, 3)
+        return lut_data.reshape(-1, 3)
+
+    @staticmethod
+    def format_rows(rows, fmt):
+        """
+        Format all rows with a single string operation
+        Args:
+            rows: (N, 3) array
+            fmt: printf-style format of one row (without newline)
+        Returns:
+            Formatted text block
+        """
+        if len(rows) == 0:
+            return ""
+        return ((fmt + "\n") * len(rows)) % tuple(rows.ravel().tolist())
+
+    @staticmethod
+    def write_cube(lut_data, file_path, title=None, domain_min=None, domain_max=None):
+        """
+        Write LUT data to .cube file
+        Args:
+            lut_data: 3D LUT array indexed [r, g, b]
+            file_path: Output file path
+            title: Optional LUT title
+            domain_min: Domain minimum values
+            domain_max: Domain maximum values
+        """
+        if domain_min is None:
+            domain_min = [0.0, 0.0, 0.0]
+        if domain_max is None:
+            domain_max = [1.0, 1.0, 1.0]
+
+        lut_size = lut_data.shape[0]
+
+        header = [LUTWriter.HEADER_COMMENT]
+        if title:
+            header.append(f'TITLE "{title}"')
+        header.append(f'DOMAIN_MIN {domain_min[0]:.6f} {domain_min[1]:.6f} {domain_min[2]:.6f}')
+        header.append(f'DOMAIN_MAX {domain_max[0]:.6f} {domain_max[1]:.6f} {domain_max[2]:.6f}')
+        header.append(f'LUT_3D_SIZE {lut_size}')
+
+        rows = LUTWriter.lattice_rows(lut_data, red_fastest=True).astype(np.float64)
+        body = LUTWriter.format_rows(rows, "%.6f %.6f %.6f")
+
+        LUTWriter.atomic_write(file_path, "\n".join(header) + "\n\n" + body)
+
+    @staticmethod
+    def write_cube_1d(table, file_path, title=None, input_range=None):
+        """
+        Write per-channel curves to a 1D .cube file
+        Args:
+            table: (size, 3) array of RGB output values
+            file_path: Output file path
+            title: Optional LUT title
+            input_range: Input range (min, max) covered by the table
+        """
+        table = np.asarray(table, dtype=np.float64).reshape(-1, 3)
+
+        header = [LUTWriter.HEADER_COMMENT]
+        if title:
+            header.append(f'TITLE "{title}"')
+        if input_range is not None and tuple(input_range) != (0.0, 1.0):
+            header.append(f'LUT_1D_INPUT_RANGE {input_range[0]:.6f} {input_range[1]:.6f}')
+        header.append(f'LUT_1D_SIZE {len(table)}')
+
+        body = LUTWriter.format_rows(table, "%.6f %.6f %.6f")
+
+        LUTWriter.atomic_write(file_path, "\n".join(header) + "\n\n" + body)
+
+    @staticmethod
+    def write_3dl(lut_data, file_path):
+        """
+        Write LUT data to .3dl file (10-bit input mesh, 12-bit output, blue fastest)
+        Args:
+            lut_data: 3D LUT array indexed [r, g, b]
+            file_path: Output file path
+        """
+        lut_size = lut_data.shape[0]
+
+        mesh = np.rint(np.linspace(0, LUTWriter.MESH_MAX_3DL, lut_size)).astype(np.int64)
+        output_bits = int(LUTWriter.OUTPUT_MAX_3DL).bit_length()
+        # Profondeur de sortie déclarée en commentaire (ignoré par les autres lecteurs)
+        header = [LUTWriter.HEADER_COMMENT, f"# Output bit depth: {output_bits}", " ".join(str(v) for v in mesh)]
+
+        rows = LUTWriter.lattice_rows(lut_data, red_fastest=False)
+        rows = np.rint(np.clip(rows, 0.0, 1.0) * LUTWriter.OUTPUT_MAX_3DL).astype(np.int64)
+        body = LUTWriter.format_rows(rows, "%d %d %d")
+
+        LUTWriter.atomic_write(file_path, "\n".join(header) + "\n" + body)
+
+    @staticmethod
+    def write_csp(lut_data, file_path, title=None):
+        """
+        Write LUT data to .csp file with identity preluts
+        Args:
+            lut_data: 3D LUT array indexed [r, g, b]
+            file_path: Output file path
+            title: Optional LUT title
+        """
+        lut_size = lut_data.shape[0]
+
+        header = ["CSPLUTV100", "3D", ""]
+        if title:
+            header += ["BEGIN_METADATA", title, "END_METADATA", ""]
+        for _ in range(3):
+            header += ["2", "0.0 1.0", "0.0 1.0"]
+        header += ["", f"{lut_size} {lut_size} {lut_size}"]
+
+        rows = LUTWriter.lattice_rows(lut_data, red_fastest=True).astype(np.float64)
+        body = LUTWriter.format_rows(rows, "%.6f %.6f %.6f")
+
+        LUTWriter.atomic_write(file_path, "\n".join(header) + "\n" + body)
+
+    @staticmethod
+    def hald_size(lut_size):
+        """
+        Smallest lattice size storable as a Hald image (level², level >= 2) covering lut_size
+        Args:
+            lut_size: Lattice size per axis
+        Returns:
+            Hald lattice size (lut_size itself when it is already a square)
+        """
+        level = max(int(np.ceil(np.sqrt(lut_size) - 1e-9)), 2)
+        return level * level
+
+    @staticmethod
+    def write_hald(lut_data, file_path, bit_depth=16):
+        """
+        Write LUT data as a Hald CLUT image (.png or .tif)
+        Args:
+            lut_data: 3D LUT array indexed [r, g, b]; its size must be a square (see hald_size)
+            file_path: Output file path (extension selects the encoder)
+            bit_depth: 8 or 16 bits per channel
+        """
+        lut_data = np.asarray(lut_data, dtype=np.float32)
+        lut_size = lut_data.shape[0]
+
+        # Une image Hald exige une taille de treillis carrée (niveau²) : pas de rééchantillonnage implicite
+        level = int(round(np.sqrt(lut_size)))
+        if level * level != lut_size:
+            raise ValueError(f"A Hald image needs a square lattice size (4, 9, 16, 25, ...), got {lut_size}³; "
+                             f"resample the LUT to {LUTWriter.hald_size(lut_size)}³ first")
+
+        # Ordre raster Hald : le rouge varie le plus vite
+        image = LUTWriter.lattice_rows(lut_data, red_fastest=True).reshape(level ** 3, level ** 3, 3)
+
+        max_value = 65535 if bit_depth == 16 else 255
+        dtype = np.uint16 if bit_depth == 16 else np.uint8
+        image = np.rint(np.clip(image, 0.0, 1.0) * max_value).astype(dtype)
+
+        extension = Path(file_path).suffix.lower()
+        success, encoded = cv2.imencode(extension, np.ascontiguousarray(image[..., ::-1]))
+        if not success:
+            raise ValueError(f"Cannot encode Hald image as {extension}")
+
+        LUTWriter.atomic_write(file_path, encoded.tobytes())
@@ -0,0 +1,198 @@
+"""
+Parametric LUTs for ComfyUI-Curve_Master
+Compact approximation of a color transform: per-channel curves, 3x3 matrix, per-channel curves
+"""
+
+import numpy as np
+
+from .compiled_lut import CompiledLUT
+from .curve_math import CurveMath
+
+class ParametricLUT:
+    """Curves -> 3x3 matrix (+ offset) -> curves, applied in a few operations per pixel"""
+
+    # Points de contrôle (linéaires) de chaque courbe
+    CURVE_KNOTS = 17
+    # Itérations des moindres carrés alternés
+    ITERATIONS = 30
+    # Arrêt quand l'erreur moyenne baisse de moins de cette fraction en une itération
+    TOLERANCE = 0.01
+    # Taille maximale par axe du treillis échantillonné pour l'ajustement
+    FIT_LATTICE_SIZE = 33
+    # Erreur maximale par défaut en dessous de laquelle LUTManagerNode remplace le treillis
+    # par la forme paramétrique (valeur par défaut de parametric_tolerance)
+    ERROR_THRESHOLD = 2e-3
+
+    def __init__(self, pre_curves, matrix, offset, post_curves):
+        """
+        Args:
+            pre_curves: Three (x, y) tables applied to the input channels
+            matrix: (3, 3) color matrix
+            offset: (3,) offset added after the matrix
+            post_curves: Three (x, y) tables applied to the matrix output
+        """
+        self.pre = CompiledLUT(curves=pre_curves)
+        self.post = CompiledLUT(curves=post_curves)
+        self.matrix = np.asarray(matrix, dtype=np.float32)
+        self.offset = np.asarray(offset, dtype=np.float32)
+
+        # Erreurs mesurées lors de l'ajustement et type de la LUT approchée
+        self.max_error = None
+        self.mean_error = None
+        self.source_kind = None
+
+    @property
+    def kind(self):
+        """Application path (same interface as CompiledLUT)"""
+        return 'parametric'
+
+    def apply(self, image):
+        """
+        Apply the parametric transform
+        Args:
+            image: Float array (..., 3) of RGB values
+        Returns:
+            float32 array with the same shape
+        """
+        shape = np.shape(image)
+        mixed = self.pre.apply(image).reshape(-1, 3) @ self.matrix.T
+        mixed += self.offset
+        return self.post.apply(mixed).reshape(shape)
+
+    def input_range(self):
+        """Input domain of the pre-curves"""
+        return self.pre.input_range()
+
+    @staticmethod
+    def _curve_basis(knots, values):
+        """Piecewise linear basis (uncached: samples change at every iteration)"""
+        return CurveMath.linear_basis_matrix(knots, values)
+
+    @staticmethod
+    def fit(inputs, outputs, weights=None, knots=CURVE_KNOTS, iterations=ITERATIONS):
+        """
+        Fit the parametric form to color samples by alternating least squares
+        Args:
+            inputs: (N, 3) input colors
+            outputs: (N, 3) transformed colors (post-curves are fitted monotone in [0, 1])
+            weights: Optional (N,) sample weights
+            knots: Control points per curve
+            iterations: Alternating iterations
+        Returns:
+            ParametricLUT with max_error and mean_error measured on the samples
+        """
+        inputs = np.asarray(inputs, dtype=np.float64)
+        outputs = np.asarray(outputs, dtype=np.float64)
+        weights = np.ones(len(inputs)) if weights is None else np.asarray(weights, dtype=np.float64)
+        root = np.sqrt(weights)[:, np.newaxis]
+
+        low, high = inputs.min(axis=0), inputs.max(axis=0)
+        high = np.where(high > low, high, low + 1.0)
+        pre_knots = [np.linspace(low[j], high[j], knots) for j in range(3)]
+        pre_bases = [ParametricLUT._curve_basis(pre_knots[j], inputs[:, j]) for j in range(3)]
+        pre_values = [k.copy() for k in pre_knots]
+        grams = [[(pre_bases[j] * weights[:, np.newaxis]).T @ pre_bases[k] for k in range(3)] for j in range(3)]
+
+        def solve_affine(pre_mapped, target):
+            # [M | b] par moindres carrés pondérés
+            design = np.hstack([pre_mapped, np.ones((len(pre_mapped), 1))]) * root
+            solution = np.linalg.lstsq(design, target * root, rcond=None)[0]
+            return solution[:3].T, solution[3]
+
+        def fit_post(mixed, previous=None):
+            post_knots, post_values = [], []
+            for c in range(3):
+                u_low, u_high = mixed[:, c].min(), mixed[:, c].max()
+                grid = np.linspace(u_low, u_high if u_high > u_low else u_low + 1.0, knots)
+                if previous is not None:
+                    # Points répartis selon la longueur d'arc de la courbe précédente (plus denses où elle est raide)
+                    fine = np.linspace(grid[0], grid[-1], 16 * knots)
+                    curve = np.interp(fine, previous[0][c], previous[1][c])
+                    span = max(grid[-1] - grid[0], 1e-12)
+                    arc = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(fine) / span, np.diff(curve)))])
+                    grid = np.interp(np.linspace(0.0, arc[-1], knots), arc, fine)
+                    grid[0], grid[-1] = fine[0], fine[-1]
+                    grid = np.maximum.accumulate(grid)
+                basis = ParametricLUT._curve_basis(grid, mixed[:, c])
+                post_knots.append(grid)
+                post_values.append(CurveMath.solve_control_values(basis, outputs[:, c], weights, monotonic=True))
+            return post_knots, post_values
+
+        def predict(pre_values, matrix, offset, post_knots, post_values):
+            mixed = np.stack([pre_bases[j] @ pre_values[j] for j in range(3)], axis=1) @ matrix.T + offset
+            return np.stack([np.interp(mixed[:, c], post_knots[c], post_values[c]) for c in range(3)], axis=1)
+
+        # Départ : courbes identité, matrice affine directe
+        pre_mapped = np.stack([pre_bases[j] @ pre_values[j] for j in range(3)], axis=1)
+        matrix, offset = solve_affine(pre_mapped, outputs)
+        post_knots, post_values = fit_post(pre_mapped @ matrix.T + offset)
+
+        best = None
+        for _ in range(iterations):
+            error = np.abs(predict(pre_values, matrix, offset, post_knots, post_values) - outputs)
+            score = float((error.mean(axis=1) * weights).sum() / weights.sum())
+            if best is not None and score >= best[0]:
+                break
+            converged = best is not None and score > best[0] * (1.0 - ParametricLUT.TOLERANCE)
+            best = (score, [v.copy() for v in pre_values], matrix.copy(), offset.copy(), post_knots, post_values)
+            if converged:
+                break
+
+            # Cible avant les courbes de sortie (inverse des courbes monotones)
+            target = np.empty_like(outputs)
+            for c in range(3):
+                values, first = np.unique(post_values[c], return_index=True)
+                target[:, c] = np.interp(outputs[:, c], values, post_knots[c][first]) if len(values) > 1 \
+                    else post_knots[c][0]
+
+            # Courbes d'entrée : moindres carrés joint pour une matrice fixée (équations normales,
+            # produits de Gram des bases calculés une seule fois)
+            coupling = matrix.T @ matrix
+            normal = np.block([[coupling[j, k] * grams[j][k] for k in range(3)] for j in range(3)])
+            weighted_target = (target - offset) * weights[:, np.newaxis]
+            rhs = np.concatenate([pre_bases[j].T @ (weighted_target @ matrix[:, j]) for j in range(3)])
+            normal[np.diag_indices_from(normal)] += 1e-9 * np.trace(normal) / len(normal)
+            solution = np.linalg.solve(normal, rhs)
+            pre_values = [solution[j * knots:(j + 1) * knots] for j in range(3)]
+
+            # Matrice et courbes de sortie pour les nouvelles courbes d'entrée
+            pre_mapped = np.stack([pre_bases[j] @ pre_values[j] for j in range(3)], axis=1)
+            matrix, offset = solve_affine(pre_mapped, target)
+            post_knots, post_values = fit_post(pre_mapped @ matrix.T + offset, (post_knots, post_values))
+
+        _, pre_values, matrix, offset, post_knots, post_values = best
+        parametric = ParametricLUT(list(zip(pre_knots, pre_values)), matrix, offset, list(zip(post_knots, post_values)))
+        error = np.abs(parametric.apply(inputs) - outputs)
+        parametric.max_error = float(error.max())
+        parametric.mean_error = float(error.mean())
+        return parametric
+
+    @staticmethod
+    def from_compiled(compiled_lut, knots=CURVE_KNOTS, iterations=ITERATIONS):
+        """
+        Fit the parametric form to a compiled 3D LUT
+        Args:
+            compiled_lut: CompiledLUT with a lattice
+            knots: Control points per curve
+            iterations: Alternating iterations
+        Returns:
+            ParametricLUT; errors are measured on the LUT's own lattice nodes
+        """
+        size = min(compiled_lut.lut_size or ParametricLUT.FIT_LATTICE_SIZE, ParametricLUT.FIT_LATTICE_SIZE)
+        fit_lattice = compiled_lut.bake(size)
+        axes = [np.linspace(low, high, size) for low, high in zip(*compiled_lut.input_range())]
+        inputs = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+        parametric = ParametricLUT.fit(inputs, fit_lattice.reshape(-1, 3), knots=knots, iterations=iterations)
+        parametric.source_kind = compiled_lut.kind
+
+        # Erreur sur tous les nœuds du treillis d'origine (ajustement sur un sous-échantillonnage)
+        if compiled_lut.lut_size > size:
+            lattice = compiled_lut.bake(compiled_lut.lut_size)
+            axes = [np.linspace(low, high, compiled_lut.lut_size) for low, high in zip(*compiled_lut.input_range())]
+            inputs = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+            error = np.abs(parametric.apply(inputs) - lattice)
+            parametric.max_error = float(error.max())
+            parametric.mean_error = float(error.mean())
+
+        return parametric
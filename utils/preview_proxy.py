@@ -0,0 +1,82 @@
+"""
+Preview proxies for ComfyUI-Curve_Master
+Downscaled image pyramids of the last input of each node, for live previews
+"""
+
+import numpy as np
+import cv2
+import threading
+from collections import OrderedDict
+
+class PreviewProxyCache:
+    """Per-node image pyramids (largest level first)"""
+
+    # Côté maximal du plus grand niveau conservé
+    MAX_PROXY_SIZE = 1024
+    # Côté minimal du plus petit niveau
+    MIN_LEVEL_SIZE = 96
+    # Nombre de nœuds conservés (les plus anciens sont oubliés)
+    MAX_ENTRIES = 16
+
+    _pyramids = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def build_pyramid(image):
+        """
+        Build the proxy pyramid of an image
+        Args:
+            image: uint8 RGB array (H, W, 3)
+        Returns:
+            List of levels, largest first
+        """
+        height, width = image.shape[:2]
+        scale = PreviewProxyCache.MAX_PROXY_SIZE / max(height, width)
+        if scale < 1.0:
+            size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+            level = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        else:
+            level = image.copy()
+
+        levels = [np.ascontiguousarray(level)]
+        while max(levels[-1].shape[:2]) // 2 >= PreviewProxyCache.MIN_LEVEL_SIZE:
+            levels.append(cv2.pyrDown(levels[-1]))
+
+        return levels
+
+    @staticmethod
+    def store(key, image):
+        """
+        Keep the proxy pyramid of a node's input
+        Args:
+            key: Node identifier
+            image: uint8 RGB array (H, W, 3)
+        """
+        levels = PreviewProxyCache.build_pyramid(image)
+
+        with PreviewProxyCache._lock:
+            PreviewProxyCache._pyramids[key] = levels
+            PreviewProxyCache._pyramids.move_to_end(key)
+            while len(PreviewProxyCache._pyramids) > PreviewProxyCache.MAX_ENTRIES:
+                PreviewProxyCache._pyramids.popitem(last=False)
+
+    @staticmethod
+    def get(key, max_size=512):
+        """
+        Smallest pyramid level covering a preview size
+        Args:
+            key: Node identifier
+            max_size: Requested longest side in pixels
+        Returns:
+            uint8 RGB array, or None if the node has no proxy
+        """
+        with PreviewProxyCache._lock:
+            levels = PreviewProxyCache._pyramids.get(key)
+
+        if not levels:
+            return None
+
+        for level in reversed(levels):
+            if max(level.shape[:2]) >= max_size:
+                return level
+        return levels[0]
@@ -1,4 +1,5 @@
 import { app } from "../../scripts/app.js";
+import { api } from "../../scripts/api.js";
 
 app.registerExtension({
     name: "CurveMaster.MultiChannelCurveEditor",
@@ -27,6 +28,16 @@ nodeType.prototype.onNodeCreated = function () {
                 return result;
             };
             
+            // Histogrammes envoyés par le nœud (sortie "ui" quand output_histogram est actif)
+            const onExecuted = nodeType.prototype.onExecuted;
+            nodeType.prototype.onExecuted = function (message) {
+                onExecuted?.apply(this, arguments);
+                if (message?.histogram?.length) {
+                    this.curveHistogram = message.histogram[0];
+                    this.redrawCurveEditor?.();
+                }
+            };
+            
             // MÉTHODE : Reset All Settings
             nodeType.prototype.resetAllSettings = function() {
                 console.log("Executing resetAllSettings");
@@ -286,6 +297,52 @@ nodeType.prototype.saveUserPresetToPython = function(name, settings) {
                 canvasContainer.appendChild(canvas);
                 dialog.appendChild(canvasContainer);
                 
+                // Aperçu en direct (rendu serveur sur un proxy de la dernière image d'entrée)
+                const previewImage = document.createElement("img");
+                previewImage.style.cssText = "display: block; max-width: 400px; max-height: 300px; margin: 10px auto 0; border-radius: 4px;";
+                const previewStatus = document.createElement("div");
+                previewStatus.style.cssText = "color: #888; font-size: 12px; margin-top: 6px;";
+                canvasContainer.appendChild(previewImage);
+                canvasContainer.appendChild(previewStatus);
+                
+                // Une seule requête en cours : les modifications suivantes ne gardent que la plus récente
+                let previewInFlight = false;
+                let previewPending = false;
+                const requestLivePreview = async () => {
+                    if (previewInFlight) {
+                        previewPending = true;
+                        return;
+                    }
+                    previewInFlight = true;
+                    const settings = { node_id: String(this.id), max_size: 400 };
+                    this.widgets.forEach(w => {
+                        if (w.type !== "button") settings[w.name] = w.value;
+                    });
+                    try {
+                        const response = await api.fetchApi("/curve_master/curve_preview", {
+                            method: "POST",
+                            headers: { "Content-Type": "application/json" },
+                            body: JSON.stringify(settings)
+                        });
+                        if (response.status === 200) {
+                            const oldUrl = previewImage.src;
+                            previewImage.src = URL.createObjectURL(await response.blob());
+                            if (oldUrl.startsWith("blob:")) URL.revokeObjectURL(oldUrl);
+                            previewStatus.textContent = "";
+                        } else if (response.status === 404) {
+                            previewStatus.textContent = "Live preview: run the node once to load its input image";
+                        }
+                    } catch (e) {
+                        console.error("Live preview error:", e);
+                    } finally {
+                        previewInFlight = false;
+                        if (previewPending) {
+                            previewPending = false;
+                            requestLivePreview();
+                        }
+                    }
+                };
+                
                 // Zone d'info
                 const channelInfo = document.createElement("div");
                 channelInfo.style.cssText = "background: #2a2a2a; padding: 15px; border-radius: 6px; margin-bottom: 15px; color: #fff;";
@@ -322,6 +379,7 @@ nodeType.prototype.saveUserPresetToPython = function(name, settings) {
                         widget.value = curveString;
                         this.setDirtyCanvas(true, true);
                         updateChannelInfo();
+                        requestLivePreview();
                     }
                 };
                 
@@ -422,6 +480,34 @@ nodeType.prototype.saveUserPresetToPython = function(name, settings) {
                         ctx.stroke();
                     }
                     
+                    // Histogrammes du canal actif : entrée (rempli), sortie (contour)
+                    const histogram = this.curveHistogram;
+                    if (histogram) {
+                        const key = {RGB: "luma", Red: "red", Green: "green", Blue: "blue"}[channel.name];
+                        const input = histogram.input[key];
+                        const output = histogram.output[key];
+                        const maxValue = Math.max(1, ...input, ...output);
+                        const barWidth = canvas.width / input.length;
+                        
+                        ctx.fillStyle = 'rgba(140, 140, 140, 0.35)';
+                        input.forEach((count, i) => {
+                            const barHeight = Math.sqrt(count / maxValue) * canvas.height * 0.9;
+                            ctx.fillRect(i * barWidth, canvas.height - barHeight, barWidth, barHeight);
+                        });
+                        
+                        ctx.strokeStyle = channel.color;
+                        ctx.globalAlpha = 0.5;
+                        ctx.lineWidth = 1;
+                        ctx.beginPath();
+                        output.forEach((count, i) => {
+                            const y = canvas.height - Math.sqrt(count / maxValue) * canvas.height * 0.9;
+                            if (i === 0) ctx.moveTo(0, y);
+                            else ctx.lineTo((i + 0.5) * barWidth, y);
+                        });
+                        ctx.stroke();
+                        ctx.globalAlpha = 1.0;
+                    }
+                    
                     // Ligne de référence
                     ctx.strokeStyle = '#666';
                     ctx.setLineDash([5, 5]);
@@ -509,6 +595,7 @@ nodeType.prototype.saveUserPresetToPython = function(name, settings) {
                         this.setDirtyCanvas(true, true);
                         updateChannelInfo();
                         drawCurveVisualization();
+                        requestLivePreview();
                     }
                 };
                 
@@ -519,11 +606,18 @@ nodeType.prototype.saveUserPresetToPython = function(name, settings) {
                 const closeBtn = document.createElement("button");
                 closeBtn.textContent = "Close";
                 closeBtn.style.cssText = "display: block; margin: 0 auto; padding: 8px 16px; background: #00ff88; color: #000; border: none; border-radius: 4px; cursor: pointer;";
-                closeBtn.onclick = () => document.body.removeChild(overlay);
+                closeBtn.onclick = () => {
+                    this.redrawCurveEditor = null;
+                    document.body.removeChild(overlay);
+                };
                 dialog.appendChild(closeBtn);
                 
+                // Redessiner quand de nouveaux histogrammes arrivent
+                this.redrawCurveEditor = drawCurveVisualization;
+                
                 overlay.appendChild(dialog);
                 document.body.appendChild(overlay);
+                requestLivePreview();
             };
             
             // MÉTHODE : Open Preset Selector COMPLÈTE
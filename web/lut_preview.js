@@ -3,6 +3,8 @@
  * Real-time LUT visualization and preview system
  */
 
+import { api } from "../../scripts/api.js";
+
 class LUTPreview {
     constructor(canvas, options = {}) {
         this.canvas = canvas;
@@ -444,6 +446,35 @@ class LUTPreview {
         }
     }
     
+    // Vignettes rendues côté serveur (cache disque + ETag, une requête HTTP par LUT)
+    static thumbnailURL(lutName, size = 128) {
+        const params = new URLSearchParams({ name: lutName, size: String(size) });
+        return api.apiURL(`/curve_master/lut_thumbnail?${params}`);
+    }
+    
+    // Génération en arrière-plan des vignettes d'un dossier de la bibliothèque
+    static async warmThumbnails(category = null, size = 128) {
+        const params = new URLSearchParams({ size: String(size) });
+        if (category !== null) {
+            params.set('category', category);
+        }
+        try {
+            const response = await api.fetchApi(`/curve_master/lut_thumbnails/warm?${params}`, { method: 'POST' });
+            return (await response.json()).queued;
+        } catch (e) {
+            console.error('Erreur génération vignettes LUT:', e);
+            return 0;
+        }
+    }
+    
+    // Afficher la vignette serveur d'une LUT de la bibliothèque
+    showLibraryLUT(lutName) {
+        this.lutData = null;
+        this.currentPreset = lutName;
+        this.showLoading();
+        this.loadTestImage(LUTPreview.thumbnailURL(lutName, Math.max(this.canvas.width, this.canvas.height)));
+    }
+    
     // API publique
     setLUT(lutData) {
         this.lutData = lutData;